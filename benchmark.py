@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+import json
+import argparse
+import asyncio
+import random
+
+import ddcm
+
+parser = argparse.ArgumentParser(description='DDCM In-Process Cluster Benchmark')
+
+parser.add_argument('--nodes', type=int, default=100, help='number of nodes')
+parser.add_argument('--port', type=int, default=ddcm.const.kad.cluster.CLUSTER_BASE_PORT, help='port of the first node')
+parser.add_argument('--ops', type=int, default=1000, help='operations per workload')
+parser.add_argument('--concurrency', type=int, default=32, help='operations in flight')
+parser.add_argument('--workload', action='append', choices=ddcm.Benchmark.WORKLOADS, help='workload to run, default all')
+parser.add_argument('--seed', type=int, default=None, help='random seed')
+parser.add_argument('--output', default=None, help='JSON result file, default stdout')
+parser.add_argument('--memory', action='store_true', help='run nodes on an in-memory network instead of sockets')
+parser.add_argument('--latency', type=float, default=ddcm.const.kad.transport.MEMORY_LATENCY, help='in-memory one-way latency in seconds')
+parser.add_argument('--jitter', type=float, default=ddcm.const.kad.transport.MEMORY_JITTER, help='in-memory latency jitter in seconds')
+parser.add_argument('--loss', type=float, default=ddcm.const.kad.transport.MEMORY_LOSS, help='in-memory message loss rate')
+parser.add_argument('--bandwidth', type=float, default=ddcm.const.kad.transport.MEMORY_BANDWIDTH, help='in-memory bytes per second of each node')
+
+args = parser.parse_args()
+
+def main():
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    loop = asyncio.get_event_loop()
+
+    network = ddcm.MemoryNetwork(
+        loop,
+        latency = args.latency,
+        jitter = args.jitter,
+        loss = args.loss,
+        bandwidth = args.bandwidth,
+        seed = args.seed
+    ) if args.memory else None
+
+    cluster = ddcm.Cluster(loop, args.nodes, basePort = args.port, network = network)
+    loop.run_until_complete(cluster.start())
+
+    benchmark = ddcm.Benchmark(cluster, args.seed)
+    try:
+        results = loop.run_until_complete(
+            benchmark.run_all(args.ops, args.concurrency, args.workload)
+        )
+    finally:
+        loop.run_until_complete(cluster.stop())
+
+    output = json.dumps({
+        "nodes": args.nodes,
+        "ops": args.ops,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "network": network.stats() if network else None,
+        "results": results
+    }, indent = 2)
+    if args.output:
+        with open(args.output, "w") as fd:
+            fd.write(output)
+    else:
+        print(output)
+
+main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import json
+import time
+import argparse
+import random
+
+import ddcm
+
+from ddcm.ContactArray import numpy
+
+parser = argparse.ArgumentParser(description='DDCM Contact Ranking Benchmark')
+
+parser.add_argument('--contacts', type=int, default=20000, help='number of contacts')
+parser.add_argument('--targets', type=int, default=1000, help='number of targets to rank contacts for')
+parser.add_argument('--k', type=int, default=20, help='contacts ranked for each target')
+parser.add_argument('--ksize', type=int, default=20, help='k-bucket size of the route, larger keeps more of the contacts')
+parser.add_argument('--seed', type=int, default=None, help='random seed')
+parser.add_argument('--output', default=None, help='JSON result file, default stdout')
+
+args = parser.parse_args()
+
+def get_id(rng):
+    return bytes(rng.getrandbits(8) for i in range(20))
+
+def measure(name, rank, targets):
+    start = time.perf_counter()
+    results = rank(targets)
+    duration = time.perf_counter() - start
+    return results, {
+        "method": name,
+        "duration": duration,
+        "per_target": duration / len(targets) if targets else None
+    }
+
+def main():
+    rng = random.Random(args.seed)
+    route = ddcm.Route(None, None, args.ksize, int.from_bytes(get_id(rng), byteorder = "big"))
+    for i in range(args.contacts):
+        route.addNode(ddcm.Node(get_id(rng)))
+    nodes = list(route.getNodes())
+    targets = [get_id(rng) for i in range(args.targets)]
+
+    runs = [
+        ("route_find_neighbors", lambda targets: [
+            route.findNeighbors(ddcm.Node(target), kSize = args.k) for target in targets
+        ]),
+        ("contact_array_python", lambda targets: ddcm.ContactArray(
+            nodes, vectorized = False
+        ).nearest_many(targets, args.k))
+    ]
+    if numpy is not None:
+        # Packed once, on the first target
+        contacts = ddcm.ContactArray(nodes, vectorized = True)
+        runs += [
+            ("contact_array_numpy", lambda targets: [
+                contacts.nearest(target, args.k) for target in targets
+            ]),
+            ("contact_array_numpy_batched", lambda targets: ddcm.ContactArray(
+                nodes, vectorized = True
+            ).nearest_many(targets, args.k))
+        ]
+
+    results = []
+    exact = None
+    for name, rank in runs:
+        ranked, result = measure(name, rank, targets)
+        if exact is None and name == "contact_array_python":
+            exact = ranked
+        results.append((ranked, result))
+    for ranked, result in results:
+        # Share of the exact k closest each method found
+        result["recall"] = sum(
+            len(set(node.id for distance, node in found) & set(node.id for distance, node in best))
+            for found, best in zip(ranked, exact)
+        ) / max(sum(len(best) for best in exact), 1)
+
+    output = json.dumps({
+        "contacts": len(nodes),
+        "targets": args.targets,
+        "k": args.k,
+        "seed": args.seed,
+        "numpy": numpy.__version__ if numpy is not None else None,
+        "results": [result for ranked, result in results]
+    }, indent = 2)
+    if args.output:
+        with open(args.output, "w") as fd:
+            fd.write(output)
+    else:
+        print(output)
+
+main()
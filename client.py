@@ -36,6 +36,15 @@ def main():
                 ]),
                 loop = loop
             )
+        if command.startswith("scheduler"):
+            print(service.tcpService.scheduler.stats())
+        if command.startswith("admission"):
+            print(service.tcpService.server.admission.stats())
+        if command.startswith("trace dump"):
+            count = command.split(' ')[2:]
+            print(service.tracer.dump(int(count[0]) if count else None))
+        if command.startswith("trace sample"):
+            service.tracer.sampleRate = float(command.split(' ')[2])
         if command.startswith("trace route"):
             for distance, node in service.route.findNeighbors(service.tcpService.node):
                 print("%(distance)d %(id)s (%(host)s,%(port)d)" % {
@@ -0,0 +1,126 @@
+import asyncio
+import random
+
+from . import utils
+
+from .Handler import BusyError
+from .CommitPipeline import CommitConflictError
+
+class Benchmark(object):
+    """Benchmark
+
+    Runs scripted workloads on a started Cluster, and reports throughput
+    and latency percentiles of each.
+    """
+    WORKLOADS = ["ping", "find_node", "store_find_value", "commit"]
+
+    def __init__(self, cluster, seed = None):
+        self.cluster = cluster
+        self.loop = cluster.loop
+        self.random = random.Random(seed)
+        self.keys = []
+
+    def percentile(self, latencies, q):
+        """Percentile
+
+        Args:
+            latencies: Sorted list of latencies
+            q:         Percentile, 0 < q <= 100
+        Returns:
+            Nearest-rank percentile, or None for no latencies
+        """
+        return utils.percentile(latencies, q)
+
+    def report(self, name, count, errors, duration, latencies):
+        latencies = sorted(latencies)
+        return {
+            "workload": name,
+            "nodes": len(self.cluster),
+            "operations": count,
+            "errors": errors,
+            "duration": duration,
+            "throughput": count / duration if duration > 0 else None,
+            "latency": {
+                "mean": sum(latencies) / len(latencies) if latencies else None,
+                "p50": self.percentile(latencies, 50),
+                "p99": self.percentile(latencies, 99),
+                "p999": self.percentile(latencies, 99.9),
+                "max": latencies[-1] if latencies else None
+            }
+        }
+
+    async def run(self, name, operation, count, concurrency):
+        """Run
+
+        Args:
+            name:        Workload name in the report
+            operation:   Function(index) returning a coroutine
+            count:       Number of operations
+            concurrency: Number of operations in flight
+        Returns:
+            Report dict
+        """
+        indexes = iter(range(count))
+        latencies = []
+        errors = [0]
+        async def worker():
+            for index in indexes:
+                start = self.loop.time()
+                try:
+                    await operation(index)
+                except (OSError, asyncio.TimeoutError, LookupError, BusyError, CommitConflictError):
+                    errors[0] += 1
+                    continue
+                latencies.append(self.loop.time() - start)
+        start = self.loop.time()
+        await asyncio.gather(
+            *[worker() for i in range(concurrency)],
+            loop = self.loop
+        )
+        return self.report(name, count, errors[0], self.loop.time() - start, latencies)
+
+    def pick(self):
+        return self.random.choice(self.cluster.services)
+
+    async def ping(self, count, concurrency):
+        async def operation(index):
+            source, target = self.pick(), self.pick()
+            await (await source.tcpService.call.ping(target.tcpService.node.remote))
+        return await self.run("ping", operation, count, concurrency)
+
+    async def find_node(self, count, concurrency):
+        async def operation(index):
+            source, target = self.pick(), self.pick()
+            if await source.find_node(target.tcpService.node.id) is None:
+                raise LookupError()
+        return await self.run("find_node", operation, count, concurrency)
+
+    async def store_find_value(self, count, concurrency, writes = 0.1):
+        """Store Find Value
+
+        A mix of stores of new keys and find_value of stored keys, from
+        random nodes. writes is the fraction of stores.
+        """
+        async def operation(index):
+            if not self.keys or self.random.random() < writes:
+                key = utils.get_random_node_id(self.random)
+                await self.pick().store(key, utils.get_random_node_id(self.random), cached = False)
+                self.keys.append(key)
+            elif await self.pick().find_value(self.random.choice(self.keys)) is None:
+                raise LookupError()
+        return await self.run("store_find_value", operation, count, concurrency)
+
+    async def commit(self, count, concurrency):
+        async def operation(index):
+            service = self.pick()
+            await service.commit("commit %d" % index)
+            commit_id, commit = await service.get_latest_commit()
+            if commit_id is None:
+                raise LookupError()
+        return await self.run("commit", operation, count, concurrency)
+
+    async def run_all(self, count, concurrency, workloads = None):
+        return [
+            await getattr(self, name)(count, concurrency)
+            for name in (workloads or self.WORKLOADS)
+        ]
@@ -0,0 +1,59 @@
+import time
+
+from collections import OrderedDict
+
+class Cache(object):
+    """Cache
+
+    A size-bounded LRU cache of values found on remote peers.
+    Entries expire after a TTL. Misses are cached as None with a
+    shorter TTL, so a missing key is not looked up again at once.
+    """
+    def __init__(self, maxsize, ttl, negativeTtl, clock = time.monotonic):
+        """Cache
+
+        Args:
+            maxsize:     Max number of entries
+            ttl:         Seconds a found value stays valid
+            negativeTtl: Seconds a miss stays valid
+            clock:       Function returning current time in seconds
+        """
+        self.data = OrderedDict()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negativeTtl = negativeTtl
+        self.clock = clock
+
+    def get(self, key):
+        """Get
+
+        Returns:
+            (hit, value). value is None for a cached miss.
+        """
+        entry = self.data.get(key)
+        if entry is None:
+            return False, None
+        expire, value = entry
+        if expire <= self.clock():
+            del self.data[key]
+            return False, None
+        self.data.move_to_end(key)
+        return True, value
+
+    def put(self, key, value, ttl = None):
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negativeTtl
+        if key in self.data:
+            del self.data[key]
+        self.data[key] = (self.clock() + ttl, value)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last = False)
+
+    def invalidate(self, key):
+        self.data.pop(key, None)
+
+    def clear(self):
+        self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
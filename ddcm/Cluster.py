@@ -0,0 +1,130 @@
+import asyncio
+import copy
+import ipaddress
+import random
+
+from . import utils
+from . import const
+
+from .Service import Service
+from .Handler import BusyError
+from .MemoryTransport import MemoryTransport
+
+class Cluster(object):
+    """Cluster
+
+    Runs many nodes in one process, each on its own loopback port with
+    a generated id. Given a MemoryNetwork, nodes talk through it instead
+    of sockets, and each gets its own address as real peers would.
+
+    Vars:
+        services: Services of the nodes, node 0 is the seed
+        configs:  Config of each node
+        network:  MemoryNetwork of the nodes, None for TCP
+    """
+    def __init__(
+        self, loop, size,
+        host = const.kad.cluster.CLUSTER_HOST,
+        basePort = const.kad.cluster.CLUSTER_BASE_PORT,
+        config = None,
+        network = None,
+        source = random
+    ):
+        """Cluster
+
+        Args:
+            loop:     Asyncio Loop Object
+            size:     Number of nodes
+            host:     Host every node listens on. On a MemoryNetwork,
+                      node i listens on host + i
+            basePort: Port of node 0, node i listens on basePort + i. On a
+                      MemoryNetwork, every node listens on basePort
+            config:   Config template, ids and ports are filled in
+            network:  MemoryNetwork to run the nodes on, None for TCP
+            source:   Random source of node ids, default the global one
+        """
+        self.loop = loop
+        self.size = size
+        self.host = host
+        self.basePort = basePort
+        self.network = network
+        self.source = source
+        self.template = config or self.default_config()
+        self.configs = [self.make_config(index) for index in range(size)]
+        self.services = []
+
+    @staticmethod
+    def default_config():
+        return {
+            "server": {},
+            "debug": {
+                "logging": {
+                    "level": "WARNING",
+                    "format": "[%(levelname)s:%(name)s] %(asctime)-15s %(message)s"
+                },
+                "asyncio": {
+                    "enabled": False
+                },
+                "events": {
+                    "enabled": False
+                }
+            },
+            "node": {},
+            "kbucket": {
+                "ksize": 20
+            },
+            "query": {
+                "alpha": 3
+            }
+        }
+
+    def make_config(self, index):
+        config = copy.deepcopy(self.template)
+        if self.network:
+            config["server"]["host"] = str(ipaddress.ip_address(self.host) + index)
+            config["server"]["port"] = self.basePort
+        else:
+            config["server"]["host"] = self.host
+            config["server"]["port"] = self.basePort + index
+        config["node"]["id"] = utils.get_hash_string(utils.get_random_node_id(self.source))
+        return config
+
+    async def start(self, bootstrap = True):
+        for config in self.configs:
+            service = Service(
+                config, self.loop,
+                MemoryTransport(self.loop, self.network) if self.network else None
+            )
+            await service.start()
+            self.services.append(service)
+        if bootstrap:
+            await self.bootstrap()
+
+    async def bootstrap(self, concurrency = const.kad.cluster.CLUSTER_BOOTSTRAP_CONCURRENCY):
+        """Bootstrap
+
+        Every node pings the seed, then looks up its own ids to fill its
+        k-buckets, as a Kademlia join does.
+        """
+        seed = self.services[0].tcpService.node.remote
+        semaphore = asyncio.Semaphore(concurrency, loop = self.loop)
+        async def join(service):
+            async with semaphore:
+                try:
+                    await (await service.tcpService.call.ping(seed))
+                    await service.join()
+                except (OSError, asyncio.TimeoutError, BusyError):
+                    pass
+        # Started in order, gather of coroutines starts them in any order
+        await asyncio.gather(
+            *[asyncio.ensure_future(join(service), loop = self.loop) for service in self.services[1:]],
+            loop = self.loop
+        )
+
+    async def stop(self):
+        for service in self.services:
+            await service.stop()
+        self.services = []
+
+    def __len__(self):
+        return len(self.services)
@@ -0,0 +1,150 @@
+import lzma
+import zlib
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import const
+
+class CodecError(ValueError):
+    """CodecError
+
+    Data which does not decompress, by an unknown codec, corrupt or
+    past DECOMPRESS_MAX_SIZE.
+    """
+    pass
+
+class Codec(object):
+    """Codec
+
+    Compression of values. A value is compressed once, when it is
+    stored, by a codec chosen by its size, and kept compressed in
+    Storage. Large values are compressed and decompressed in a thread
+    pool, zlib and lzma release the GIL.
+
+    Peers say which codecs they read in PING and PONG. A value goes to
+    a peer as it is stored if the peer reads its codec, and raw
+    otherwise.
+
+    Vars:
+        peers: node id -> codecs the peer reads, a bit per codec
+    """
+    def __init__(self, loop, service, executor = None):
+        self.loop = loop
+        self.service = service
+        self.executor = executor
+        self.peers = OrderedDict()
+
+        metrics = self.service.metrics
+        self.raw = {
+            codec: metrics.counter(
+                "ddcm_codec_raw_bytes_total", "Bytes of values before compression, by codec",
+                labels = {"codec": name}
+            )
+            for codec, name in const.kad.codec.CODECS.items()
+        }
+        self.encoded = {
+            codec: metrics.counter(
+                "ddcm_codec_encoded_bytes_total", "Bytes of values after compression, by codec",
+                labels = {"codec": name}
+            )
+            for codec, name in const.kad.codec.CODECS.items()
+        }
+
+    @staticmethod
+    def compress(codec, value):
+        if codec == const.kad.codec.ZLIB:
+            return zlib.compress(value, const.kad.codec.ZLIB_LEVEL)
+        elif codec == const.kad.codec.LZMA:
+            return lzma.compress(value, preset = const.kad.codec.LZMA_PRESET)
+        return value
+
+    @staticmethod
+    def decompress(codec, data, limit = const.kad.codec.DECOMPRESS_MAX_SIZE):
+        """Decompress
+
+        Args:
+            limit: Most bytes the value may decompress to, data comes
+                   from peers
+        Returns:
+            The value, CodecError if data is not one within limit
+        """
+        if codec == const.kad.codec.RAW:
+            return data
+        try:
+            if codec == const.kad.codec.ZLIB:
+                decompressor = zlib.decompressobj()
+                value = decompressor.decompress(data, limit)
+                if decompressor.unconsumed_tail:
+                    raise CodecError("Value over %d bytes" % limit)
+            elif codec == const.kad.codec.LZMA:
+                decompressor = lzma.LZMADecompressor()
+                value = decompressor.decompress(data, limit)
+                if not decompressor.eof and len(value) == limit:
+                    raise CodecError("Value over %d bytes" % limit)
+            else:
+                raise CodecError("Unknown codec %d" % codec)
+        except (zlib.error, lzma.LZMAError) as e:
+            raise CodecError("Bad %s value: %s" % (const.kad.codec.CODECS[codec], e))
+        if not decompressor.eof or decompressor.unused_data:
+            raise CodecError("Truncated %s value" % const.kad.codec.CODECS[codec])
+        return value
+
+    def choose(self, size):
+        if size < const.kad.codec.COMPRESS_MIN_SIZE:
+            return const.kad.codec.RAW
+        if size < const.kad.codec.COMPRESS_LZMA_SIZE:
+            return const.kad.codec.ZLIB
+        return const.kad.codec.LZMA
+
+    async def run(self, func, codec, data):
+        if len(data) < const.kad.codec.COMPRESS_EXECUTOR_SIZE:
+            return func(codec, data)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(const.kad.codec.COMPRESS_WORKERS)
+        return await self.loop.run_in_executor(self.executor, func, codec, data)
+
+    async def encode(self, value):
+        """Encode
+
+        Returns:
+            (codec, data), raw if compression does not pay
+        """
+        codec = self.choose(len(value))
+        if codec == const.kad.codec.RAW:
+            return codec, value
+        data = await self.run(self.compress, codec, value)
+        if len(data) > len(value) * const.kad.codec.COMPRESS_MAX_RATIO:
+            return const.kad.codec.RAW, value
+        self.raw[codec].inc(len(value))
+        self.encoded[codec].inc(len(data))
+        return codec, data
+
+    async def decode(self, codec, data):
+        if codec == const.kad.codec.RAW:
+            return data
+        return await self.run(self.decompress, codec, data)
+
+    def learn(self, node, capabilities):
+        self.peers[node.id] = capabilities
+        self.peers.move_to_end(node.id)
+        while len(self.peers) > const.kad.codec.CODEC_MAX_PEERS:
+            self.peers.popitem(last = False)
+
+    def supports(self, node, codec):
+        return codec == const.kad.codec.RAW or bool(self.peers.get(node.id, 0) & (1 << codec))
+
+    async def for_peer(self, node, codec, data):
+        """For Peer
+
+        Returns:
+            (codec, data) node reads, data decompressed if need be
+        """
+        if self.supports(node, codec):
+            return codec, data
+        return const.kad.codec.RAW, await self.decode(codec, data)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait = False)
+            self.executor = None
@@ -0,0 +1,189 @@
+import json
+import struct
+
+from . import utils
+from . import const
+
+class CommitFormatError(Exception):
+    """CommitFormatError
+
+    Bytes which are not a commit, or of a newer version.
+    """
+    pass
+
+class Commit(object):
+    """Commit
+
+    A commit object. Binary, its header is read when it is decoded, and
+    its data only when asked for:
+
+        magic "DC", version (B), flags (B), time (Q), author (20 bytes),
+        parent count (B), parents (20 bytes each), entry count (L), then
+        per entry its encoding (B), length (L) and bytes
+
+    With COMMIT_FLAG_BATCH, data is the list of the entries, otherwise
+    the one entry. Bytes are kept as they are, other data is JSON.
+
+    Bytes starting with "{" are the JSON commits of older nodes, with
+    ids as hex. A commit still reads like one, commit["lstcommit"] and
+    so on.
+
+    Vars:
+        time:    Seconds since the epoch
+        author:  Node id of the author
+        parents: Ids of the head it was made on and that commit's
+                 ancestors, parent first
+        batch:   Commits batched in it, None for one
+    """
+    def __init__(self, time, author, parents, batch = None, data = None, buffer = None, offset = 0):
+        self.time = time
+        self.author = author
+        self.parents = parents
+        self.batch = batch
+        self.__data__ = data
+        self.__buffer__ = buffer
+        self.__offset__ = offset
+
+    @classmethod
+    def create(cls, datas, parents, time, author):
+        """Create
+
+        Args:
+            datas:   Data of the commits in it
+            parents: Parent ids, parent first
+            time:    Seconds since the epoch
+            author:  Node id
+        """
+        if len(datas) == 1:
+            return cls(time, author, parents, data = datas[0])
+        return cls(time, author, parents, batch = len(datas), data = list(datas))
+
+    @classmethod
+    def decode(cls, buffer):
+        if buffer[:1] == b"{":
+            return cls.decode_json(buffer)
+        if len(buffer) < const.kad.commit.COMMIT_HEADER_SIZE:
+            raise CommitFormatError("Short commit")
+        magic, version, flags, time, author, count = struct.unpack_from(
+            const.kad.commit.COMMIT_HEADER, buffer
+        )
+        if magic != const.kad.commit.COMMIT_MAGIC or version > const.kad.commit.COMMIT_VERSION:
+            raise CommitFormatError("Unknown commit format")
+        offset = const.kad.commit.COMMIT_HEADER_SIZE
+        parents = [bytes(buffer[offset + i * 20:offset + i * 20 + 20]) for i in range(count)]
+        offset += count * 20
+        if len(buffer) < offset + const.kad.commit.COMMIT_COUNT_SIZE:
+            raise CommitFormatError("Short commit")
+        entries = struct.unpack_from(const.kad.commit.COMMIT_COUNT, buffer, offset)[0]
+        return cls(
+            time, author, parents,
+            batch = entries if flags & const.kad.commit.COMMIT_FLAG_BATCH else None,
+            buffer = buffer,
+            offset = offset + const.kad.commit.COMMIT_COUNT_SIZE
+        )
+
+    @classmethod
+    def decode_json(cls, buffer):
+        try:
+            commit = json.loads(bytes(buffer).decode("utf-8"))
+            return cls(
+                commit["time"],
+                utils.dump_node_hex(commit["author"]),
+                [utils.dump_node_hex(parent) for parent in commit["lstcommit"]],
+                batch = commit.get("batch"),
+                data = commit["data"]
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            raise CommitFormatError("Bad JSON commit: %s" % e)
+
+    def entries(self):
+        """Entries
+
+        Returns:
+            [(encoding, bytes)] of the data, without decoding it
+        """
+        if self.__buffer__ is None:
+            datas = self.__data__ if self.batch is not None else [self.__data__]
+            return [
+                (const.kad.commit.ENCODING_RAW, data) if isinstance(data, bytes) else
+                (const.kad.commit.ENCODING_JSON, json.dumps(data).encode("utf-8"))
+                for data in datas
+            ]
+        buffer, offset = self.__buffer__, self.__offset__
+        entries = []
+        for i in range(self.batch if self.batch is not None else 1):
+            if len(buffer) < offset + const.kad.commit.COMMIT_ENTRY_SIZE:
+                raise CommitFormatError("Short commit")
+            encoding, length = struct.unpack_from(const.kad.commit.COMMIT_ENTRY, buffer, offset)
+            offset += const.kad.commit.COMMIT_ENTRY_SIZE
+            if len(buffer) < offset + length:
+                raise CommitFormatError("Short commit")
+            entries.append((encoding, bytes(buffer[offset:offset + length])))
+            offset += length
+        return entries
+
+    @property
+    def data(self):
+        if self.__buffer__ is not None:
+            datas = [
+                data if encoding == const.kad.commit.ENCODING_RAW else json.loads(data.decode("utf-8"))
+                for encoding, data in self.entries()
+            ]
+            self.__data__ = datas if self.batch is not None else datas[0]
+            # Decoded once, the bytes are not kept
+            self.__buffer__ = None
+        return self.__data__
+
+    def encode(self):
+        entries = self.entries()
+        return b"".join([
+            struct.pack(
+                const.kad.commit.COMMIT_HEADER,
+                const.kad.commit.COMMIT_MAGIC,
+                const.kad.commit.COMMIT_VERSION,
+                const.kad.commit.COMMIT_FLAG_BATCH if self.batch is not None else 0,
+                self.time,
+                self.author,
+                len(self.parents)
+            ),
+            b"".join(self.parents),
+            struct.pack(const.kad.commit.COMMIT_COUNT, len(entries))
+        ] + [
+            struct.pack(const.kad.commit.COMMIT_ENTRY, encoding, len(data)) + data
+            for encoding, data in entries
+        ])
+
+    def to_dict(self):
+        """To Dict
+
+        Returns:
+            The commit as older nodes wrote it in JSON
+        """
+        commit = {
+            "data": self.data,
+            "lstcommit": [utils.get_hash_string(parent) for parent in self.parents],
+            "time": self.time,
+            "author": utils.get_hash_string(self.author)
+        }
+        if self.batch is not None:
+            commit["batch"] = self.batch
+        return commit
+
+    def __getitem__(self, name):
+        if name == "data":
+            return self.data
+        elif name == "lstcommit":
+            return [utils.get_hash_string(parent) for parent in self.parents]
+        elif name == "time":
+            return self.time
+        elif name == "author":
+            return utils.get_hash_string(self.author)
+        elif name == "batch" and self.batch is not None:
+            return self.batch
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in ("data", "lstcommit", "time", "author") or (name == "batch" and self.batch is not None)
+
+    def get(self, name, default = None):
+        return self[name] if name in self else default
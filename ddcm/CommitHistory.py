@@ -0,0 +1,155 @@
+from collections import OrderedDict
+
+from . import const
+
+from .Commit import Commit, CommitFormatError
+
+class HistoryIterator(object):
+    """History Iterator
+
+    Commits from a head back to the root, latest first, as an async
+    iterator of (commit id, commit). Commits not in the index are
+    fetched HISTORY_BATCH at a time, from the ancestors the last commit
+    lists.
+    """
+    def __init__(self, history, head, count = None, stop = None):
+        """Init
+
+        Args:
+            history: CommitHistory
+            head:    Commit id to start from, None for an empty history
+            count:   Most commits to yield, None for all
+            stop:    Set of commit ids to stop before
+        """
+        self.history = history
+        self.ahead = [head] if head is not None else []
+        self.count = count
+        self.stop = stop
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.ahead or self.count == 0:
+            raise StopAsyncIteration
+        commit_id = self.ahead[0]
+        if self.stop is not None and commit_id in self.stop:
+            raise StopAsyncIteration
+        if commit_id not in self.history.index:
+            batch = self.history.batch if self.count is None else min(self.history.batch, self.count)
+            await self.history.prefetch(self.ahead[:batch])
+        commit = self.history.index.get(commit_id)
+        if commit is None:
+            # Lost, or not written yet, history ends here
+            self.ahead = []
+            raise StopAsyncIteration
+        self.ahead = list(commit.parents)
+        if self.count is not None:
+            self.count -= 1
+        return commit_id, commit
+
+class CommitHistory(object):
+    """Commit History
+
+    A local index of commits, filled as history is walked. A commit
+    lists its ancestors in parents, so one fetched commit names the
+    next HISTORY_BATCH to fetch at once, and catching up on n commits
+    takes about n / HISTORY_BATCH round trips.
+
+    Vars:
+        index:  commit id -> Commit, most recently used last
+        synced: Commit ids whose ancestors were all walked by sync
+    """
+    def __init__(
+        self, loop, service,
+        batch = const.kad.commit.HISTORY_BATCH,
+        maxsize = const.kad.commit.HISTORY_INDEX_MAXSIZE
+    ):
+        self.loop = loop
+        self.service = service
+        self.batch = batch
+        self.maxsize = maxsize
+        self.index = OrderedDict()
+        self.synced = set()
+
+        metrics = self.service.metrics
+        self.fetched = metrics.counter(
+            "ddcm_history_fetched_total", "Commits fetched into the local index"
+        )
+        self.batches = metrics.counter(
+            "ddcm_history_batches_total", "Batches of commits fetched"
+        )
+        metrics.gauge(
+            "ddcm_history_index_commits", "Commits in the local index",
+            func = lambda: len(self.index)
+        )
+
+    def add(self, commit_id, commit):
+        self.index[commit_id] = commit
+        self.index.move_to_end(commit_id)
+        while len(self.index) > self.maxsize:
+            evicted, _ = self.index.popitem(last = False)
+            self.synced.discard(evicted)
+
+    async def prefetch(self, commit_ids):
+        """Prefetch
+
+        Fetch commits not in the index, all at once.
+        """
+        missing = [commit_id for commit_id in commit_ids if commit_id not in self.index]
+        if not missing:
+            return
+        self.batches.inc()
+        for commit_id, data in zip(missing, await self.service.find_values(missing)):
+            if data is None:
+                continue
+            try:
+                commit = Commit.decode(data)
+            except CommitFormatError:
+                # Not a commit, history ends there
+                continue
+            self.add(commit_id, commit)
+            self.fetched.inc()
+
+    async def get(self, commit_id):
+        """Get
+
+        Returns:
+            Commit, or None if not found
+        """
+        if commit_id not in self.index:
+            await self.prefetch([commit_id])
+        return self.index.get(commit_id)
+
+    def ancestors(self, commit_id):
+        """Ancestors
+
+        Returns:
+            Ids of commit_id and the ancestors it lists, for parents of
+            a child, or [commit_id] if it is not indexed
+        """
+        commit = self.index.get(commit_id)
+        ancestors = commit.parents if commit is not None else []
+        return [commit_id] + ancestors[:const.kad.commit.COMMIT_ANCESTORS - 1]
+
+    def walk(self, head, count = None, stop = None):
+        return HistoryIterator(self, head, count, stop)
+
+    async def sync(self):
+        """Sync
+
+        Fetch the commits made since the last sync, stopping at the
+        first commit an earlier sync walked.
+
+        Returns:
+            [(commit id, commit)] new, latest first
+        """
+        head = await self.service.find_value(const.kad.commit.HEAD)
+        commits = []
+        async for commit_id, commit in self.walk(head, stop = self.synced):
+            commits.append((commit_id, commit))
+        last = commits[-1][1] if commits else None
+        if last is None or not last.parents or last.parents[0] in self.synced:
+            # Walked back to the root or to a synced commit
+            self.synced.update(commit_id for commit_id, commit in commits)
+        return commits
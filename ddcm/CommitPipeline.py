@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import hashlib
+import random
+import time
+
+from . import utils
+from . import const
+
+from .Node import Node
+from .Commit import Commit
+
+class CommitConflictError(Exception):
+    """CommitConflictError
+
+    The head moved under a commit more than COMMIT_CAS_RETRIES times.
+    """
+    pass
+
+class CommitPipeline(object):
+    """Commit Pipeline
+
+    Commits made within a window of each other go in one commit object,
+    whose data is the list of their data, and "batch" their count. A
+    batch of one keeps its data as is.
+
+    Each commit is hashed on its own, in the binary format of Commit.
+    Its parents are the head it was made on, then that commit's
+    ancestors, COMMIT_ANCESTORS ids at most. The commit is stored while the head is moved to it by
+    compare-and-set on every replica. When more replicas refuse than
+    accept, the commit is made again on the head most of them hold after
+    a random backoff, and each replica is then expected to hold what it
+    answered.
+
+    Vars:
+        head:    Latest commit id known, None if there is none
+        pending: [(data, Future of the commit id)] for the next batch
+    """
+    def __init__(
+        self, loop, service,
+        window = const.kad.commit.COMMIT_WINDOW,
+        maxBatch = const.kad.commit.COMMIT_MAX_BATCH
+    ):
+        self.loop = loop
+        self.service = service
+        self.window = window
+        self.maxBatch = maxBatch
+        self.head = None
+        self.known = False
+        self.pending = []
+        self.cached = False
+        self.worker = None
+
+        metrics = self.service.metrics
+        self.commits = metrics.counter(
+            "ddcm_commits_total", "Commits made"
+        )
+        self.batches = metrics.counter(
+            "ddcm_commit_batches_total", "Commit objects written"
+        )
+        self.conflicts = metrics.counter(
+            "ddcm_commit_conflicts_total", "Head compare-and-sets lost to another commit"
+        )
+
+    async def commit(self, data, cached = False):
+        """Commit
+
+        Args:
+            data:   Data of the commit, JSON serializable
+            cached: Keep the head in local storage too
+        Returns:
+            Id of the commit object holding data
+        """
+        future = asyncio.Future(loop = self.loop)
+        self.pending.append((data, future))
+        self.cached = self.cached or cached
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.ensure_future(self.run(), loop = self.loop)
+        return await future
+
+    async def pack(self, datas, parent):
+        history = self.service.history
+        if parent is not None:
+            # Lists the ancestors of the parent too, they may be fetched at once
+            await history.get(parent)
+        return Commit.create(
+            datas,
+            history.ancestors(parent) if parent is not None else [],
+            int(time.time()),
+            utils.dump_node_hex(self.service.config["node"]["id"])
+        )
+
+    async def write(self, datas, cached):
+        service = self.service
+        route = service.route
+        head = const.kad.commit.HEAD
+        if not self.known:
+            self.head = await service.find_value(head)
+            self.known = True
+        parent = self.head
+        expected = {}
+        def get_cas_future(node):
+            return service.tcpService.call.cas(
+                node.remote, head, expected.get(node.id, parent), commit_id,
+                timeout = route.getLatency(node).timeout()
+            )
+        nodes = [
+            node for distance, node in
+            service.neighbors(Node(head), kSize = service.hotKeys.replicas(head))
+        ]
+        for attempt in range(const.kad.commit.COMMIT_CAS_RETRIES + 1):
+            commit = await self.pack(datas, parent)
+            commit_data = commit.encode()
+            commit_id = hashlib.sha1(commit_data).digest()
+            stored, (replies, called) = await asyncio.gather(
+                service.store(commit_id, commit_data),
+                service.__query__(nodes, get_cas_future, len(nodes)),
+                loop = self.loop
+            )
+            acks = 0
+            heads = collections.Counter()
+            for node, event in replies:
+                key, ok, current = event["data"]["data"]
+                expected[node.id] = current
+                if ok:
+                    acks += 1
+                elif current is not None:
+                    heads[current] += 1
+            # Won on most replicas which answered, or there are none at all.
+            # If none answered, the head did not move
+            if acks * 2 > len(replies) or not nodes:
+                self.head = commit_id
+                service.history.add(commit_id, commit)
+                service.invalidate(head, commit_id)
+                if cached:
+                    await service.storage.store(head, commit_id)
+                    service.watches.changed(head, commit_id)
+                else:
+                    service.watches.deliver(head, commit_id)
+                self.batches.inc()
+                self.commits.inc(len(datas))
+                return commit_id
+            self.conflicts.inc()
+            if heads:
+                parent = heads.most_common(1)[0][0]
+            # Writers which split the replicas would split them again
+            await asyncio.sleep(
+                random.uniform(0, const.kad.commit.COMMIT_BACKOFF),
+                loop = self.loop
+            )
+        self.known = False
+        raise CommitConflictError()
+
+    async def run(self):
+        await asyncio.sleep(self.window, loop = self.loop)
+        # Commits made while a batch is written form the next batch
+        while self.pending:
+            batch, self.pending = self.pending[:self.maxBatch], self.pending[self.maxBatch:]
+            cached, self.cached = self.cached, False
+            try:
+                commit_id = await self.write([data for data, future in batch], cached)
+            except asyncio.CancelledError:
+                for data, future in batch + self.pending:
+                    future.cancel()
+                self.pending = []
+                raise
+            except Exception as e:
+                for data, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for data, future in batch:
+                if not future.done():
+                    future.set_result(commit_id)
+
+    def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
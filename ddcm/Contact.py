@@ -0,0 +1,51 @@
+import weakref
+
+from .Node import Node
+
+class Contact(Node):
+    """Contact
+
+    A peer as read off the wire, one object per id and address while
+    any part of the service holds it. It keeps the bytes it was read
+    from, so it is sent on as it is, see TCPRPC.pack_node.
+
+    Vars:
+        packed: Id, then address, as pack_node writes them
+    """
+    __slots__ = ("packed", "__weakref__")
+
+    def __init__(self, id, remote, packed):
+        super().__init__(id, remote)
+        self.packed = packed
+
+class ContactTable(object):
+    """Contact Table
+
+    Contacts of one service, weakly interned by id. A contact nothing
+    holds is dropped, and a peer read at a new address replaces its
+    contact. Each service has its own, so services in one process never
+    share a contact.
+
+    Vars:
+        contacts: Id -> Contact
+    """
+    def __init__(self):
+        self.contacts = weakref.WeakValueDictionary()
+
+    def find(self, packed):
+        """Find
+
+        Returns:
+            Contact of packed in use, None if there is none
+        """
+        contact = self.contacts.get(packed[:20])
+        if contact is not None and contact.packed == packed:
+            return contact
+        return None
+
+    def intern(self, contact):
+        self.contacts[contact.id] = contact
+        return contact
+
+    def __len__(self):
+        return len(self.contacts)
@@ -0,0 +1,137 @@
+import heapq
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import const
+
+if numpy is not None:
+    # An id as three lanes, compared in order, the last holding 32 bits
+    LANES = numpy.dtype([("high", ">u8"), ("middle", ">u8"), ("low", ">u4")])
+
+class ContactArray(object):
+    """ContactArray
+
+    Contacts ranked by XOR distance to targets, many targets at once,
+    for shortlists of tens of thousands of contacts.
+
+    With NumPy, ids are kept as three uint64 lanes. A target is XORed
+    with every contact at once, the high lanes select the k closest and
+    any ties past them, and those are sorted on all three lanes.
+    Without NumPy, distances are Python ints ranked by heapq.
+
+    Vars:
+        nodes:      Contacts, in the order added
+        vectorized: Whether NumPy ranks them
+    """
+    def __init__(self, nodes = (), vectorized = None):
+        """ContactArray
+
+        Args:
+            nodes:      Contacts
+            vectorized: Rank with NumPy, default if it is installed
+        """
+        if vectorized is None:
+            vectorized = numpy is not None
+        elif vectorized and numpy is None:
+            raise ImportError("NumPy is not installed")
+        self.vectorized = vectorized
+        self.nodes = []
+        self.lanes = None
+        self.extend(nodes)
+
+    @staticmethod
+    def pack(ids):
+        """Pack
+
+        Returns:
+            Lanes of ids, an array of 3 rows of uint64
+        """
+        data = numpy.frombuffer(b"".join(ids), dtype = LANES)
+        return numpy.stack([data[name].astype(numpy.uint64) for name in LANES.names])
+
+    def extend(self, nodes):
+        self.nodes.extend(nodes)
+        # Packed again when next ranked
+        self.lanes = None
+
+    def nearest(self, target, k):
+        """Nearest
+
+        Args:
+            target: Id to rank contacts for
+            k:      Number of contacts
+        Returns:
+            [(distance, node)] of the k closest, closest first
+        """
+        return self.nearest_many([target], k)[0]
+
+    def nearest_many(self, targets, k):
+        """Nearest Many
+
+        Args:
+            targets: Ids to rank contacts for
+            k:       Number of contacts for each
+        Returns:
+            [[(distance, node)]] of each target, as nearest returns
+        """
+        k = min(k, len(self.nodes))
+        if k <= 0:
+            return [[] for target in targets]
+        if not self.vectorized:
+            return [self.nearest_python(target, k) for target in targets]
+        if self.lanes is None:
+            self.lanes = self.pack([node.id for node in self.nodes])
+        count = len(self.nodes)
+        # Targets at once, as many as keep distances under RANK_BATCH_CELLS
+        batch = max(1, const.kad.rank.RANK_BATCH_CELLS // count)
+        result = []
+        for start in range(0, len(targets), batch):
+            chunk = targets[start:start + batch]
+            query = self.pack(chunk)
+            rows = numpy.arange(len(chunk))[:, numpy.newaxis]
+            high = self.lanes[0][numpy.newaxis, :] ^ query[0][:, numpy.newaxis]
+            if k < count:
+                picked = numpy.argpartition(high, k - 1, axis = 1)[:, :k]
+                bounds = high[rows, picked].max(axis = 1)
+                # More high lanes at the bound than picked, ranked alone
+                tied = (high <= bounds[:, numpy.newaxis]).sum(axis = 1) > k
+            else:
+                picked = numpy.tile(numpy.arange(count), (len(chunk), 1))
+                tied = numpy.zeros(len(chunk), dtype = bool)
+            order = numpy.lexsort((
+                self.lanes[2][picked] ^ query[2][:, numpy.newaxis],
+                self.lanes[1][picked] ^ query[1][:, numpy.newaxis],
+                high[rows, picked]
+            ))
+            picked = picked[rows, order]
+            for row, target in enumerate(chunk):
+                indices = self.rank_tied(high[row], query[:, row], bounds[row], k) if tied[row] else picked[row]
+                targetHash = int.from_bytes(target, byteorder = "big")
+                result.append([
+                    (self.nodes[index].distance(targetHash), self.nodes[index])
+                    for index in indices
+                ])
+        return result
+
+    def rank_tied(self, high, query, bound, k):
+        candidates = numpy.flatnonzero(high <= bound)
+        order = numpy.lexsort((
+            self.lanes[2][candidates] ^ query[2],
+            self.lanes[1][candidates] ^ query[1],
+            high[candidates]
+        ))
+        return candidates[order[:k]]
+
+    def nearest_python(self, target, k):
+        targetHash = int.from_bytes(target, byteorder = "big")
+        return heapq.nsmallest(
+            k,
+            ((node.hash ^ targetHash, node) for node in self.nodes),
+            key = lambda pair: pair[0]
+        )
+
+    def __len__(self):
+        return len(self.nodes)
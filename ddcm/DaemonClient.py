@@ -0,0 +1,195 @@
+import asyncio
+import json
+import struct
+
+from . import const
+
+from .Node import Node
+from .Remote import Remote
+
+class DaemonError(Exception):
+    """DaemonError
+
+    The daemon failed a request, with its error message.
+    """
+    pass
+
+class DaemonStream(object):
+    """DaemonStream
+
+    Items of a streamed response, as an async iterator.
+    """
+    def __init__(self, loop, decode):
+        self.queue = asyncio.Queue(loop = loop)
+        self.decode = decode
+
+    def put(self, status, payload):
+        self.queue.put_nowait((status, payload))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        status, payload = await self.queue.get()
+        if status is const.kad.daemon.END:
+            raise StopAsyncIteration
+        if status is const.kad.daemon.ERROR:
+            raise DaemonError(payload.decode("utf-8"))
+        return self.decode(payload)
+
+class DaemonClient(object):
+    """Daemon Client
+
+    Talks to the DaemonServer of a node on this host. Calls may run
+    concurrently on one client, their requests are pipelined on one
+    connection.
+
+    Vars:
+        pending: request id -> Future, or DaemonStream of a stream
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.reader = None
+        self.writer = None
+        self.pending = {}
+        self.requestId = 0
+        self.receiver = None
+
+    async def connect(
+        self,
+        path = None,
+        host = const.kad.server.DAEMON_DEFAULT_HOST,
+        port = const.kad.server.DAEMON_DEFAULT_PORT
+    ):
+        """Connect
+
+        Args:
+            path: Unix socket path of the daemon. None to use host and port
+        """
+        if path is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(path, loop = self.loop)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port, loop = self.loop)
+        self.receiver = asyncio.ensure_future(self.receive(), loop = self.loop)
+
+    async def close(self):
+        self.writer.close()
+        await self.receiver
+
+    async def receive(self):
+        try:
+            while True:
+                header = await self.reader.readexactly(const.kad.daemon.HEADER_SIZE)
+                status, requestId, length = struct.unpack(const.kad.daemon.HEADER, header)
+                payload = await self.reader.readexactly(length)
+                pending = self.pending.get(requestId)
+                if isinstance(pending, DaemonStream):
+                    if status in (const.kad.daemon.END, const.kad.daemon.ERROR):
+                        del self.pending[requestId]
+                    pending.put(status, payload)
+                elif pending is not None:
+                    del self.pending[requestId]
+                    if not pending.done():
+                        pending.set_result((status, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for pending in self.pending.values():
+                if isinstance(pending, DaemonStream):
+                    pending.put(const.kad.daemon.ERROR, b"Connection closed")
+                else:
+                    pending.cancel()
+            self.pending = {}
+
+    def send(self, op, payload, pending):
+        self.requestId = (self.requestId + 1) & 0xffffffff
+        self.pending[self.requestId] = pending
+        self.writer.write(b"".join([
+            struct.pack(const.kad.daemon.HEADER, op, self.requestId, len(payload)),
+            payload
+        ]))
+
+    async def request(self, op, payload = b""):
+        future = asyncio.Future(loop = self.loop)
+        self.send(op, payload, future)
+        await self.writer.drain()
+        status, payload = await future
+        if status is const.kad.daemon.ERROR:
+            raise DaemonError(payload.decode("utf-8"))
+        return status, payload
+
+    def decode_commit(self, payload):
+        return payload[:20], json.loads(payload[20:].decode("utf-8"))
+
+    async def store(self, key, value):
+        await self.request(const.kad.daemon.STORE, key + value)
+
+    async def find_value(self, key):
+        """Find Value
+
+        Returns:
+            Value, or None if not found
+        """
+        status, value = await self.request(const.kad.daemon.FIND_VALUE, key)
+        return value if status is const.kad.daemon.OK else None
+
+    async def find_node(self, remoteId):
+        """Find Node
+
+        Returns:
+            Node, or None if not found
+        """
+        status, payload = await self.request(const.kad.daemon.FIND_NODE, remoteId)
+        if status is not const.kad.daemon.OK:
+            return None
+        return Node(
+            payload[:20],
+            remote = Remote(
+                host = payload[22:].decode("utf-8"),
+                port = struct.unpack(">H", payload[20:22])[0]
+            )
+        )
+
+    async def commit(self, data):
+        status, commit_id = await self.request(
+            const.kad.daemon.COMMIT, json.dumps(data).encode("utf-8")
+        )
+        return commit_id
+
+    async def submit(self, task):
+        """Submit
+
+        Args:
+            task: Task description, a string
+        Returns:
+            Commit id of the task
+        """
+        status, commit_id = await self.request(const.kad.daemon.SUBMIT, task.encode("utf-8"))
+        return commit_id
+
+    async def get_latest_commit(self):
+        status, payload = await self.request(const.kad.daemon.LATEST_COMMIT)
+        if status is not const.kad.daemon.OK:
+            return None, None
+        return self.decode_commit(payload)
+
+    def history(self, count):
+        """History
+
+        Returns:
+            DaemonStream of (commit id, commit), latest first
+        """
+        stream = DaemonStream(self.loop, self.decode_commit)
+        self.send(const.kad.daemon.HISTORY, struct.pack(">L", count), stream)
+        return stream
+
+    def watch(self, key):
+        """Watch
+
+        Returns:
+            DaemonStream of the values of key, the current one first if
+            found. It ends when the connection closes
+        """
+        stream = DaemonStream(self.loop, lambda value: value)
+        self.send(const.kad.daemon.WATCH, key, stream)
+        return stream
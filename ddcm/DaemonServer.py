@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import struct
+
+from . import const
+
+class DaemonServer(object):
+    """Daemon Server
+
+    Local API of a Service, so processes on the same host can share one
+    node. Listens on a Unix socket, or on TCP where a path is not given.
+
+    A connection carries binary frames, see const.kad.daemon. Requests
+    are pipelined: they are handled at once, and each response carries
+    the id of its request, in the order they finish.
+
+    Ops:
+        STORE:         key (20 bytes), value -> OK
+        FIND_VALUE:    key -> OK value, or NOT_FOUND
+        FIND_NODE:     node id -> OK node, or NOT_FOUND
+        COMMIT:        JSON data -> OK commit id
+        SUBMIT:        task -> OK commit id, of the commit {"task": task}
+        LATEST_COMMIT: -> OK commit id, commit JSON, or NOT_FOUND
+        HISTORY:       count (L) -> ITEM commit id, commit JSON per commit,
+                       latest first, then END
+        WATCH:         key -> ITEM value, then ITEM for each new value,
+                       until the connection closes
+    A node is its id, port (H) and host.
+    """
+    def __init__(
+        self, loop, service,
+        path = None,
+        host = const.kad.server.DAEMON_DEFAULT_HOST,
+        port = const.kad.server.DAEMON_DEFAULT_PORT
+    ):
+        """Init
+
+        Args:
+            loop:    Asyncio Loop Object
+            service: Kademlia Service
+            path:    Unix socket path. None to listen on host and port
+            host:    TCP host, without path
+            port:    TCP port, without path
+        """
+        self.loop = loop
+        self.service = service
+        self.path = path
+        self.host, self.port = host, port
+        self.server = None
+        self.ops = {
+            const.kad.daemon.STORE: self.op_store,
+            const.kad.daemon.FIND_VALUE: self.op_find_value,
+            const.kad.daemon.FIND_NODE: self.op_find_node,
+            const.kad.daemon.COMMIT: self.op_commit,
+            const.kad.daemon.SUBMIT: self.op_submit,
+            const.kad.daemon.LATEST_COMMIT: self.op_latest_commit,
+            const.kad.daemon.HISTORY: self.op_history,
+            const.kad.daemon.WATCH: self.op_watch
+        }
+
+        metrics = self.service.metrics
+        self.requests = {
+            op: metrics.counter(
+                "ddcm_daemon_requests_total", "Daemon requests by op",
+                labels = {"op": name}
+            )
+            for op, name in const.kad.daemon.OPS.items()
+        }
+        self.connections = 0
+        metrics.gauge(
+            "ddcm_daemon_connections", "Open daemon connections",
+            func = lambda: self.connections
+        )
+
+    def pack(self, status, requestId, payload = b""):
+        return b"".join([
+            struct.pack(const.kad.daemon.HEADER, status, requestId, len(payload)),
+            payload
+        ])
+
+    def pack_commit(self, commit_id, commit):
+        # Opaque bytes data goes as hex, JSON has no bytes
+        return commit_id + json.dumps(commit.to_dict(), default = lambda data: data.hex()).encode("utf-8")
+
+    async def op_store(self, payload, send):
+        await self.service.store(payload[:20], payload[20:])
+        return const.kad.daemon.OK, b""
+
+    async def op_find_value(self, payload, send):
+        value = await self.service.find_value(payload[:20])
+        if value is None:
+            return const.kad.daemon.NOT_FOUND, b""
+        return const.kad.daemon.OK, value
+
+    async def op_find_node(self, payload, send):
+        node = await self.service.find_node(payload[:20])
+        if node is None:
+            return const.kad.daemon.NOT_FOUND, b""
+        return const.kad.daemon.OK, b"".join([
+            node.id,
+            struct.pack(">H", node.remote.port),
+            node.remote.host.encode("utf-8")
+        ])
+
+    async def op_commit(self, payload, send):
+        commit_id = await self.service.commit(json.loads(payload.decode("utf-8")))
+        return const.kad.daemon.OK, commit_id
+
+    async def op_submit(self, payload, send):
+        commit_id = await self.service.commit({"task": payload.decode("utf-8")})
+        return const.kad.daemon.OK, commit_id
+
+    async def op_latest_commit(self, payload, send):
+        commit_id, commit = await self.service.get_latest_commit()
+        if commit_id is None:
+            return const.kad.daemon.NOT_FOUND, b""
+        return const.kad.daemon.OK, self.pack_commit(commit_id, commit)
+
+    async def op_history(self, payload, send):
+        count = struct.unpack(">L", payload[:4])[0]
+        head = await self.service.find_value(const.kad.commit.HEAD)
+        async for commit_id, commit in self.service.history.walk(head, count):
+            await send(const.kad.daemon.ITEM, self.pack_commit(commit_id, commit))
+        return const.kad.daemon.END, b""
+
+    async def op_watch(self, payload, send):
+        watch = self.service.watch(payload[:20])
+        try:
+            async for value in watch:
+                await send(const.kad.daemon.ITEM, value)
+        finally:
+            watch.close()
+        return const.kad.daemon.END, b""
+
+    async def handle_request(self, op, requestId, payload, writer, slots):
+        async def send(status, data = b""):
+            writer.write(self.pack(status, requestId, data))
+            await writer.drain()
+        try:
+            if op not in self.ops:
+                raise ValueError("Unknown op %d" % op)
+            self.requests[op].inc()
+            status, data = await self.ops[op](payload, send)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status, data = const.kad.daemon.ERROR, ("%s: %s" % (type(e).__name__, e)).encode("utf-8")
+        finally:
+            if slots is not None:
+                slots.release()
+        try:
+            await send(status, data)
+        except ConnectionError:
+            pass
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        slots = asyncio.Semaphore(const.kad.daemon.DAEMON_MAX_PIPELINE, loop = self.loop)
+        requests = set()
+        subscriptions = set()
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(const.kad.daemon.HEADER_SIZE)
+                except asyncio.IncompleteReadError:
+                    break
+                op, requestId, length = struct.unpack(const.kad.daemon.HEADER, header)
+                if length > const.kad.daemon.DAEMON_MAX_PAYLOAD:
+                    break
+                payload = await reader.readexactly(length)
+                if op in const.kad.daemon.SUBSCRIPTIONS:
+                    # Open until the connection closes, they hold no slot
+                    if len(subscriptions) >= const.kad.daemon.DAEMON_MAX_SUBSCRIPTIONS:
+                        writer.write(self.pack(const.kad.daemon.ERROR, requestId, b"Too many subscriptions"))
+                        continue
+                    request = asyncio.ensure_future(
+                        self.handle_request(op, requestId, payload, writer, None),
+                        loop = self.loop
+                    )
+                    subscriptions.add(request)
+                    request.add_done_callback(subscriptions.discard)
+                else:
+                    await slots.acquire()
+                    request = asyncio.ensure_future(
+                        self.handle_request(op, requestId, payload, writer, slots),
+                        loop = self.loop
+                    )
+                    requests.add(request)
+                    request.add_done_callback(requests.discard)
+            # The client is done sending, still answer what it sent.
+            # Subscriptions only end with the connection
+            for subscription in subscriptions:
+                subscription.cancel()
+            pending = requests | subscriptions
+            if pending:
+                await asyncio.wait(list(pending), loop = self.loop)
+        except ConnectionError:
+            pass
+        finally:
+            for request in requests | subscriptions:
+                request.cancel()
+            self.connections -= 1
+            writer.close()
+
+    async def start_server(self):
+        if self.path is not None:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self.server = await asyncio.start_unix_server(
+                self.handle, self.path, loop = self.loop
+            )
+        else:
+            self.server = await asyncio.start_server(
+                self.handle, self.host, self.port, loop = self.loop
+            )
+        return self.server
+
+    async def stop_server(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.server = None
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
@@ -1,74 +1,232 @@
 import asyncio
+import functools
 
 from . import utils
 from . import const
 
+from .Codec import CodecError
 from .Node import Node
+from .TimerWheel import TimerWheel
+
+class BusyError(Exception):
+    """BusyError
+
+    The remote peer refused the call because it is overloaded.
+    """
+    pass
 
 class Handler(object):
-    def __init__(self):
+    """Handler
+
+    Handles events in the queue and keeps calls waiting for a pong.
+
+    Vars:
+        event_future: Pending calls, echo -> Future
+        timers:       Deadlines of pending calls
+    """
+    def __init__(self, loop = None):
+        self.loop = loop
         self.event_future = {}
+        self.timers = TimerWheel(
+            loop,
+            const.kad.query.TIMER_TICK,
+            const.kad.query.TIMER_SLOTS
+        )
+
+    def del_future(self, echo, future):
+        if self.event_future.get(echo) is future:
+            del self.event_future[echo]
+        self.timers.cancel(echo)
+
+    def expire_future(self, echo):
+        future = self.event_future.get(echo)
+        if future is not None and not future.done():
+            future.set_exception(asyncio.TimeoutError())
 
-    def del_future(self, future):
-        del self.event_future[future.result()["data"]["echo"]]
+    def get_call_future(self, echo, timeout = None):
+        """Get Call Future
 
-    def get_call_future(self, echo):
-        future = asyncio.Future()
-        future.add_done_callback(self.del_future)
+        Args:
+            echo:    Echo of the call
+            timeout: Seconds to wait for the pong. Default RPC_TIMEOUT
+        Returns:
+            A Future resolved with the pong event, or failed with
+            asyncio.TimeoutError when no pong arrives in time.
+        """
+        if timeout is None:
+            timeout = const.kad.query.RPC_TIMEOUT
+        future = asyncio.Future(loop = self.loop)
+        future.add_done_callback(functools.partial(self.del_future, echo))
         self.event_future[echo] = future
+        self.timers.add(echo, timeout, self.expire_future)
         return future
 
+    def reply_done(self, future):
+        # A peer which went away before its pong only loses that pong,
+        # its own call times out on its side.
+        if not future.cancelled():
+            future.exception()
+
+    def reply(self, coroutine, loop):
+        """Reply
+
+        Send a pong in the background without waiting for it.
+
+        Args:
+            coroutine: Coroutine sending the pong
+            loop:      Event loop
+        Returns:
+            Future of the send
+        """
+        future = asyncio.ensure_future(coroutine, loop = loop)
+        future.add_done_callback(self.reply_done)
+        return future
+
+    async def stored(self, service, key):
+        """Stored
+
+        Returns:
+            Value of key, None if there is none or it does not decode,
+            peers store values compressed as they sent them
+        """
+        if not await service.storage.exist(key):
+            return None
+        try:
+            return await service.storage.get(key)
+        except CodecError:
+            return None
+
+    async def pong_findValue(self, service, event, encoded, hot):
+        remoteNode = event["data"]["remoteNode"]
+        codec, value = const.kad.codec.RAW, None
+        if encoded is not None:
+            codec, value = await service.codec.for_peer(remoteNode, *encoded)
+        await service.tcpService.call.pong_findValue(
+            remoteNode.remote,
+            event["data"]["echo"],
+            event["data"]["data"],
+            value,
+            hot,
+            codec
+        )
+
     async def handle_events(self, service, loop):
         def handle_new_node(node):
-            service.route.addNode(node)
-        debug_enabled = service.config["debug"]["events"]
+            if service.virtual is not None:
+                service.virtual.addNode(node)
+            # Workers of this node hand each other keys as the node
+            elif node.id != service.tcpService.node.id:
+                service.route.addNode(node)
+        debug_enabled = service.config["debug"]["events"]["enabled"]
 
         while True:
             event = await service.queue.get()
-            if debug_enabled:
-                await service.debugQueue.put(event)
+            if "time" in event:
+                event["wait"] = loop.time() - event["time"]
+            if debug_enabled and not service.debugQueue.full():
+                # Nobody may be reading, events past a full queue are dropped
+                service.debugQueue.put_nowait(event)
             if event["type"] is const.kad.event.SERVICE_SHUTDOWN:
                 break
             if event["type"] in const.kad.event.rpc_events_handle:
                 handle_new_node(event["data"]["remoteNode"])
             if event["type"] is const.kad.event.HANDLE_PING:
-                asyncio.ensure_future(
+                self.reply(
                     service.tcpService.call.pong_ping(
                         event["data"]["remoteNode"].remote, event["data"]["echo"]
                     ),
-                    loop = loop
+                    loop
                 )
             elif event["type"] is const.kad.event.HANDLE_STORE:
-                await service.storage.store(*event["data"]["data"])
+                key, value, codec = event["data"]["data"]
+                # Copies from rebalancing and replication change nothing
+                changed = not await service.storage.exist(key) or await service.storage.get_encoded(key) != (codec, value)
+                await service.storage.store_encoded(key, codec, value)
+                if changed and service.watches.watched(key):
+                    try:
+                        service.watches.changed(key, await service.codec.decode(codec, value))
+                    except CodecError:
+                        # A value no peer can read is not one to notify
+                        pass
 
-                asyncio.ensure_future(
+                self.reply(
                     service.tcpService.call.pong_store(
                         event["data"]["remoteNode"].remote,
                         event["data"]["echo"],
                         event["data"]["data"][0]
                     ),
-                    loop = loop
+                    loop
                 )
             elif event["type"] is const.kad.event.HANDLE_FIND_NODE:
-                asyncio.ensure_future(
+                self.reply(
                     service.tcpService.call.pong_findNode(
                         event["data"]["remoteNode"].remote,
                         event["data"]["echo"],
                         event["data"]["data"],
-                        [node for distance, node in service.route.findNeighbors(Node(
+                        [node for distance, node in service.neighbors(Node(
                             event["data"]["data"]
                         ))]
-                    )
+                    ),
+                    loop
                 )
             elif event["type"] is const.kad.event.HANDLE_FIND_VALUE:
-                asyncio.ensure_future(
-                    service.tcpService.call.pong_findValue(
+                key = event["data"]["data"]
+                self.reply(
+                    self.pong_findValue(
+                        service,
+                        event,
+                        await service.storage.get_encoded(key) if await service.storage.exist(key) else None,
+                        service.hotKeys.record(key)
+                    ),
+                    loop
+                )
+            elif event["type"] is const.kad.event.HANDLE_CAS:
+                key, expected, value = event["data"]["data"]
+                current = await self.stored(service, key)
+                # Set already is ok, so a retransmitted CAS is answered alike
+                ok = current == expected or current == value
+                if ok:
+                    if current != value:
+                        await service.storage.store(key, value)
+                        service.watches.changed(key, value)
+                    current = value
+                self.reply(
+                    service.tcpService.call.pong_cas(
                         event["data"]["remoteNode"].remote,
                         event["data"]["echo"],
-                        event["data"]["data"],
-                        await service.storage.get(event["data"]["data"])
-                    )
+                        key,
+                        ok,
+                        current
+                    ),
+                    loop
+                )
+            elif event["type"] is const.kad.event.HANDLE_WATCH:
+                key, lease = event["data"]["data"]
+                self.reply(
+                    service.tcpService.call.pong_watch(
+                        event["data"]["remoteNode"].remote,
+                        event["data"]["echo"],
+                        key,
+                        service.watches.grant(
+                            key, event["data"]["remoteNode"], lease, event["data"]["echo"]
+                        ),
+                        await self.stored(service, key)
+                    ),
+                    loop
                 )
+            elif event["type"] is const.kad.event.HANDLE_NOTIFY:
+                service.watches.notified(*event["data"]["data"])
             if event["type"] in const.kad.event.rpc_events_done:
-                echo = event["data"]["echo"]
-                self.event_future[echo].set_result(event)
+                future = self.event_future.get(event["data"]["echo"])
+                if future is not None and not future.done():
+                    future.set_result(event)
+            elif event["type"] is const.kad.event.HANDLE_BUSY:
+                future = self.event_future.get(event["data"]["echo"])
+                if future is not None and not future.done():
+                    future.set_exception(BusyError())
+        self.cancel_futures()
+
+    def cancel_futures(self):
+        self.timers.stop()
+        for future in list(self.event_future.values()):
+            future.cancel()
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+
+from . import const
+
+from .Node import Node
+from .Handler import BusyError
+
+class CountMinSketch(object):
+    """Count-Min Sketch
+
+    Approximate counts of keys in fixed memory. An estimate is never
+    below the true count. The row indexes of a key are slices of its
+    SHA-1, so depth is at most 5.
+    """
+    def __init__(self, width, depth):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for i in range(depth)]
+
+    def indexes(self, key):
+        digest = hashlib.sha1(key).digest()
+        return [
+            int.from_bytes(digest[i * 4:i * 4 + 4], byteorder = "big") % self.width
+            for i in range(self.depth)
+        ]
+
+    def add(self, key, count = 1):
+        """Add
+
+        Returns:
+            Estimated count of key, after adding
+        """
+        estimate = None
+        for row, index in zip(self.rows, self.indexes(key)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def estimate(self, key):
+        return min(row[index] for row, index in zip(self.rows, self.indexes(key)))
+
+    def decay(self):
+        for row in self.rows:
+            row[:] = [count >> 1 for count in row]
+
+class HotKeys(object):
+    """Hot Keys
+
+    Counts FIND_VALUE requests served, in a count-min sketch halved every
+    HOT_DECAY_INTERVAL. A key read HOT_THRESHOLD times becomes hot, and
+    cools when its count decays below HOT_COOL_THRESHOLD.
+
+    Pongs for a hot key say so. A node told a key is hot, or seeing it
+    hot itself, stores it on ksize * HOT_REPLICATION nodes, spreads its
+    reads over them, and caches it for HOT_CACHE_TTL. On promotion the
+    closest holder copies the key to that wider set at once.
+
+    Vars:
+        hot:    Keys hot here
+        remote: Keys peers said are hot, key -> expiry
+    """
+    def __init__(self, loop, service):
+        self.loop = loop
+        self.service = service
+        self.sketch = CountMinSketch(
+            const.kad.hotkey.SKETCH_WIDTH,
+            const.kad.hotkey.SKETCH_DEPTH
+        )
+        self.hot = set()
+        self.remote = {}
+        self.worker = None
+        self.__tasks__ = set()
+
+        metrics = self.service.metrics
+        self.reads = metrics.counter(
+            "ddcm_hotkey_reads_total", "FIND_VALUE requests counted in the sketch"
+        )
+        self.promoted = metrics.counter(
+            "ddcm_hotkey_promotions_total", "Keys which became hot"
+        )
+        self.demoted = metrics.counter(
+            "ddcm_hotkey_demotions_total", "Hot keys which cooled"
+        )
+        self.replicated = metrics.counter(
+            "ddcm_hotkey_replicas_total", "Copies of hot keys sent to the wider replica set"
+        )
+        metrics.gauge(
+            "ddcm_hot_keys", "Hot keys",
+            func = lambda: [
+                ({"source": "local"}, len(self.hot)),
+                ({"source": "remote"}, len(self.remote))
+            ]
+        )
+        metrics.gauge(
+            "ddcm_hotkey_estimate", "Estimated reads of each hot key in this decay interval",
+            func = lambda: [
+                ({"key": key.hex()}, self.sketch.estimate(key))
+                for key in self.hot
+            ]
+        )
+
+    def record(self, key):
+        """Record
+
+        Count one read of key.
+
+        Returns:
+            Whether key is hot here
+        """
+        self.reads.inc()
+        estimate = self.sketch.add(key)
+        if key in self.hot:
+            return True
+        if estimate < const.kad.hotkey.HOT_THRESHOLD or len(self.hot) >= const.kad.hotkey.HOT_MAX_KEYS:
+            return False
+        self.hot.add(key)
+        self.promoted.inc()
+        if self.is_closest_holder(key):
+            task = asyncio.ensure_future(self.replicate(key), loop = self.loop)
+            self.__tasks__.add(task)
+            task.add_done_callback(self.__tasks__.discard)
+        return True
+
+    def mark_remote(self, key):
+        self.remote[key] = self.loop.time() + const.kad.hotkey.HOT_CACHE_TTL
+
+    def is_hot(self, key):
+        return key in self.hot or self.remote.get(key, 0) > self.loop.time()
+
+    def replicas(self, key):
+        """Replicas
+
+        Returns:
+            Number of nodes key is stored on and read from
+        """
+        ksize = self.service.route.ksize
+        return ksize * const.kad.hotkey.HOT_REPLICATION if self.is_hot(key) else ksize
+
+    def is_closest_holder(self, key):
+        # Distance of our point closest to key, with virtual nodes
+        selfDistance = self.service.tcpService.local(key).distance(int.from_bytes(key, byteorder = "big"))
+        return all(
+            distance > selfDistance
+            for distance, node in self.service.neighbors(Node(key))
+        )
+
+    async def replicate(self, key):
+        if not await self.service.storage.exist(key):
+            return
+        encoded = await self.service.storage.get_encoded(key)
+        route = self.service.route
+        async def store(node):
+            try:
+                codec, data = await self.service.codec.for_peer(node, *encoded)
+                await (await self.service.tcpService.call.store(
+                    node.remote, key, data, codec,
+                    timeout = route.getLatency(node).timeout(),
+                    priority = const.kad.scheduler.PRIORITY_MAINTENANCE
+                ))
+                self.replicated.inc()
+            except (OSError, asyncio.TimeoutError, BusyError):
+                pass
+        # The k closest hold it already
+        nodes = self.service.neighbors(Node(key), kSize = self.replicas(key))[route.ksize:]
+        await asyncio.gather(*[store(node) for distance, node in nodes], loop = self.loop)
+
+    def cool(self):
+        self.sketch.decay()
+        for key in list(self.hot):
+            if self.sketch.estimate(key) < const.kad.hotkey.HOT_COOL_THRESHOLD:
+                self.hot.discard(key)
+                self.demoted.inc()
+        now = self.loop.time()
+        for key in [key for key, expire in self.remote.items() if expire <= now]:
+            del self.remote[key]
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(const.kad.hotkey.HOT_DECAY_INTERVAL, loop = self.loop)
+            self.cool()
+
+    def start(self):
+        self.worker = asyncio.ensure_future(self.run(), loop = self.loop)
+
+    def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+        for task in self.__tasks__:
+            task.cancel()
@@ -39,12 +39,19 @@ class KBucket(object):
         return True
 
     def removeNode(self, node):
+        """Remove Node
+
+        Returns:
+            The replacement node taking its place, if any
+        """
         if node.id not in self.nodes:
-            return
+            return None
         del self.nodes[node.id]
         if len(self.replaceNodes) > 0:
             id, rNode = self.replaceNodes.popitem()
             self.nodes[id] = rNode
+            return rNode
+        return None
 
     def depth(self):
         return len(utils.commonPrefix([n.id for n in self.nodes.values()]))
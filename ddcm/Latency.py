@@ -0,0 +1,56 @@
+from . import const
+
+class Latency(object):
+    """Latency
+
+    Round-trip time estimator of a peer, as TCP's RTO estimator
+    (RFC 6298).
+
+    Vars:
+        srtt:    Smoothed round-trip time in seconds
+        rttvar:  Round-trip time variation in seconds
+        samples: Number of round trips measured
+    """
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+
+    def update(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            beta, alpha = const.kad.query.RTT_BETA, const.kad.query.RTT_ALPHA
+            self.rttvar = (1 - beta) * self.rttvar + beta * abs(self.srtt - rtt)
+            self.srtt = (1 - alpha) * self.srtt + alpha * rtt
+        self.samples += 1
+
+    def estimate(self):
+        if self.srtt is None:
+            return const.kad.query.RTT_INITIAL
+        return self.srtt
+
+    def timeout(self):
+        """Timeout
+
+        Returns:
+            Seconds to wait for a pong from this peer
+        """
+        if self.srtt is None:
+            return const.kad.query.RPC_TIMEOUT
+        return min(
+            max(self.srtt + 4 * self.rttvar, const.kad.query.RTT_MIN_TIMEOUT),
+            const.kad.query.RPC_TIMEOUT
+        )
+
+    def p95(self):
+        """p95
+
+        Returns:
+            Estimated 95th percentile of round-trip time. With mean
+            deviation rttvar, srtt + 2 * rttvar is about mean + 1.6 sigma.
+        """
+        if self.srtt is None:
+            return const.kad.query.HEDGE_DEFAULT_DELAY
+        return max(self.srtt + 2 * self.rttvar, const.kad.query.HEDGE_MIN_DELAY)
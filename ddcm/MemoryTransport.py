@@ -0,0 +1,209 @@
+import asyncio
+import random
+
+from . import const
+
+from .Transport import Transport
+
+class MemoryNetwork(object):
+    """MemoryNetwork
+
+    Delivers messages between MemoryTransports in one process, through
+    the event loop instead of sockets.
+
+    A message is delivered when its writer is closed, after the delay
+    of the link. Override delay() and lost() for other models.
+
+    Vars:
+        servers:   Listening servers, (host, port) -> MemoryServer
+        offline:   Addresses cut off the network, messages from or to
+                   them are dropped
+        busy:      Time each sender's link is busy until
+        sent:      Messages sent
+        delivered: Messages delivered to a server
+        dropped:   Messages lost, or sent to nobody
+        bytes:     Bytes of messages sent
+    """
+    def __init__(
+        self, loop,
+        latency = const.kad.transport.MEMORY_LATENCY,
+        jitter = const.kad.transport.MEMORY_JITTER,
+        loss = const.kad.transport.MEMORY_LOSS,
+        bandwidth = const.kad.transport.MEMORY_BANDWIDTH,
+        seed = None,
+        source = None
+    ):
+        """MemoryNetwork
+
+        Args:
+            loop:      Asyncio Loop Object
+            latency:   One-way delay of a message in seconds
+            jitter:    Uniform random delay added to latency, in seconds
+            loss:      Probability a message is lost
+            bandwidth: Bytes per second of each sender's link. None for unlimited
+            seed:      Seed of the random source of jitter and loss
+            source:    Random source of jitter and loss, default one
+                       seeded with seed
+        """
+        self.loop = loop
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.bandwidth = bandwidth
+        self.random = source or random.Random(seed)
+        self.servers = {}
+        self.offline = set()
+        self.busy = {}
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.bytes = 0
+
+    def delay(self, source, destination, size):
+        """Delay
+
+        Args:
+            source:      (host, port) of the sender
+            destination: (host, port) of the receiver
+            size:        Bytes of the message
+        Returns:
+            Seconds from now until the message arrives
+        """
+        now = self.loop.time()
+        start = now
+        if self.bandwidth:
+            # Messages of one sender queue up on its link
+            start = max(now, self.busy.get(source, now))
+            self.busy[source] = start + size / self.bandwidth
+            start = self.busy[source]
+        delay = start - now + self.latency
+        if self.jitter:
+            delay += self.random.uniform(0, self.jitter)
+        return delay
+
+    def lost(self, source, destination, size):
+        if source in self.offline or destination in self.offline:
+            return True
+        return self.loss > 0 and self.random.random() < self.loss
+
+    def send(self, source, destination, data):
+        self.sent += 1
+        self.bytes += len(data)
+        if self.lost(source, destination, len(data)):
+            self.dropped += 1
+            return
+        self.loop.call_later(
+            self.delay(source, destination, len(data)),
+            self.deliver, source, destination, data
+        )
+
+    def deliver(self, source, destination, data):
+        server = self.servers.get(destination)
+        if server is None:
+            self.dropped += 1
+            return
+        self.delivered += 1
+        server.accept(source, data)
+
+    def stats(self):
+        return {
+            "servers": len(self.servers),
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "bytes": self.bytes
+        }
+
+class MemoryWriter(object):
+    """MemoryWriter
+
+    The writing side of a connection on a MemoryNetwork. Data written is
+    sent as one message on close().
+    """
+    def __init__(self, network, source, destination):
+        self.network = network
+        self.source = source
+        self.destination = destination
+        self.buffer = []
+        self.closed = False
+
+    def write(self, data):
+        self.buffer.append(data)
+
+    async def drain(self):
+        pass
+
+    def get_extra_info(self, name, default = None):
+        if name == "peername":
+            return self.destination
+        if name == "sockname":
+            return self.source
+        return default
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.destination is not None and self.buffer:
+            self.network.send(self.source, self.destination, b"".join(self.buffer))
+        self.buffer = []
+
+class MemoryServer(object):
+    """MemoryServer
+
+    A server listening on a MemoryNetwork.
+    """
+    def __init__(self, loop, network, handle, address):
+        self.loop = loop
+        self.network = network
+        self.handle = handle
+        self.address = address
+        self.network.servers[address] = self
+
+    def accept(self, source, data):
+        reader = asyncio.StreamReader(loop = self.loop)
+        reader.feed_data(data)
+        reader.feed_eof()
+        # The peer closed after writing, nothing can be sent back
+        writer = MemoryWriter(self.network, self.address, source)
+        writer.closed = True
+        future = asyncio.ensure_future(self.handle(reader, writer), loop = self.loop)
+        future.add_done_callback(self.handle_done)
+
+    def handle_done(self, future):
+        # Malformed messages only fail their own connection
+        if not future.cancelled():
+            future.exception()
+
+    def close(self):
+        if self.network.servers.get(self.address) is self:
+            del self.network.servers[self.address]
+
+    async def wait_closed(self):
+        pass
+
+class MemoryTransport(Transport):
+    """MemoryTransport
+
+    Transport over a MemoryNetwork. Every Service of a simulation gets
+    its own MemoryTransport on a shared MemoryNetwork.
+    """
+    def __init__(self, loop, network):
+        super().__init__(loop)
+        self.network = network
+        self.address = None
+
+    async def connect(self, remote):
+        destination = (remote.host, remote.port)
+        if destination not in self.network.servers:
+            raise ConnectionRefusedError("No server on %s:%d" % destination)
+        reader = asyncio.StreamReader(loop = self.loop)
+        reader.feed_eof()
+        return reader, MemoryWriter(self.network, self.address, destination)
+
+    async def start_server(self, handle, host, port, reuse_port = False):
+        if reuse_port:
+            # One address is one node here, there are no processes to share it
+            raise OSError("MemoryTransport does not share ports")
+        self.address = (host, port)
+        return MemoryServer(self.loop, self.network, handle, self.address)
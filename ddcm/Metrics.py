@@ -0,0 +1,190 @@
+import asyncio
+import bisect
+
+from collections import OrderedDict
+
+from . import const
+
+class Value(object):
+    """Value
+
+    A single number. With func, the value is read from func at scrape
+    time, so nothing is recorded on the hot path. func returns a
+    number, or a list of (labels, value).
+    """
+    def __init__(self, labels = None, func = None):
+        self.labels = labels or {}
+        self.value = 0
+        self.func = func
+
+    def samples(self, name):
+        if self.func is None:
+            return [(name, self.labels, self.value)]
+        value = self.func()
+        if not isinstance(value, list):
+            return [(name, self.labels, value)]
+        return [
+            (name, dict(self.labels, **labels), _value)
+            for labels, _value in value
+        ]
+
+class Counter(Value):
+    """Counter
+
+    A value that only goes up. inc is a plain attribute update, cheap
+    enough to leave on in production.
+    """
+    type = "counter"
+
+    def inc(self, amount = 1):
+        self.value += amount
+
+class Gauge(Value):
+    """Gauge
+
+    A value that goes up and down.
+    """
+    type = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+class Histogram(object):
+    """Histogram
+
+    Counts observations in fixed buckets. Bucket counts are kept per
+    bucket and summed at scrape time.
+    """
+    type = "histogram"
+
+    def __init__(self, buckets, labels = None):
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name):
+        samples = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"), ), self.counts):
+            total += count
+            samples.append((
+                name + "_bucket",
+                dict(self.labels, le = "+Inf" if bound == float("inf") else repr(bound)),
+                total
+            ))
+        samples.append((name + "_sum", self.labels, self.sum))
+        samples.append((name + "_count", self.labels, self.count))
+        return samples
+
+class Metrics(object):
+    """Metrics
+
+    A registry of metrics, exported as Prometheus text.
+
+    Vars:
+        families: name -> (type, help, [metrics])
+    """
+    def __init__(self):
+        self.families = OrderedDict()
+
+    def register(self, name, help, metric):
+        if name not in self.families:
+            self.families[name] = (metric.type, help, [])
+        self.families[name][2].append(metric)
+        return metric
+
+    def counter(self, name, help, labels = None, func = None):
+        return self.register(name, help, Counter(labels, func))
+
+    def gauge(self, name, help, labels = None, func = None):
+        return self.register(name, help, Gauge(labels, func))
+
+    def histogram(self, name, help, labels = None, buckets = const.kad.metrics.LATENCY_BUCKETS):
+        return self.register(name, help, Histogram(buckets, labels))
+
+    def by_command(self, create, name, help, commands = None):
+        """By Command
+
+        Returns:
+            command -> metric, one metric labelled per command
+        """
+        commands = const.kad.command.COMMANDS if commands is None else commands
+        return {
+            command: create(name, help, {"command": const.kad.command.COMMANDS[command]})
+            for command in commands
+        }
+
+    def format_labels(self, labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(
+            '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for key, value in sorted(labels.items())
+        ) + "}"
+
+    def render(self):
+        """Render
+
+        Returns:
+            All metrics in Prometheus text exposition format
+        """
+        lines = []
+        for name, (type, help, metrics) in self.families.items():
+            lines.append("# HELP %s %s" % (name, help))
+            lines.append("# TYPE %s %s" % (name, type))
+            for metric in metrics:
+                for sample, labels, value in metric.samples(name):
+                    lines.append("%s%s %s" % (sample, self.format_labels(labels), value))
+        return "\n".join(lines) + "\n"
+
+class MetricsServer(object):
+    """MetricsServer
+
+    Serves GET /metrics over HTTP with Prometheus text.
+    """
+    def __init__(
+        self, loop, metrics,
+        host = const.kad.server.METRICS_DEFAULT_HOST,
+        port = const.kad.server.METRICS_DEFAULT_PORT
+    ):
+        self.loop = loop
+        self.metrics = metrics
+        self.host, self.port = host, port
+        self.server = None
+
+    async def handle(self, reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1] in (b"/", b"/metrics"):
+                status, body = "200 OK", self.metrics.render().encode()
+            else:
+                status, body = "404 Not Found", b""
+            writer.write(("HTTP/1.0 %s\r\n"
+                "Content-Type: text/plain; version=0.0.4\r\n"
+                "Content-Length: %d\r\n\r\n" % (status, len(body))).encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start_server(self):
+        self.server = await asyncio.start_server(
+            self.handle,
+            self.host, self.port,
+            loop = self.loop
+        )
+        return self.server
+
+    async def stop_server(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.server = None
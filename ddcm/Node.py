@@ -12,6 +12,8 @@ class Node(object):
     Func:
         distance: Calculate Distance between two Nodes
     """
+    __slots__ = ("id", "remote", "hash")
+
     def __init__(self, id, remote=None):
         """Node
 
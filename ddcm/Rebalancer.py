@@ -0,0 +1,164 @@
+import asyncio
+
+from . import const
+
+from .Node import Node
+from .ContactArray import ContactArray
+from .Handler import BusyError
+from .TCPService.TCPAdmission import TokenBucket
+
+class Rebalancer(object):
+    """Rebalancer
+
+    Hands locally held keys to new contacts which are now among the k
+    closest nodes to them, or among the wider set a hot key is kept on,
+    see HotKeys. Only the closest holder we know of hands a
+    key off, so one join does not draw k copies of it.
+
+    Transfers are STOREs at maintenance priority, REBALANCE_BATCH at a
+    time, and at most REBALANCE_RATE keys per second.
+
+    Vars:
+        queue: New contacts waiting for their keys
+    """
+    def __init__(self, loop, service):
+        self.loop = loop
+        self.service = service
+        self.queue = []
+        self.worker = None
+        self.bucket = TokenBucket(
+            const.kad.rebalance.REBALANCE_RATE,
+            const.kad.rebalance.REBALANCE_BURST,
+            loop.time()
+        )
+
+        metrics = self.service.metrics
+        self.handedOff = metrics.counter(
+            "ddcm_rebalance_keys_total", "Keys handed off to new contacts"
+        )
+        self.failed = metrics.counter(
+            "ddcm_rebalance_failures_total", "Key handoffs which failed"
+        )
+        metrics.gauge(
+            "ddcm_rebalance_queue", "New contacts waiting for their keys",
+            func = lambda: len(self.queue)
+        )
+
+    def on_new_node(self, node):
+        if node.id == self.service.tcpService.node.id:
+            return
+        if any(queued.id == node.id for queued in self.queue):
+            return
+        self.queue.append(node)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.ensure_future(self.run(), loop = self.loop)
+
+    def belongs(self, key, node, neighbors = None):
+        """Belongs
+
+        Args:
+            neighbors: [(distance, node)] closest to key, default the
+                       neighbors of key in route
+        Returns:
+            Whether node is among the nodes key is kept on that we know,
+            and no other of those is closer to key than we are
+        """
+        keyHash = int.from_bytes(key, byteorder = "big")
+        # Distance of our point closest to key, with virtual nodes
+        selfDistance = self.service.tcpService.local(key).distance(keyHash)
+        found = False
+        if neighbors is None:
+            neighbors = self.service.neighbors(Node(key), kSize = self.service.hotKeys.replicas(key))
+        for distance, neighbor in neighbors:
+            if neighbor.id == node.id:
+                found = True
+            elif distance < selfDistance:
+                return False
+        return found
+
+    def candidates(self, node):
+        """Candidates
+
+        Returns:
+            Held keys node may be among the closest to. Contacts nearer
+            to us than the log distance of node are nearer than node to
+            every key nearer to us than that, so with as many of them as
+            a key has replicas node gets none of those keys
+        """
+        keys = list(self.service.storage.data)
+        if self.service.virtual is not None:
+            # Keys are near one point or another
+            return keys
+        selfHash = self.service.route.selfNode
+        bound = 1 << (node.distance(selfHash).bit_length() - 1)
+        closer = sum(1 for contact in self.service.contacts() if contact.distance(selfHash) < bound)
+        replicas = self.service.hotKeys.replicas
+        return [
+            key for key in keys
+            if int.from_bytes(key, byteorder = "big") ^ selfHash >= bound or closer < replicas(key)
+        ]
+
+    async def keys_for(self, node):
+        keys = self.candidates(node)
+        if not keys:
+            return []
+        contacts = ContactArray(self.service.contacts())
+        found = []
+        for start in range(0, len(keys), const.kad.rebalance.REBALANCE_RANK_CHUNK):
+            chunk = keys[start:start + const.kad.rebalance.REBALANCE_RANK_CHUNK]
+            if contacts.vectorized:
+                widths = [self.service.hotKeys.replicas(key) for key in chunk]
+                # A chunk ranked at once, see ContactArray, hot keys more widely
+                found += [
+                    key for key, width, neighbors in zip(chunk, widths, contacts.nearest_many(chunk, max(widths)))
+                    if self.belongs(key, node, neighbors[:width])
+                ]
+            else:
+                # Without NumPy the route's own search is faster per key
+                found += [key for key in chunk if self.belongs(key, node)]
+            # RPCs are handled between chunks
+            await asyncio.sleep(0, loop = self.loop)
+        return found
+
+    async def acquire(self):
+        while not self.bucket.consume(self.loop.time()):
+            await asyncio.sleep(1 / self.bucket.rate, loop = self.loop)
+
+    async def hand_off(self, node, key):
+        await self.acquire()
+        if not await self.service.storage.exist(key):
+            return
+        try:
+            codec, data = await self.service.codec.for_peer(
+                node, *await self.service.storage.get_encoded(key)
+            )
+            await (await self.service.tcpService.call.store(
+                node.remote, key, data, codec,
+                timeout = self.service.route.getLatency(node).timeout(),
+                priority = const.kad.scheduler.PRIORITY_MAINTENANCE
+            ))
+            self.handedOff.inc()
+        except (OSError, asyncio.TimeoutError, BusyError):
+            self.failed.inc()
+
+    async def run(self):
+        while self.queue:
+            node = self.queue.pop(0)
+            if self.service.route.isNewNode(node):
+                # Dropped from the table while waiting
+                continue
+            keys = await self.keys_for(node)
+            for start in range(0, len(keys), const.kad.rebalance.REBALANCE_BATCH):
+                await asyncio.gather(
+                    *[
+                        self.hand_off(node, key)
+                        for key in keys[start:start + const.kad.rebalance.REBALANCE_BATCH]
+                    ],
+                    loop = self.loop
+                )
+
+    def stop(self):
+        self.queue = []
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
@@ -2,9 +2,17 @@ import asyncio
 import socket
 
 class Remote(object):
-    def __init__(self, host=None, port=None, family=socket.AF_UNSPEC):
+    """Remote
+
+    Address of a peer. It does not change, and keeps its packed form
+    once TCPRPC packed it.
+    """
+    __slots__ = ("host", "port", "packed")
+
+    def __init__(self, host=None, port=None, family=socket.AF_UNSPEC, packed=None):
         self.host = host
         self.port = port
+        self.packed = packed
 
     async def connect_tcp(self, loop=None):
         return await asyncio.open_connection(self.host, self.port, loop=loop)
@@ -1,6 +1,8 @@
 import heapq
+import time
 
 from .KBucket import KBucket
+from .Latency import Latency
 
 class Route(object):
     def __init__(self, service, loop, kSize, selfNode):
@@ -10,6 +12,13 @@ class Route(object):
         self.selfNode = selfNode
         self.ksize = kSize
         self.buckets = [KBucket(0, 2 ** 160, self.ksize)]
+        self.latency = {}
+        # Routes sharing latency, an estimate is kept while any holds its node
+        self.sharing = [self]
+        self.lastSeen = {}
+        # Functions(node) called when a contact joins the table
+        self.newNodeCallbacks = []
+        self.__unknownLatency__ = Latency()
 
     def getBucket(self, distance):
         for index, bucket in enumerate(self.buckets):
@@ -23,21 +32,59 @@ class Route(object):
 
     def removeNode(self, node):
         __index = self.getBucket(node.distance(self.selfNode))
-        self.buckets[__index].removeNode(node)
+        promoted = self.buckets[__index].removeNode(node)
+        if all(route.isNewNode(node) for route in self.sharing):
+            self.latency.pop(node.id, None)
+        self.lastSeen.pop(node.id, None)
+        if promoted is not None:
+            self.lastSeen[promoted.id] = time.time()
+            self.__new_node__(promoted)
+
+    def getLatency(self, node):
+        return self.latency.get(node.id, self.__unknownLatency__)
+
+    def updateLatency(self, node, rtt):
+        if node.id not in self.latency:
+            self.latency[node.id] = Latency()
+        self.latency[node.id].update(rtt)
 
     def isNewNode(self, node):
         __index = self.getBucket(node.distance(self.selfNode))
         return self.buckets[__index].isNewNode(node)
 
-    def addNode(self, node):
+    def getNodes(self):
+        for bucket in self.buckets:
+            for node in bucket.getNodes():
+                yield node
+
+    def addNode(self, node, notify = True):
+        """Add Node
+
+        Args:
+            node:   Contact
+            notify: Run newNodeCallbacks if it joins the table. Contacts
+                    known before a restart are not new
+        """
+        new = self.isNewNode(node)
+        self.__add_node__(node)
+        if notify and new and not self.isNewNode(node):
+            self.__new_node__(node)
+
+    def __new_node__(self, node):
+        for callback in self.newNodeCallbacks:
+            callback(node)
+
+    def __add_node__(self, node):
         index = self.getBucket(node.distance(self.selfNode))
         bucket = self.buckets[index]
 
         if bucket.addNode(node):
+            # Wall clock, so it still means something after a restart
+            self.lastSeen[node.id] = time.time()
             return
         elif bucket.isInRange(node) or bucket.depth() % 5 != 0:
             self.splitBucket(index)
-            self.addNode(node)
+            self.__add_node__(node)
         else:
             #TODO: Check if the first node is online
             pass
@@ -62,11 +109,32 @@ class Route(object):
 
         kSize = kSize or self.ksize
         nodes = []
-        __count = 0
+        seen = set()
         for neighbor in iter_nodes(self.getBucket(node.distance(self.selfNode))):
-            if neighbor.id != self.selfNode and (not neighbor.id in exclude):
-                heapq.heappush(nodes, (neighbor.distance(self.selfNode), neighbor))
-                __count += 1
+            if neighbor.id != self.selfNode and (not neighbor.id in exclude) and (not neighbor.id in seen):
+                seen.add(neighbor.id)
+                nodes.append(neighbor)
             if len(nodes) is kSize:
                 break
-        return heapq.nsmallest(__count, nodes)
+        return self.rank(nodes, node.hash, kSize)
+
+    def rank(self, neighbors, target, kSize):
+        """Rank
+
+        Args:
+            neighbors: Contacts to rank
+            target:    Hash of the id they are ranked for
+            kSize:     Number of contacts kept
+        Returns:
+            [(distance, node)] of the kSize contacts closest to target.
+            They are chosen by distance alone, so every node picks the
+            same replicas. Among the chosen, nodes at the same log
+            distance go lower latency first, to be queried first
+        """
+        closest = heapq.nsmallest(kSize, neighbors, key = lambda neighbor: neighbor.distance(target))
+        closest.sort(key = lambda neighbor: (
+            neighbor.distance(target).bit_length(),
+            self.getLatency(neighbor).estimate(),
+            neighbor.distance(target)
+        ))
+        return [(neighbor.distance(target), neighbor) for neighbor in closest]
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import socket
+import struct
+import time
+
+from . import const
+
+from .Node import Node
+from .Remote import Remote
+from .Latency import Latency
+from .Handler import BusyError
+
+class RouteSnapshot(object):
+    """RouteSnapshot
+
+    Saves the routing table to a file now and then, and restores it when
+    the node starts, so it can route at once after a restart. Restored
+    contacts are pinged in the background, and dropped if they do not
+    answer.
+
+    File: magic, version (B), count (L), then per contact its id, IPv4
+    host size (B), port (H), host, last seen (d, wall clock), srtt and
+    rttvar (f, -1 if unknown), and RTT samples (L).
+
+    Vars:
+        restored:  Contacts restored and not yet pinged
+        dropped:   Restored contacts that did not answer
+    """
+    CONTACT = ">dffL"
+
+    def __init__(self, loop, service, path, interval = const.kad.snapshot.SNAPSHOT_INTERVAL):
+        self.loop = loop
+        self.service = service
+        self.path = path
+        self.interval = interval
+        self.restored = []
+        self.dropped = 0
+        self.__tasks__ = []
+
+    def dump(self):
+        """Dump
+
+        Returns:
+            The routing table, packed
+        """
+        route = self.service.route
+        contacts = []
+        for node in route.getNodes():
+            latency = route.latency.get(node.id)
+            host = socket.inet_aton(node.remote.host)
+            contacts.append(b"".join([
+                node.id,
+                struct.pack(">BH", len(host), node.remote.port),
+                host,
+                struct.pack(
+                    self.CONTACT,
+                    route.lastSeen.get(node.id, 0),
+                    latency.srtt if latency is not None and latency.srtt is not None else -1,
+                    latency.rttvar if latency is not None and latency.srtt is not None else -1,
+                    latency.samples if latency is not None else 0
+                )
+            ]))
+        return b"".join([
+            const.kad.snapshot.SNAPSHOT_MAGIC,
+            struct.pack(">BL", const.kad.snapshot.SNAPSHOT_VERSION, len(contacts)),
+            *contacts
+        ])
+
+    def load(self, data):
+        """Load
+
+        Args:
+            data: A packed routing table
+        Returns:
+            [(node, last seen, Latency)]
+        """
+        magic = const.kad.snapshot.SNAPSHOT_MAGIC
+        if data[:len(magic)] != magic:
+            raise ValueError("Not a routing table snapshot")
+        offset = len(magic)
+        version, count = struct.unpack_from(">BL", data, offset)
+        if version != const.kad.snapshot.SNAPSHOT_VERSION:
+            raise ValueError("Unknown snapshot version %d" % version)
+        offset += 5
+        contacts = []
+        for i in range(count):
+            id = data[offset:offset + 20]
+            hostSize, port = struct.unpack_from(">BH", data, offset + 20)
+            offset += 23
+            host = socket.inet_ntoa(data[offset:offset + hostSize])
+            offset += hostSize
+            lastSeen, srtt, rttvar, samples = struct.unpack_from(self.CONTACT, data, offset)
+            offset += struct.calcsize(self.CONTACT)
+            latency = None
+            if srtt >= 0:
+                latency = Latency()
+                latency.srtt, latency.rttvar, latency.samples = srtt, rttvar, samples
+            contacts.append((Node(id, remote = Remote(host = host, port = port)), lastSeen, latency))
+        return contacts
+
+    def save(self):
+        # Written aside and renamed, a crash never leaves half a file
+        temp = self.path + ".tmp"
+        with open(temp, "wb") as fd:
+            fd.write(self.dump())
+        os.replace(temp, self.path)
+
+    def restore(self):
+        """Restore
+
+        Add the contacts of the snapshot file to the routing table.
+
+        Returns:
+            Number of contacts restored
+        """
+        try:
+            with open(self.path, "rb") as fd:
+                contacts = self.load(fd.read())
+        except (OSError, ValueError, struct.error):
+            return 0
+        route = self.service.route
+        now = time.time()
+        # Freshest first, they are pinged first
+        contacts.sort(key = lambda contact: -contact[1])
+        for node, lastSeen, latency in contacts:
+            if now - lastSeen > const.kad.snapshot.SNAPSHOT_MAX_AGE:
+                continue
+            if node.id == self.service.tcpService.node.id:
+                continue
+            # Neither handed keys nor synced again, they had them before
+            route.addNode(node, notify = False)
+            if route.isNewNode(node):
+                continue
+            route.lastSeen[node.id] = lastSeen
+            if latency is not None:
+                route.latency[node.id] = latency
+            self.restored.append(node)
+        return len(self.restored)
+
+    async def revalidate(self):
+        """Revalidate
+
+        Ping restored contacts at maintenance priority, a few at a time,
+        and drop those which do not answer. A contact heard from since
+        the restart is not pinged.
+        """
+        route = self.service.route
+        start = time.time()
+        async def ping(node):
+            try:
+                await (await self.service.tcpService.call.ping(
+                    node.remote,
+                    timeout = route.getLatency(node).timeout(),
+                    priority = const.kad.scheduler.PRIORITY_MAINTENANCE
+                ))
+            except BusyError:
+                pass
+            except (OSError, asyncio.TimeoutError):
+                self.dropped += 1
+                route.removeNode(node)
+        async def worker():
+            while self.restored:
+                node = self.restored.pop(0)
+                if route.lastSeen.get(node.id, 0) >= start or route.isNewNode(node):
+                    continue
+                await ping(node)
+        await asyncio.gather(
+            *[worker() for i in range(const.kad.snapshot.REVALIDATE_CONCURRENCY)],
+            loop = self.loop
+        )
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval, loop = self.loop)
+            self.save()
+
+    def start(self):
+        self.restore()
+        self.__tasks__ = [
+            asyncio.ensure_future(self.revalidate(), loop = self.loop),
+            asyncio.ensure_future(self.run(), loop = self.loop)
+        ]
+
+    def stop(self):
+        for task in self.__tasks__:
+            task.cancel()
+        self.__tasks__ = []
+        self.save()
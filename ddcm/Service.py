@@ -1,7 +1,6 @@
 import asyncio
-import hashlib
-import json
-import time
+import functools
+import random
 
 from . import utils
 from . import const
@@ -10,6 +9,19 @@ from .Node import Node
 from .Route import Route
 from .Remote import Remote
 from .Storage import Storage
+from .Cache import Cache
+from .Codec import Codec
+from .Metrics import Metrics, MetricsServer
+from .DaemonServer import DaemonServer
+from .RouteSnapshot import RouteSnapshot
+from .Rebalancer import Rebalancer
+from .HotKeys import HotKeys
+from .CommitPipeline import CommitPipeline
+from .CommitHistory import CommitHistory
+from .Watch import WatchManager
+from .Shard import Shard
+from .VirtualNodes import VirtualNodes
+from .Tracer import Tracer
 from .Logger import Logger
 from .TCPService import TCPService
 from .Route import Route
@@ -25,13 +37,26 @@ class Service(object):
         loop:         Asyncio Loop Object
         tcpService:   Kademlia Service containing all objects for TCP.
         route:        Kademlia KBuckets
+        snapshot:     Saves and restores route, None if not configured
+        rebalancer:   Hands keys off to new contacts
         storage:      Kademlia Key-Value Storage
+        codec:        Compresses values, and knows the codecs of peers
+        cache:        Cache of values found on remote peers
+        hotKeys:      Detects keys read most, and replicates them wider
+        commits:      Batches commits and moves the head to them
+        history:      Local index of commits, walks commit history
+        watches:      Watches of keys, and leases held for remote watchers
+        shard:        This worker, when the node runs in worker processes,
+                      None otherwise
+        virtual:      More points on the ring for this node, None for one
+        metrics:      Metrics registry
+        tracer:       Sampled traces of lookups
         daemonServer: Kademlia Daemon Server
         queue:        Kademlia Event Queue
     """
 
 
-    def __init__(self, config, loop):
+    def __init__(self, config, loop, transport = None):
         self.config = config
         self.loop = loop
 
@@ -47,21 +72,153 @@ class Service(object):
 
         self.logger = Logger(config["debug"]["logging"])
         self.__logger__ = self.logger.get_logger("Service")
-        self.__hasher__ = hashlib.sha1()
 
-        self.handler = Handler()
+        self.metrics = Metrics()
+        traceConfig = config.get("trace", {})
+        self.tracer = Tracer(
+            loop,
+            traceConfig.get("sample", const.kad.trace.TRACE_SAMPLE_RATE),
+            traceConfig.get("size", const.kad.trace.TRACE_BUFFER_SIZE)
+        )
+        self.handler = Handler(loop)
 
-        self.storage = Storage()
+        self.codec = Codec(loop, self)
+        self.storage = Storage(self.codec)
+        self.cache = Cache(
+            const.kad.cache.CACHE_MAXSIZE,
+            const.kad.cache.CACHE_TTL,
+            const.kad.cache.CACHE_NEGATIVE_TTL,
+            clock = loop.time
+        )
+        self.__lookups__ = {}
+        self.hotKeys = HotKeys(loop, self)
         self.route = Route(
             self,
             loop,
             config["kbucket"]["ksize"],
             int.from_bytes(utils.dump_node_hex(config["node"]["id"]), byteorder="big")
         )
-        self.tcpService = TCPService(config, self, loop)
+        self.tcpService = TCPService(config, self, loop, transport)
+        self.rebalancer = Rebalancer(loop, self)
+        self.commits = CommitPipeline(loop, self)
+        self.history = CommitHistory(loop, self)
+        self.watches = WatchManager(loop, self)
+        self.route.newNodeCallbacks.append(self.rebalancer.on_new_node)
+        self.route.newNodeCallbacks.append(self.watches.on_new_node)
+        shardConfig = config.get("shard", {})
+        self.shard = Shard(
+            loop, self,
+            shardConfig["index"], shardConfig["count"], shardConfig["port"],
+            host = shardConfig.get("host", const.kad.shard.SHARD_HOST)
+        ) if shardConfig.get("count", 1) > 1 else None
+        if self.shard is not None:
+            self.route.newNodeCallbacks.append(self.shard.on_new_node)
+        virtualConfig = config.get("virtual", {})
+        virtualIds = [
+            utils.dump_node_hex(id) for id in virtualConfig.get("ids", [])
+        ] or VirtualNodes.make_ids(self.tcpService.node.id, virtualConfig.get("count", 1))
+        self.virtual = VirtualNodes(loop, self, virtualIds) if virtualIds else None
+        routeConfig = config.get("route", {})
+        self.snapshot = RouteSnapshot(
+            loop, self,
+            routeConfig["snapshot"],
+            routeConfig.get("interval", const.kad.snapshot.SNAPSHOT_INTERVAL)
+        ) if routeConfig.get("snapshot") else None
+
+        self.register_metrics()
+        metricsConfig = config.get("metrics", {})
+        self.metricsServer = MetricsServer(
+            loop, self.metrics,
+            host = metricsConfig.get("host", const.kad.server.METRICS_DEFAULT_HOST),
+            port = metricsConfig.get("port", const.kad.server.METRICS_DEFAULT_PORT)
+        ) if metricsConfig.get("enabled", False) else None
+        daemonConfig = config.get("daemon", {})
+        self.daemonServer = DaemonServer(
+            loop, self,
+            path = daemonConfig.get("path"),
+            host = daemonConfig.get("host", const.kad.server.DAEMON_DEFAULT_HOST),
+            port = daemonConfig.get("port", const.kad.server.DAEMON_DEFAULT_PORT)
+        ) if daemonConfig.get("enabled", False) else None
+
+    def register_metrics(self):
+        metrics = self.metrics
+        scheduler = self.tcpService.scheduler
+        admission = self.tcpService.server.admission
+        metrics.gauge(
+            "ddcm_event_queue_depth", "Events waiting in the event queue",
+            func = self.queue.qsize
+        )
+        metrics.gauge(
+            "ddcm_pending_calls", "Calls waiting for a pong",
+            func = lambda: len(self.handler.event_future)
+        )
+        metrics.gauge(
+            "ddcm_route_bucket_nodes", "Nodes in each k-bucket",
+            func = lambda: [
+                ({"bucket": index}, len(bucket))
+                for index, bucket in enumerate(self.route.buckets)
+            ]
+        )
+        metrics.gauge(
+            "ddcm_storage_bytes", "Bytes of values in local storage",
+            func = lambda: self.storage.size
+        )
+        metrics.gauge(
+            "ddcm_storage_keys", "Keys in local storage",
+            func = lambda: len(self.storage.data)
+        )
+        metrics.gauge(
+            "ddcm_storage_logical_bytes", "Bytes of values of all keys, before deduplication",
+            func = lambda: self.storage.logical
+        )
+        metrics.gauge(
+            "ddcm_storage_values", "Distinct values in local storage, garbage included",
+            func = lambda: len(self.storage.blobs)
+        )
+        metrics.gauge(
+            "ddcm_contacts_interned", "Contacts read off the wire and still in use",
+            func = lambda: len(self.tcpService.rpc.contacts)
+        )
+        metrics.gauge(
+            "ddcm_cache_entries", "Entries in the remote value cache",
+            func = lambda: len(self.cache)
+        )
+        metrics.gauge(
+            "ddcm_outbound_inflight", "Outbound connections open",
+            func = lambda: scheduler.inflight
+        )
+        metrics.gauge(
+            "ddcm_outbound_waiting", "Outbound sends waiting for a connection slot",
+            func = lambda: [
+                ({"priority": priority}, scheduler.depth(priority))
+                for priority in const.kad.scheduler.PRIORITIES
+            ]
+        )
+        metrics.counter(
+            "ddcm_outbound_wait_seconds_total", "Seconds outbound sends waited for a slot",
+            func = lambda: scheduler.waitTotal
+        )
+        metrics.gauge(
+            "ddcm_inbound_inflight", "Inbound connections being handled",
+            func = lambda: admission.inflight
+        )
+        metrics.counter(
+            "ddcm_inbound_refused_total", "Inbound messages refused",
+            func = lambda: [
+                ({"reason": "dropped"}, admission.dropped),
+                ({"reason": "limited"}, admission.limited),
+                ({"reason": "shed"}, admission.shed)
+            ]
+        )
 
     async def start(self):
         await self.tcpService.start()
+        if self.shard is not None:
+            await self.shard.start()
+        if self.metricsServer is not None:
+            await self.metricsServer.start_server()
+        if self.daemonServer is not None:
+            await self.daemonServer.start_server()
         self.__logger__.info("DDCM Service has been started.")
 
         await self.queue.put({
@@ -70,9 +227,19 @@ class Service(object):
             "data": None
         })
 
-        asyncio.ensure_future(self.handler.handle_events(self, self.loop))
+        asyncio.ensure_future(self.handler.handle_events(self, self.loop), loop = self.loop)
+        self.hotKeys.start()
+        self.watches.start()
+        if self.snapshot is not None:
+            self.snapshot.start()
 
     async def stop(self):
+        self.rebalancer.stop()
+        self.hotKeys.stop()
+        self.commits.stop()
+        self.watches.stop()
+        if self.snapshot is not None:
+            self.snapshot.stop()
         await self.queue.put({
             "service": const.kad.event.Service,
             "type": const.kad.event.SERVICE_SHUTDOWN,
@@ -80,26 +247,105 @@ class Service(object):
         })
 
         await self.tcpService.stop()
+        if self.shard is not None:
+            await self.shard.stop()
+        if self.metricsServer is not None:
+            await self.metricsServer.stop_server()
+        if self.daemonServer is not None:
+            await self.daemonServer.stop_server()
+        self.codec.close()
         self.__logger__.info("DDCM Service has been stopped.")
 
+    def neighbors(self, node, kSize = None):
+        """Neighbors
+
+        Returns:
+            [(distance, node)] closest to node we know, see Route
+        """
+        if self.virtual is None:
+            return self.route.findNeighbors(node, kSize = kSize)
+        return self.virtual.findNeighbors(node, kSize = kSize)
+
+    def contacts(self):
+        """Contacts
+
+        Returns:
+            Every contact we know, once
+        """
+        if self.virtual is None:
+            return list(self.route.getNodes())
+        return self.virtual.getNodes()
+
+    async def join(self):
+        """Join
+
+        Look our own ids up, so the k-buckets fill and the nodes near
+        each id learn it.
+        """
+        for node in self.virtual.nodes if self.virtual is not None else [self.tcpService.node]:
+            await self.find_node(node.id)
+
     async def store(self, key, value, cached = True):
         def get_store_future(node):
+            # Compressed once, peers which cannot read it get it raw
+            supported = self.codec.supports(node, codec)
             return self.tcpService.call.store(
                 node.remote,
                 key,
-                value
+                data if supported else value,
+                codec if supported else const.kad.codec.RAW,
+                timeout = self.route.getLatency(node).timeout()
             )
         queryNode = Node(key)
-        futures = []
-        commands = [get_store_future(node) for distance, node in self.route.findNeighbors(queryNode)]
-        for f in asyncio.as_completed(commands):
-            futures.append(await f)
-        for f in asyncio.as_completed(futures):
-            await f
+        trace = self.tracer.start("store", key)
+        codec, data = await self.codec.encode(value)
+        # Kept here first, a peer shown the key early can read it from us
         if cached:
-            await self.storage.store(key, value)
+            if self.shard is None or self.shard.owns(key):
+                await self.storage.store_encoded(key, codec, data)
+            else:
+                await self.shard.store(key, codec, data)
+        nodes = [
+            node for distance, node in
+            self.neighbors(queryNode, kSize = self.hotKeys.replicas(key))
+        ]
+        # A lost or busy replica does not fail the write
+        replies, called = await self.__query__(
+            nodes, get_store_future, len(nodes), trace = trace
+        )
+        if trace is not None:
+            trace.finish({"stored": len(replies)})
+        self.invalidate(key, value)
+        if cached:
+            self.watches.changed(key, value)
+        else:
+            self.watches.deliver(key, value)
         return True
 
+    def invalidate(self, key, value = None):
+        """Invalidate
+
+        Drop a cached remote value. A lookup already in flight for this
+        key will not fill the cache. If value is given, it is cached
+        instead, so a write is read back at once.
+        """
+        self.__lookups__.pop(key, None)
+        if value is None:
+            self.cache.invalidate(key)
+        else:
+            self.cache.put(key, value)
+
+    def __lookup_done__(self, key, lookup):
+        if self.__lookups__.get(key) is not lookup:
+            return
+        del self.__lookups__[key]
+        if lookup.cancelled() or lookup.exception() is not None:
+            return
+        self.cache.put(
+            key, lookup.result(),
+            ttl = const.kad.hotkey.HOT_CACHE_TTL if self.hotKeys.is_hot(key) else None
+        )
+
     async def find_value(self, key):
         if await self.storage.exist(key):
             self.__logger__.info("%(key)s - %(value)s from Local Storage" % {
@@ -107,33 +353,168 @@ class Service(object):
                 "value": await self.storage.get(key) if key == b"\x00" * 20 else ""
             })
             return await self.storage.get(key)
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        # Only one network lookup is in flight per key
+        lookup = self.__lookups__.get(key)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self.__find_value__(key), loop = self.loop)
+            lookup.add_done_callback(functools.partial(self.__lookup_done__, key))
+            self.__lookups__[key] = lookup
+        return await asyncio.shield(lookup, loop = self.loop)
+
+    async def find_values(self, keys):
+        """Find Values
+
+        Look keys up all at once.
+
+        Returns:
+            [value], None for a key not found
+        """
+        return await asyncio.gather(*[self.find_value(key) for key in keys], loop = self.loop)
+
+    async def __find_value__(self, key):
         def get_findValue_future(node):
             return self.tcpService.call.findValue(
                 node.remote,
-                key
+                key,
+                timeout = self.route.getLatency(node).timeout()
             )
         queryNode = Node(key)
-        futures = []
-        commands = [get_findValue_future(node) for distance, node in self.route.findNeighbors(queryNode)]
-        for f in asyncio.as_completed(commands):
-            futures.append(await f)
-        for f in asyncio.as_completed(futures):
-            return (await f)["data"]["data"][1]
-        return None
+        trace = self.tracer.start("find_value", key)
+        nodes = [
+            node for distance, node in
+            self.neighbors(queryNode, kSize = self.hotKeys.replicas(key))
+        ]
+        if self.hotKeys.is_hot(key):
+            # Spread reads over every replica, not the closest alpha
+            random.shuffle(nodes)
+        replies, called = await self.__query__(
+            nodes,
+            get_findValue_future,
+            self.config["query"]["alpha"],
+            lambda event: event["data"]["data"][1] is not None,
+            trace = trace,
+            exhaust = True
+        )
+        value = None
+        for node, event in replies:
+            _key, _value, hot = event["data"]["data"]
+            if hot:
+                self.hotKeys.mark_remote(key)
+            if _value is not None:
+                value = _value
+                break
+        if trace is not None:
+            trace.finish({"found": value is not None})
+        return value
+
+    async def __query__(self, nodes, call, width, until = None, trace = None, exhaust = False):
+        """Query
+
+        Call up to width nodes at once, in the given order. When a call
+        fails, or its pong is slower than the peer's p95 latency, the
+        next node is called as well (a hedged request).
+
+        Args:
+            nodes: Candidate nodes, preferred first
+            call:  Function(node) returning a coroutine of the call future
+            width: Number of pongs to wait for
+            until: Function(event), stop at the first pong it accepts
+            trace: Trace recording every call, or None
+            exhaust: A pong until rejects calls the next node instead of
+                     counting toward width
+        Returns:
+            ([(node, event)], [nodes called, including failed calls])
+        """
+        candidates = iter(nodes)
+        pending = {}
+        replies, called = [], []
+        counted = 0
+        if trace is not None:
+            trace.hops += 1
+
+        async def call_next():
+            for node in candidates:
+                called.append(node)
+                rpc = trace.send(node) if trace is not None else None
+                try:
+                    future = await call(node)
+                except OSError as e:
+                    if rpc is not None:
+                        trace.fail(rpc, e)
+                    continue
+                pending[future] = [node, self.loop.time() + self.route.getLatency(node).p95(), rpc]
+                return True
+            return False
+
+        try:
+            while len(pending) < width and await call_next():
+                pass
+            while pending and counted < width:
+                hedge_at = min(entry[1] for entry in pending.values())
+                done, _ = await asyncio.wait(
+                    list(pending),
+                    timeout = None if hedge_at == float("inf") else max(hedge_at - self.loop.time(), 0),
+                    return_when = asyncio.FIRST_COMPLETED,
+                    loop = self.loop
+                )
+                if not done:
+                    slow = [entry for entry in pending.values() if entry[1] <= hedge_at]
+                    for entry in slow:
+                        # Hedged once, the call now waits for its timeout
+                        entry[1] = float("inf")
+                        if entry[2] is not None:
+                            entry[2]["hedged"] = True
+                        await call_next()
+                    continue
+                # In call order, the done set is ordered by memory address
+                for future in [future for future in pending if future in done]:
+                    node, deadline, rpc = pending.pop(future)
+                    if future.cancelled() or future.exception() is not None:
+                        if rpc is not None:
+                            trace.fail(rpc, asyncio.CancelledError() if future.cancelled() else future.exception())
+                        if deadline != float("inf"):
+                            await call_next()
+                        continue
+                    if rpc is not None:
+                        trace.reply(rpc, future.result())
+                    replies.append((node, future.result()))
+                    if until is not None and until(future.result()):
+                        return replies, called
+                    if exhaust and until is not None:
+                        await call_next()
+                    else:
+                        counted += 1
+            return replies, called
+        finally:
+            for future in pending:
+                future.cancel()
 
     async def find_node(self, remoteId):
+        trace = self.tracer.start("find_node", remoteId)
+        node = await self.__find_node__(remoteId, trace)
+        if trace is not None:
+            trace.finish({"found": node is not None})
+        return node
+
+    async def __find_node__(self, remoteId, trace = None):
         # Check if node is already in Route
         alpha = self.config["query"]["alpha"]
         queryNode = Node(remoteId)
 
-        def get_findNode_future(node, id):
+        def get_findNode_future(node):
             return self.tcpService.call.findNode(
                 node.remote,
-                remoteId
+                remoteId,
+                timeout = self.route.getLatency(node).timeout()
             )
+        def is_found(event):
+            return any(node.id == remoteId for node in event["data"]["data"][2])
         longest_distance_list = utils.DelayList([2 ** 160])
         nodes_to_ping = {}
-        for distance, node in self.route.findNeighbors(queryNode)[:alpha]:
+        for distance, node in self.neighbors(queryNode):
             if distance == 0:
                 return node
             nodes_to_ping[node.id] = node
@@ -145,21 +526,23 @@ class Service(object):
 
             longest_distance = longest_distance_list.__next__()
 
-            node_to_query = list(nodes_to_ping.items())[:alpha]
-            commands = [
-                 get_findNode_future(node, remoteId)
-                 for (key, node) in node_to_query
-            ]
-            nodes_queried.extend([key for key, node in node_to_query])
-            nodes_to_ping.clear()
-
-            futures = []
-            for f in asyncio.as_completed(commands):
-                futures.append(await f)
+            # Nodes past the first alpha are left for hedged requests
+            node_to_query = sorted(
+                nodes_to_ping.values(),
+                key = lambda node: node.distance(queryNode.hash)
+            )
+            replies, called = await self.__query__(
+                node_to_query, get_findNode_future, alpha, is_found, trace
+            )
+            nodes_queried.extend([node.id for node in called])
+            for node in called:
+                del nodes_to_ping[node.id]
+            if not called:
+                return None
 
             __longest_distance = 2 ** 160
-            for f in asyncio.as_completed(futures):
-                _remoteId, count, remoteNodes = (await f)["data"]["data"]
+            for node, event in replies:
+                _remoteId, count, remoteNodes = event["data"]["data"]
                 for remoteNode in remoteNodes:
                     if remoteNode.id == remoteId:
                         return remoteNode
@@ -172,21 +555,32 @@ class Service(object):
             longest_distance_list.data.append(__longest_distance)
 
     async def get_latest_commit(self):
-        commit_id = (await self.find_value(b"\x00" * 20))
+        commit_id = (await self.find_value(const.kad.commit.HEAD))
         if commit_id == None:
             return None, None
-        commit_data = (await self.find_value(commit_id))
-        return commit_id, json.loads(commit_data.decode('utf-8'))
+        commit = await self.history.get(commit_id)
+        if commit is None:
+            # The head is written alongside its commit, and may be seen first
+            self.invalidate(commit_id)
+            return None, None
+        return commit_id, commit
 
     async def commit(self, data, cached = False):
-        commit_data = json.dumps({
-            "data": data,
-            "lstcommit": [],
-            "time": int(time.time()),
-            "author": self.config["node"]["id"]
-        }).encode('utf-8')
-        self.__hasher__.update(commit_data)
-        commit_id = self.__hasher__.digest()
-        await self.store(commit_id, commit_data)
-        await self.store(b"\x00" * 20, commit_id, cached)
-        return commit_id
+        return await self.commits.commit(data, cached)
+
+    def watch(self, key):
+        """Watch
+
+        Returns:
+            Watch of key, an async iterator of its values. Close it when
+            done
+        """
+        return self.watches.watch(key)
+
+    def watch_commits(self):
+        """Watch Commits
+
+        Returns:
+            Watch of the head, an async iterator of commit ids
+        """
+        return self.watches.watch(const.kad.commit.HEAD)
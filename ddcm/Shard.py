@@ -0,0 +1,173 @@
+import asyncio
+
+from . import utils
+from . import const
+
+from .Remote import Remote
+
+class Shard(object):
+    """Shard
+
+    One worker of a node run in several processes, one per core. The
+    workers have the node id and share its port, with SO_REUSEPORT, so
+    the kernel spreads connections and datagrams between them and the
+    network sees one peer. Each worker also listens on a port of its
+    own, which only the other workers use.
+
+    A worker keeps the keys of its shard in its Storage. A message
+    reaching the wrong worker is passed on to the right one as it came,
+    and that worker answers the sender itself:
+
+        STORE, FIND_VALUE, CAS, WATCH go to the worker of their key
+        pongs, BUSY and NOTIFY go to the worker which made the call,
+        its index is the first byte of the echo
+
+    Contacts a worker learns are sent to the others in SYNC messages,
+    batched every SHARD_SYNC_INTERVAL.
+
+    Vars:
+        index:   Index of this worker
+        count:   Number of workers
+        remotes: Own address of each worker
+        pending: Contacts learnt here, not sent to the others yet
+    """
+    def __init__(self, loop, service, index, count, port, host = const.kad.shard.SHARD_HOST):
+        """Shard
+
+        Args:
+            loop:    Asyncio Loop Object
+            service: Kademlia Service
+            index:   Index of this worker
+            count:   Number of workers
+            port:    Own port of worker 0, worker i listens on port + i.
+                     Set it apart from the ports of other nodes
+            host:    Host the workers listen on for each other
+        """
+        if not 0 <= index < count <= const.kad.shard.SHARD_MAX_COUNT:
+            raise ValueError("Shard %d of %d" % (index, count))
+        self.loop = loop
+        self.service = service
+        self.index = index
+        self.count = count
+        self.remotes = [Remote(host = host, port = port + i) for i in range(count)]
+        self.remote = self.remotes[index]
+        self.pending = []
+        self.syncing = False
+        self.server = None
+        self.worker = None
+        self.__tasks__ = set()
+
+        metrics = self.service.metrics
+        self.forwarded = metrics.counter(
+            "ddcm_shard_forwarded_total", "Messages passed on to the worker handling them"
+        )
+        self.synced_nodes = metrics.counter(
+            "ddcm_shard_synced_nodes_total", "Contacts received from the other workers"
+        )
+
+    def owner(self, key):
+        return int.from_bytes(key[:4], byteorder = "big") % self.count
+
+    def owns(self, key):
+        return self.owner(key) == self.index
+
+    def echo(self, echo):
+        return bytes([self.index]) + echo[1:]
+
+    def target(self, command, echo, data):
+        """Target
+
+        Returns:
+            Index of the worker to handle a message
+        """
+        if command in const.kad.command.KEYED:
+            return self.owner(data if command is const.kad.command.FIND_VALUE else data[0])
+        if command in const.kad.command.ANSWERS and echo[0] < self.count:
+            return echo[0]
+        return self.index
+
+    def spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine, loop = self.loop)
+        self.__tasks__.add(task)
+        task.add_done_callback(self.__tasks__.discard)
+        task.add_done_callback(self.service.handler.reply_done)
+        return task
+
+    def send(self, index, frame):
+        return self.spawn(self.service.tcpService.call.send_stream(
+            self.remotes[index], frame, const.kad.scheduler.PRIORITY_REPLY
+        ))
+
+    def forward(self, index, frame):
+        self.forwarded.inc()
+        return self.send(index, frame)
+
+    async def store(self, key, codec, data):
+        """Store
+
+        Hand a value written on this worker to the worker of its key,
+        where reads of the key go. A lost worker does not fail the write.
+        """
+        try:
+            await (await self.service.tcpService.call.store(
+                self.remotes[self.owner(key)], key, data, codec,
+                priority = const.kad.scheduler.PRIORITY_REPLY
+            ))
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+    def on_new_node(self, node):
+        if self.syncing:
+            return
+        self.pending.append(node)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.ensure_future(self.run(), loop = self.loop)
+
+    def synced(self, nodes):
+        """Synced
+
+        Contacts another worker learnt. They are not sent on again.
+        """
+        self.synced_nodes.inc(len(nodes))
+        self.syncing = True
+        try:
+            for node in nodes:
+                if self.service.virtual is not None:
+                    self.service.virtual.addNode(node)
+                elif node.id != self.service.tcpService.node.id:
+                    self.service.route.addNode(node)
+        finally:
+            self.syncing = False
+
+    def flush(self):
+        tcpService = self.service.tcpService
+        while self.pending:
+            nodes = self.pending[:const.kad.shard.SHARD_SYNC_MAX_NODES]
+            del self.pending[:const.kad.shard.SHARD_SYNC_MAX_NODES]
+            frame = tcpService.rpc.pack_sync(
+                tcpService.node, tcpService.server.remote, utils.get_echo_bytes(), nodes
+            )
+            for index in range(self.count):
+                if index != self.index:
+                    self.send(index, frame)
+
+    async def run(self):
+        while self.pending:
+            await asyncio.sleep(const.kad.shard.SHARD_SYNC_INTERVAL, loop = self.loop)
+            self.flush()
+
+    async def start(self):
+        self.server = await self.service.tcpService.transport.start_server(
+            self.service.tcpService.server.handle_forwarded,
+            self.remote.host, self.remote.port
+        )
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+        for task in list(self.__tasks__):
+            task.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
@@ -0,0 +1,69 @@
+import asyncio
+import copy
+import multiprocessing
+import signal
+
+from .Service import Service
+
+def run_shard(config):
+    """Run Shard
+
+    Run one worker of a node until it gets SIGTERM or SIGINT.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    service = Service(config, loop)
+    loop.run_until_complete(service.start())
+    stopped = asyncio.Event(loop = loop)
+    loop.add_signal_handler(signal.SIGTERM, stopped.set)
+    loop.add_signal_handler(signal.SIGINT, stopped.set)
+    try:
+        loop.run_until_complete(stopped.wait())
+        loop.run_until_complete(service.stop())
+    finally:
+        loop.close()
+
+class ShardGroup(object):
+    """ShardGroup
+
+    Runs one node in worker processes, one per core by default, each
+    with a shard of its keys. See Shard.
+
+    Vars:
+        configs:   Config of each worker
+        processes: Processes of the workers, while started
+    """
+    def __init__(self, config, count = None):
+        """ShardGroup
+
+        Args:
+            config: Config of the node. config["shard"] gives the port,
+                    and the host, the workers listen on for each other,
+                    see Shard
+            count:  Number of workers, default the number of cores
+        """
+        if "port" not in config.get("shard", {}):
+            raise ValueError("Workers need config[\"shard\"][\"port\"]")
+        self.count = count or multiprocessing.cpu_count()
+        self.configs = [self.make_config(config, index) for index in range(self.count)]
+        self.processes = []
+
+    def make_config(self, config, index):
+        config = copy.deepcopy(config)
+        shard = config.setdefault("shard", {})
+        shard["index"] = index
+        shard["count"] = self.count
+        return config
+
+    def start(self):
+        for config in self.configs:
+            process = multiprocessing.Process(target = run_shard, args = (config,), daemon = True)
+            process.start()
+            self.processes.append(process)
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
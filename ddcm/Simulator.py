@@ -0,0 +1,218 @@
+import asyncio
+import random
+import selectors
+import time
+
+from . import utils
+from . import const
+
+from .Cluster import Cluster
+from .MemoryTransport import MemoryNetwork
+
+class VirtualSelector(selectors.BaseSelector):
+    """VirtualSelector
+
+    Wraps a real selector. When the loop would sleep until its next
+    timer, the virtual clock jumps to it instead.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data = None):
+        return self.selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data = None):
+        return self.selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def close(self):
+        self.selector.close()
+
+    def select(self, timeout = None):
+        events = self.selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # Nothing scheduled, only another thread can wake the loop
+            return self.selector.select(None)
+        self.loop.now += timeout
+        return []
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    """VirtualLoop
+
+    Event loop on a virtual clock. Time only passes when every task is
+    waiting on a timer, so timeouts and intervals cost no real time.
+    Use it with a MemoryNetwork, real sockets do not wait for it.
+
+    Vars:
+        now: Virtual time in seconds
+    """
+    def __init__(self):
+        self.now = 0
+        super().__init__(VirtualSelector(self))
+
+    def time(self):
+        return self.now
+
+class Simulator(object):
+    """Simulator
+
+    Runs a Cluster on a MemoryNetwork in a VirtualLoop and measures
+    find_node lookups. A run is reproducible from its seed.
+    """
+    def __init__(
+        self, size,
+        seed = None,
+        config = None,
+        latency = const.kad.simulator.SIMULATOR_LATENCY,
+        jitter = const.kad.transport.MEMORY_JITTER,
+        loss = const.kad.transport.MEMORY_LOSS,
+        bandwidth = const.kad.transport.MEMORY_BANDWIDTH
+    ):
+        """Simulator
+
+        Args:
+            size:    Number of nodes
+            seed:    Seed of node ids, workload and network
+            config:  Cluster config template, for "kbucket" and "query"
+            latency, jitter, loss, bandwidth: Network model, see MemoryNetwork
+        """
+        self.size = size
+        self.seed = seed
+        # Node ids, workload, churn and network share one random source
+        self.random = random.Random(seed)
+        self.loop = VirtualLoop()
+        self.network = MemoryNetwork(
+            self.loop,
+            latency = latency,
+            jitter = jitter,
+            loss = loss,
+            bandwidth = bandwidth,
+            source = self.random
+        )
+        config = config or Cluster.default_config()
+        # Every lookup is traced, traces give the hop counts
+        config["trace"] = {"sample": 1, "size": None}
+        self.cluster = Cluster(
+            self.loop, size, config = config, network = self.network, source = self.random
+        )
+
+    def start(self):
+        self.__previous_loop__ = asyncio.get_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.cluster.start())
+
+    def stop(self):
+        self.loop.run_until_complete(self.cluster.stop())
+        self.loop.close()
+        asyncio.set_event_loop(self.__previous_loop__)
+
+    def churn(self, fraction):
+        """Churn
+
+        Cut a random fraction of the nodes off the network, and bring
+        back the nodes cut off before. The seed node stays online.
+        """
+        services = self.cluster.services[1:]
+        offline = self.random.sample(services, int(fraction * len(services)))
+        self.network.offline = set(
+            (service.config["server"]["host"], service.config["server"]["port"])
+            for service in offline
+        )
+
+    def online(self):
+        return [
+            service for service in self.cluster.services
+            if (service.config["server"]["host"], service.config["server"]["port"]) not in self.network.offline
+        ]
+
+    async def lookups(self, count, concurrency, churn, churnInterval):
+        indexes = iter(range(count))
+        async def worker():
+            for index in indexes:
+                services = self.online()
+                source, target = self.random.choice(services), self.random.choice(services)
+                await source.find_node(target.tcpService.node.id)
+        async def churner():
+            while True:
+                await asyncio.sleep(churnInterval, loop = self.loop)
+                self.churn(churn)
+        churning = asyncio.ensure_future(churner(), loop = self.loop) if churn else None
+        try:
+            # Started in order, so a seed gives one run
+            await asyncio.gather(
+                *[asyncio.ensure_future(worker(), loop = self.loop) for i in range(concurrency)],
+                loop = self.loop
+            )
+        finally:
+            if churning is not None:
+                churning.cancel()
+            self.network.offline = set()
+
+    def run(
+        self, count,
+        concurrency = const.kad.simulator.SIMULATOR_CONCURRENCY,
+        churn = 0,
+        churnInterval = const.kad.simulator.SIMULATOR_CHURN_INTERVAL
+    ):
+        """Run
+
+        Args:
+            count:         Number of find_node lookups, between random
+                           online nodes
+            concurrency:   Number of lookups in flight
+            churn:         Fraction of nodes offline at a time
+            churnInterval: Virtual seconds between changes of the
+                           offline nodes
+        Returns:
+            Report dict
+        """
+        for service in self.cluster.services:
+            service.tracer.traces.clear()
+        sent, bytes = self.network.sent, self.network.bytes
+        start, wallStart = self.loop.time(), time.time()
+        self.loop.run_until_complete(self.lookups(count, concurrency, churn, churnInterval))
+        traces = [
+            trace
+            for service in self.cluster.services
+            for trace in service.tracer.traces
+            if trace.kind == "find_node"
+        ]
+        hops = sorted(trace.hops for trace in traces)
+        rpcs = sorted(len(trace.rpcs) for trace in traces)
+        durations = sorted(trace.end for trace in traces)
+        found = sum(1 for trace in traces if trace.result["found"])
+        return {
+            "nodes": self.size,
+            "ksize": self.cluster.template["kbucket"]["ksize"],
+            "alpha": self.cluster.template["query"]["alpha"],
+            "seed": self.seed,
+            "churn": churn,
+            "lookups": len(traces),
+            "success_rate": found / len(traces) if traces else None,
+            "hops": {
+                "mean": sum(hops) / len(hops) if hops else None,
+                "p50": utils.percentile(hops, 50),
+                "p99": utils.percentile(hops, 99),
+                "max": hops[-1] if hops else None
+            },
+            "rpcs": {
+                "mean": sum(rpcs) / len(rpcs) if rpcs else None,
+                "p99": utils.percentile(rpcs, 99)
+            },
+            "latency": {
+                "p50": utils.percentile(durations, 50),
+                "p99": utils.percentile(durations, 99)
+            },
+            "messages": self.network.sent - sent,
+            "bytes": self.network.bytes - bytes,
+            "virtual_time": self.loop.time() - start,
+            "wall_time": time.time() - wallStart
+        }
@@ -1,16 +1,115 @@
+import collections
+import hashlib
+
+from . import const
+
+from .Codec import Codec
+
 class Storage(object):
     """Storage
 
-    An Object storing key-value pairs
+    An Object storing key-value pairs. Values are kept as they were
+    encoded, see Codec, and decoded when read.
+
+    A value is kept once, by the hash of its content, however many keys
+    hold it, with a count of those keys. A value no key holds any more
+    is garbage. It is kept while garbage is under STORAGE_GC_BYTES and
+    STORAGE_GC_VALUES, so a value stored again soon after costs
+    nothing, and past that each store frees STORAGE_GC_STEP values,
+    oldest first.
+
+    Vars:
+        data:    key -> content hash
+        blobs:   content hash -> [codec, data, keys holding it]
+        garbage: Content hashes which lost their last key, oldest first
+        size:    Bytes of data held, garbage included
+        garbageSize: Bytes of data of garbage
+        logical: Bytes of data of all keys, as if each kept its own
+        codec:   Codec decoding large values off the loop, None to
+                 decode in place
     """
-    def __init__(self):
+    def __init__(self, codec = None):
         self.data = {}
+        self.blobs = {}
+        self.garbage = collections.deque()
+        self.garbageSize = 0
+        self.size = 0
+        self.logical = 0
+        self.codec = codec
 
     async def store(self, key, value):
-        self.data[key] = value
+        await self.store_encoded(key, const.kad.codec.RAW, value)
+
+    async def store_encoded(self, key, codec, data):
+        digest = (codec, hashlib.sha1(data).digest())
+        old = self.data.get(key)
+        if old == digest:
+            return
+        blob = self.blobs.get(digest)
+        if blob is None:
+            blob = self.blobs[digest] = [codec, data, 0]
+            self.size += len(data)
+        elif blob[2] == 0:
+            # Garbage stored again, collect passes it over
+            self.garbageSize -= len(data)
+        blob[2] += 1
+        self.logical += len(data)
+        self.data[key] = digest
+        if old is not None:
+            self.release(old)
+        if (
+            self.garbageSize > const.kad.storage.STORAGE_GC_BYTES or
+            len(self.garbage) > const.kad.storage.STORAGE_GC_VALUES
+        ):
+            self.collect()
+
+    def release(self, digest):
+        blob = self.blobs[digest]
+        blob[2] -= 1
+        self.logical -= len(blob[1])
+        if blob[2] == 0:
+            self.garbage.append(digest)
+            self.garbageSize += len(blob[1])
+
+    def collect(self, limit = const.kad.storage.STORAGE_GC_STEP):
+        """Collect
+
+        Free up to limit values no key holds. A value stored again
+        since it became garbage is kept.
+
+        Returns:
+            Number of values freed
+        """
+        freed = 0
+        while self.garbage and freed < limit:
+            digest = self.garbage.popleft()
+            blob = self.blobs.get(digest)
+            if blob is not None and blob[2] == 0:
+                del self.blobs[digest]
+                self.size -= len(blob[1])
+                self.garbageSize -= len(blob[1])
+                freed += 1
+        return freed
 
     async def get(self, key):
-        return self.data[key]
+        codec, data = await self.get_encoded(key)
+        if codec == const.kad.codec.RAW:
+            return data
+        if self.codec is None:
+            return Codec.decompress(codec, data)
+        return await self.codec.decode(codec, data)
+
+    async def get_encoded(self, key):
+        """Get Encoded
+
+        Returns:
+            (codec, data) as stored
+        """
+        codec, data, references = self.blobs[self.data[key]]
+        return codec, data
 
     async def exist(self, key):
         return key in self.data
+
+    async def delete(self, key):
+        self.release(self.data.pop(key))
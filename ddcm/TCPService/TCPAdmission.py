@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+from .. import const
+
+class TokenBucket(object):
+    """TokenBucket
+
+    Allows `rate` events per second on average, and bursts of up to
+    `burst` events.
+    """
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = now
+
+    def consume(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class TCPAdmission(object):
+    """TCPAdmission
+
+    Decides which inbound messages are handled. Requests are rate
+    limited per remote node id and per address, and shed while the
+    event queue is too full. Replies to our own calls are always let in.
+
+    Vars:
+        inflight: Number of inbound connections being handled
+        accepted: Number of messages handled
+        dropped:  Number of connections closed over MAX_INBOUND
+        limited:  Number of requests over a rate limit
+        shed:     Number of requests shed for a full event queue
+    """
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self.peers = OrderedDict()
+        self.addresses = OrderedDict()
+        self.inflight = 0
+        self.accepted = 0
+        self.dropped = 0
+        self.limited = 0
+        self.shed = 0
+
+    def enter(self):
+        if self.inflight >= const.kad.admission.MAX_INBOUND:
+            self.dropped += 1
+            return False
+        self.inflight += 1
+        return True
+
+    def leave(self):
+        self.inflight -= 1
+
+    def get_bucket(self, buckets, key, rate, burst, now):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, burst, now)
+            buckets[key] = bucket
+            if len(buckets) > const.kad.admission.MAX_BUCKETS:
+                buckets.popitem(last = False)
+        else:
+            buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, command, host, nodeId):
+        """Admit
+
+        Args:
+            command: Command of the message
+            host:    Address the message came from
+            nodeId:  Id of the sending node
+        Returns:
+            True if the message should be handled, False to answer BUSY
+        """
+        if command not in const.kad.command.REQUESTS:
+            self.accepted += 1
+            return True
+        now = self.loop.time()
+        peer = self.get_bucket(
+            self.peers, nodeId,
+            const.kad.admission.PEER_RATE, const.kad.admission.PEER_BURST, now
+        )
+        address = self.get_bucket(
+            self.addresses, host,
+            const.kad.admission.ADDRESS_RATE, const.kad.admission.ADDRESS_BURST, now
+        )
+        if not (address.consume(now) and peer.consume(now)):
+            self.limited += 1
+            return False
+        if self.queue.qsize() >= const.kad.admission.QUEUE_SHED_THRESHOLD:
+            self.shed += 1
+            return False
+        self.accepted += 1
+        return True
+
+    def stats(self):
+        return {
+            "inflight": self.inflight,
+            "queue": self.queue.qsize(),
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "limited": self.limited,
+            "shed": self.shed
+        }
@@ -1,4 +1,24 @@
+import functools
+
 from .. import utils
+from .. import const
+
+class BufferWriter(object):
+    """BufferWriter
+
+    Collects a message packed by TCPProtocol, before it is sent.
+    """
+    def __init__(self):
+        self.buffer = []
+
+    def write(self, data):
+        self.buffer.append(data)
+
+    async def drain(self):
+        pass
+
+    def getvalue(self):
+        return b"".join(self.buffer)
 
 class TCPCall(object):
     """Command
@@ -8,104 +28,328 @@ class TCPCall(object):
         self.loop = loop
         self.service = service
 
-    def get_call_future(self, echo):
-        return self.service.handler.get_call_future(echo)
+        metrics = self.service.metrics
+        rpcDuration = metrics.by_command(
+            metrics.histogram,
+            "ddcm_rpc_duration_seconds", "Seconds from sending a request to its pong by command",
+            const.kad.command.REQUESTS
+        )
+        self.rpcDuration = {
+            const.kad.event.HANDLE_PONG_PING: rpcDuration[const.kad.command.PING],
+            const.kad.event.HANDLE_PONG_STORE: rpcDuration[const.kad.command.STORE],
+            const.kad.event.HANDLE_PONG_FIND_NODE: rpcDuration[const.kad.command.FIND_NODE],
+            const.kad.event.HANDLE_PONG_FIND_VALUE: rpcDuration[const.kad.command.FIND_VALUE],
+            const.kad.event.HANDLE_PONG_REDUCE: rpcDuration[const.kad.command.REDUCE],
+            const.kad.event.HANDLE_PONG_CAS: rpcDuration[const.kad.command.CAS],
+            const.kad.event.HANDLE_PONG_WATCH: rpcDuration[const.kad.command.WATCH]
+        }
+
+    def get_echo(self):
+        echo = utils.get_echo_bytes()
+        shard = self.service.service.shard
+        # Its pong reaches whichever worker, the echo says which made the call
+        return echo if shard is None else shard.echo(echo)
+
+    def get_call_future(self, echo, timeout = None):
+        return self.service.handler.get_call_future(echo, timeout)
+
+    def update_latency(self, start, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        event = future.result()
+        rtt = self.loop.time() - start
+        self.rpcDuration[event["type"]].observe(rtt)
+        self.service.service.route.updateLatency(event["data"]["remoteNode"], rtt)
+
+    def update_datagram_latency(self, sends, future):
+        # A pong after a retransmit may answer any attempt (Karn's algorithm)
+        if len(sends) == 1:
+            self.update_latency(sends[0], future)
+
+    async def pack(self, do_send, *data):
+        writer = BufferWriter()
+        await do_send(writer, *data)
+        return writer.getvalue()
+
+    async def send_stream(self, remote, frame, priority):
+        """Send Stream
+
+        Open a connection to remote, once the scheduler allows it, and
+        write one packed message.
+        """
+        scheduler = self.service.scheduler
+        await scheduler.acquire(remote, priority)
+        try:
+            reader, writer = await self.service.transport.connect(remote)
+            writer.write(frame)
+            await writer.drain()
+            writer.close()
+        finally:
+            scheduler.release(remote)
+
+    async def send(self, remote, do_send, *data, priority = const.kad.scheduler.PRIORITY_REPLY):
+        """Send
+
+        Send one reply, in a datagram if remote listens on UDP and the
+        reply is small, over TCP otherwise.
+
+        Args:
+            remote:   Remote Destination
+            do_send:  Protocol function writing the message
+            data:     Arguments of do_send after the writer
+            priority: Priority class of the message
+        """
+        frame = await self.pack(do_send, *data)
+        if self.service.udp.can_send(remote, frame, reply = True):
+            self.service.udp.sendto(remote, frame)
+        else:
+            await self.send_stream(remote, frame, priority)
+
+    async def call(
+        self, remote, do_send, do_event, *data,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
+        """Call
+
+        Register the pending call before sending, so the pong can never
+        arrive before its future exists. Small calls go in datagrams,
+        see UDPServer.
 
-    async def ping(self, remote):
+        Args:
+            remote:   Remote Destination
+            do_send:  Protocol function writing the message
+            do_event: Event function recording the message
+            data:     (echo, ...) passed to do_send and do_event
+            timeout:  Seconds to wait for the pong
+            priority: Priority class of the call
+        Returns:
+            Future of the pong event
+        """
+        if timeout is None:
+            timeout = const.kad.query.RPC_TIMEOUT
+        future = self.get_call_future(data[0], timeout)
+        try:
+            frame = await self.pack(do_send, *data)
+        except:
+            future.cancel()
+            raise
+
+        udp = self.service.udp
+        if udp.can_send(remote, frame):
+            sends = udp.call(
+                remote, frame, future, timeout,
+                functools.partial(self.send_stream, remote, frame, priority)
+            )
+            future.add_done_callback(functools.partial(self.update_datagram_latency, sends))
+            await do_event(remote, *data)
+            return future
+
+        scheduler = self.service.scheduler
+        try:
+            await scheduler.acquire(remote, priority)
+        except:
+            future.cancel()
+            raise
+        try:
+            if future.done():
+                # Timed out while waiting for a connection slot
+                return future
+            future.add_done_callback(functools.partial(self.update_latency, self.loop.time()))
+            reader, writer = await self.service.transport.connect(remote)
+            writer.write(frame)
+            await writer.drain()
+            writer.close()
+        except:
+            future.cancel()
+            raise
+        finally:
+            scheduler.release(remote)
+
+        await do_event(remote, *data)
+
+        return future
+
+    async def ping(
+        self, remote,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
         """Ping
 
         Args:
             remote: Remote Destination
+            timeout: Seconds to wait for the pong
+            priority: Priority class of the call
         Returns:
             Remote Node
         """
-        reader, writer = await remote.connect_tcp(self.loop)
-        echo = utils.get_echo_bytes()
-        await self.service.protocol._do_ping(writer, echo)
-        writer.close()
-
-        await self.service.event.do_ping(remote, echo)
-
-        return self.get_call_future(echo)
-
-    async def store(self, remote, key, value):
+        echo = self.get_echo()
+        return await self.call(
+            remote,
+            self.service.protocol._do_ping,
+            self.service.event.do_ping,
+            echo,
+            timeout = timeout,
+            priority = priority
+        )
+
+    async def store(
+        self, remote, key, value, codec = const.kad.codec.RAW,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
         """Store
 
         Args:
             remote: Remote Destination
             key: Key
             value: Value
+            codec: Codec value is encoded with, one remote reads
+            timeout: Seconds to wait for the pong
+            priority: Priority class of the call
         Returns:
             None
         """
-        echo = utils.get_echo_bytes()
-        data = (echo, key, value)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_store(writer, *data)
-        writer.close()
-
-        await self.service.event.do_store(remote, *data)
-
-        return self.get_call_future(echo)
-
-
-    async def findNode(self, remote, remoteId):
+        echo = self.get_echo()
+        data = (echo, key, value, codec)
+        return await self.call(
+            remote,
+            self.service.protocol._do_store,
+            self.service.event.do_store,
+            *data,
+            timeout = timeout,
+            priority = priority
+        )
+
+
+    async def findNode(
+        self, remote, remoteId,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
         """findNode
 
         Args:
             remote: Remote Destination
             remoteId: Remote Hash
+            timeout: Seconds to wait for the pong
+            priority: Priority class of the call
         Returns:
             (Remote ID, Remote Node)
         """
-        echo = utils.get_echo_bytes()
+        echo = self.get_echo()
         data = (echo, remoteId)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_findNode(writer, *data)
-        writer.close()
-
-        await self.service.event.do_findNode(remote, *data)
-
-        return self.get_call_future(echo)
-
-    async def findValue(self, remote, key):
+        return await self.call(
+            remote,
+            self.service.protocol._do_findNode,
+            self.service.event.do_findNode,
+            *data,
+            timeout = timeout,
+            priority = priority
+        )
+
+    async def findValue(
+        self, remote, key,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
         """findValue
 
         Args:
             remote: Remote Destination
             key: Key
+            timeout: Seconds to wait for the pong
+            priority: Priority class of the call
         Returns:
             (key, value)
         """
-        echo = utils.get_echo_bytes()
+        echo = self.get_echo()
         data = (echo, key)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_findValue(writer, *data)
-        writer.close()
+        return await self.call(
+            remote,
+            self.service.protocol._do_findValue,
+            self.service.event.do_findValue,
+            *data,
+            timeout = timeout,
+            priority = priority
+        )
+
+    async def cas(
+        self, remote, key, expected, value,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
+        """cas
+
+        Set key to value, if it holds expected.
 
-        await self.service.event.do_findValue(remote, *data)
-
-        return self.get_call_future(echo)
+        Args:
+            remote: Remote Destination
+            key: Key
+            expected: Value key must hold, None if it must not be stored
+            value: Value
+            timeout: Seconds to wait for the pong
+            priority: Priority class of the call
+        Returns:
+            (key, ok, current value)
+        """
+        echo = self.get_echo()
+        data = (echo, key, expected, value)
+        return await self.call(
+            remote,
+            self.service.protocol._do_cas,
+            self.service.event.do_cas,
+            *data,
+            timeout = timeout,
+            priority = priority
+        )
+
+    async def watch(
+        self, remote, key, lease,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
+        """watch
 
-    async def findReduce(self, remote, keyStart, keyEnd):
+        Args:
+            remote: Remote Destination
+            key: Key
+            lease: Seconds to watch for, 0 to stop watching
+            timeout: Seconds to wait for the pong
+            priority: Priority class of the call
+        Returns:
+            (key, lease granted, current value)
+        """
+        echo = self.get_echo()
+        data = (echo, key, lease)
+        return await self.call(
+            remote,
+            self.service.protocol._do_watch,
+            self.service.event.do_watch,
+            *data,
+            timeout = timeout,
+            priority = priority
+        )
+
+    async def findReduce(
+        self, remote, keyStart, keyEnd,
+        timeout = None, priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+    ):
         """findReduce
 
         Args:
             remote: Remote Destination
             keyStart: Start Key
             keyEnd: End Key
+            timeout: Seconds to wait for the pong
+            priority: Priority class of the call
         Returns:
             (keyStart, keyEnd, value)
         """
-        echo = utils.get_echo_bytes()
+        echo = self.get_echo()
         data = (echo, keyStart, keyEnd)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_reduce(writer, *data)
-        writer.close()
-
-        await self.service.event.do_reduce(remote, *data)
-
-        return self.get_call_future(echo)
+        return await self.call(
+            remote,
+            self.service.protocol._do_reduce,
+            self.service.event.do_reduce,
+            *data,
+            timeout = timeout,
+            priority = priority
+        )
 
     async def pong_ping(self, remote, echo):
         """pong_ping
@@ -116,9 +360,7 @@ class TCPCall(object):
         Returns:
             None
         """
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_pong_ping(writer, echo)
-        writer.close()
+        await self.send(remote, self.service.protocol._do_pong_ping, echo)
         await self.service.event.do_pong_ping(remote, echo)
 
     async def pong_store(self, remote, echo, key):
@@ -132,9 +374,7 @@ class TCPCall(object):
             None
         """
         data = (echo, key)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_pong_store(writer, *data)
-        writer.close()
+        await self.send(remote, self.service.protocol._do_pong_store, *data)
 
         await self.service.event.do_pong_store(remote, *data)
 
@@ -150,14 +390,12 @@ class TCPCall(object):
             None
         """
         data = (echo, remoteId, remoteNodes)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_pong_findNode(writer, *data)
-        writer.close()
+        await self.send(remote, self.service.protocol._do_pong_findNode, *data)
 
         await self.service.event.do_pong_findNode(remote, *data)
 
 
-    async def pong_findValue(self, remote, echo, key, value):
+    async def pong_findValue(self, remote, echo, key, value, hot = False, codec = const.kad.codec.RAW):
         """pong_findeValue
 
         Args:
@@ -165,13 +403,13 @@ class TCPCall(object):
             echo: Echo Value
             key: Key found
             value: value found
+            hot: Whether key is hot here
+            codec: Codec value is encoded with, one remote reads
         Returns:
             None
         """
         data = (echo, key, value)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_pong_findValue(writer, *data)
-        writer.close()
+        await self.send(remote, self.service.protocol._do_pong_findValue, *data, hot, codec)
 
         await self.service.event.do_pong_findValue(remote, *data)
 
@@ -188,8 +426,73 @@ class TCPCall(object):
             None
         """
         data = (echo, keyStart, keyEnd, value)
-        reader, writer = await remote.connect_tcp(self.loop)
-        await self.service.protocol._do_pong_reduce(writer, *data)
-        writer.close()
+        await self.send(remote, self.service.protocol._do_pong_reduce, *data)
 
         await self.service.event.do_pong_reduce(remote, *data)
+
+    async def busy(self, remote, echo):
+        """busy
+
+        Args:
+            remote: Remote Destination
+            echo: Echo Value of the Request Refused
+        Returns:
+            None
+        """
+        await self.send(remote, self.service.protocol._do_busy, echo)
+        await self.service.event.do_busy(remote, echo)
+
+    async def pong_cas(self, remote, echo, key, ok, current):
+        """pong_cas
+
+        Args:
+            remote: Remote Destination
+            echo: Echo Value
+            key: Key
+            ok: Whether value was set
+            current: Value key holds now
+        Returns:
+            None
+        """
+        data = (echo, key, ok, current)
+        await self.send(remote, self.service.protocol._do_pong_cas, *data)
+
+        await self.service.event.do_pong_cas(remote, *data)
+
+    async def pong_watch(self, remote, echo, key, lease, value):
+        """pong_watch
+
+        Args:
+            remote: Remote Destination
+            echo: Echo Value
+            key: Key watched
+            lease: Seconds granted
+            value: Value key holds now
+        Returns:
+            None
+        """
+        data = (echo, key, lease, value)
+        await self.send(remote, self.service.protocol._do_pong_watch, *data)
+
+        await self.service.event.do_pong_watch(remote, *data)
+
+    async def notify(self, remote, key, value, echo = None):
+        """notify
+
+        Push a new value to a watcher. No pong is sent back.
+
+        Args:
+            remote: Remote Destination
+            key: Key watched
+            value: New value
+            echo: Echo of the WATCH of the watcher, None for a new one
+        Returns:
+            None
+        """
+        data = (echo or utils.get_echo_bytes(), key, value)
+        await self.send(
+            remote, self.service.protocol._do_notify, *data,
+            priority = const.kad.scheduler.PRIORITY_INTERACTIVE
+        )
+
+        await self.service.event.do_notify(remote, *data)
@@ -14,7 +14,8 @@ class TCPEvent(object):
             await self.service.queue.put({
                 "service": const.kad.event.TCPService,
                 "type": event_type,
-                "data": data
+                "data": data,
+                "time": self.loop.time()
             })
 
     async def do_pong_ping(self, remote, echo):
@@ -40,17 +41,29 @@ class TCPEvent(object):
             "data": data
         })
 
+    async def do_busy(self, remote, echo):
+        await self.add_event(const.kad.event.SEND_BUSY, {
+            "remote": remote,
+            "echo": echo
+        })
+    async def handle_busy(self, echo, remoteNode, data):
+        await self.add_event(const.kad.event.HANDLE_BUSY, {
+            "remoteNode": remoteNode,
+            "echo": echo,
+            "data": data
+        })
+
     async def do_pong_store(self, remote, echo, key):
         await self.add_event(const.kad.event.SEND_PONG_STORE, {
             "remote": remote,
             "echo": echo,
             "data": (key)
         })
-    async def do_store(self, remote, echo, key, value):
+    async def do_store(self, remote, echo, key, value, codec = const.kad.codec.RAW):
         await self.add_event(const.kad.event.SEND_STORE, {
             "remote": remote,
             "echo": echo,
-            "data": (key, value)
+            "data": (key, value, codec)
         })
     async def handle_pong_store(self, echo, remoteNode, data):
         await self.add_event(const.kad.event.HANDLE_PONG_STORE, {
@@ -114,3 +127,66 @@ class TCPEvent(object):
             "echo": echo,
             "data": data
         })
+
+    async def do_pong_cas(self, remote, echo, key, ok, current):
+        await self.add_event(const.kad.event.SEND_PONG_CAS, {
+            "remote": remote,
+            "echo": echo,
+            "data": (key, ok, current)
+        })
+    async def do_cas(self, remote, echo, key, expected, value):
+        await self.add_event(const.kad.event.SEND_CAS, {
+            "remote": remote,
+            "echo": echo,
+            "data": (key, expected, value)
+        })
+    async def handle_pong_cas(self, echo, remoteNode, data):
+        await self.add_event(const.kad.event.HANDLE_PONG_CAS, {
+            "remoteNode": remoteNode,
+            "echo": echo,
+            "data": data
+        })
+    async def handle_cas(self, echo, remoteNode, data):
+        await self.add_event(const.kad.event.HANDLE_CAS, {
+            "remoteNode": remoteNode,
+            "echo": echo,
+            "data": data
+        })
+
+    async def do_pong_watch(self, remote, echo, key, lease, value):
+        await self.add_event(const.kad.event.SEND_PONG_WATCH, {
+            "remote": remote,
+            "echo": echo,
+            "data": (key, lease, value)
+        })
+    async def do_watch(self, remote, echo, key, lease):
+        await self.add_event(const.kad.event.SEND_WATCH, {
+            "remote": remote,
+            "echo": echo,
+            "data": (key, lease)
+        })
+    async def handle_pong_watch(self, echo, remoteNode, data):
+        await self.add_event(const.kad.event.HANDLE_PONG_WATCH, {
+            "remoteNode": remoteNode,
+            "echo": echo,
+            "data": data
+        })
+    async def handle_watch(self, echo, remoteNode, data):
+        await self.add_event(const.kad.event.HANDLE_WATCH, {
+            "remoteNode": remoteNode,
+            "echo": echo,
+            "data": data
+        })
+
+    async def do_notify(self, remote, echo, key, value):
+        await self.add_event(const.kad.event.SEND_NOTIFY, {
+            "remote": remote,
+            "echo": echo,
+            "data": (key, value)
+        })
+    async def handle_notify(self, echo, remoteNode, data):
+        await self.add_event(const.kad.event.HANDLE_NOTIFY, {
+            "remoteNode": remoteNode,
+            "echo": echo,
+            "data": data
+        })
@@ -17,7 +17,18 @@ class TCPProtocol(object):
 
         self.__logger__ = self.service.logger.get_logger("TCPProtocol")
 
+        metrics = self.service.metrics
+        self.messagesSent = metrics.by_command(
+            metrics.counter,
+            "ddcm_messages_sent_total", "Messages sent by command"
+        )
+        self.bytesSent = metrics.counter(
+            "ddcm_bytes_sent_total", "Bytes of messages sent"
+        )
+
     async def _do_send(self, writer, data):
+        self.messagesSent[data[0]].inc()
+        self.bytesSent.inc(len(data))
         writer.write(data)
         await writer.drain()
 
@@ -42,15 +53,16 @@ class TCPProtocol(object):
         )
 
 
-    async def _do_store(self, writer, echo, key, value):
+    async def _do_store(self, writer, echo, key, value, codec = const.kad.codec.RAW):
         await self._do_send(
             writer,
             self.service.rpc.pack_store(
-                self.service.node,
+                self.service.local(key),
                 self.service.server.remote,
                 echo,
                 key,
-                value
+                value,
+                codec
             )
         )
 
@@ -58,7 +70,7 @@ class TCPProtocol(object):
         await self._do_send(
             writer,
             self.service.rpc.pack_pong_store(
-                self.service.node,
+                self.service.local(key),
                 self.service.server.remote,
                 echo,
                 key
@@ -69,7 +81,7 @@ class TCPProtocol(object):
         await self._do_send(
             writer,
             self.service.rpc.pack_findNode(
-                self.service.node,
+                self.service.local(remoteId),
                 self.service.server.remote,
                 echo,
                 remoteId
@@ -80,7 +92,7 @@ class TCPProtocol(object):
         await self._do_send(
             writer,
             self.service.rpc.pack_pong_findNode(
-                self.service.node,
+                self.service.local(remoteId),
                 self.service.server.remote,
                 echo,
                 remoteId,
@@ -92,22 +104,24 @@ class TCPProtocol(object):
         await self._do_send(
             writer,
             self.service.rpc.pack_findValue(
-                self.service.node,
+                self.service.local(key),
                 self.service.server.remote,
                 echo,
                 key
             )
         )
 
-    async def _do_pong_findValue(self, writer, echo, key, value):
+    async def _do_pong_findValue(self, writer, echo, key, value, hot = False, codec = const.kad.codec.RAW):
         await self._do_send(
             writer,
             self.service.rpc.pack_pong_findValue(
-                self.service.node,
+                self.service.local(key),
                 self.service.server.remote,
                 echo,
                 key,
-                value
+                value,
+                hot,
+                codec
             )
         )
 
@@ -136,10 +150,75 @@ class TCPProtocol(object):
             )
         )
 
+    async def _do_cas(self, writer, echo, key, expected, value):
+        await self._do_send(
+            writer,
+            self.service.rpc.pack_cas(
+                self.service.local(key),
+                self.service.server.remote,
+                echo,
+                key,
+                expected,
+                value
+            )
+        )
+
+    async def _do_pong_cas(self, writer, echo, key, ok, current):
+        await self._do_send(
+            writer,
+            self.service.rpc.pack_pong_cas(
+                self.service.local(key),
+                self.service.server.remote,
+                echo,
+                key,
+                ok,
+                current
+            )
+        )
+
+    async def _do_watch(self, writer, echo, key, lease):
+        await self._do_send(
+            writer,
+            self.service.rpc.pack_watch(
+                self.service.local(key),
+                self.service.server.remote,
+                echo,
+                key,
+                lease
+            )
+        )
+
+    async def _do_pong_watch(self, writer, echo, key, lease, value):
+        await self._do_send(
+            writer,
+            self.service.rpc.pack_pong_watch(
+                self.service.local(key),
+                self.service.server.remote,
+                echo,
+                key,
+                lease,
+                value
+            )
+        )
+
+    async def _do_notify(self, writer, echo, key, value):
+        await self._do_send(
+            writer,
+            self.service.rpc.pack_notify(
+                self.service.local(key),
+                self.service.server.remote,
+                echo,
+                key,
+                value
+            )
+        )
+
     async def _handle_ping(self, echo, remoteNode, data):
+        self.service.service.codec.learn(remoteNode, data)
         await self.service.event.handle_ping(echo, remoteNode, data)
 
     async def _handle_pong_ping(self, echo, remoteNode, data):
+        self.service.service.codec.learn(remoteNode, data)
         await self.service.event.handle_pong_ping(echo, remoteNode, data)
 
     async def _handle_store(self, echo, remoteNode, data):
@@ -158,7 +237,26 @@ class TCPProtocol(object):
         await self.service.event.handle_findValue(echo, remoteNode, data)
 
     async def _handle_pong_findValue(self, echo, remoteNode, data):
-        await self.service.event.handle_pong_findValue(echo, remoteNode, data)
+        key, value, hot, codec = data
+        if value is not None:
+            # Large values are decompressed off the loop
+            value = await self.service.service.codec.decode(codec, value)
+        await self.service.event.handle_pong_findValue(echo, remoteNode, (key, value, hot))
+
+    async def _handle_cas(self, echo, remoteNode, data):
+        await self.service.event.handle_cas(echo, remoteNode, data)
+
+    async def _handle_pong_cas(self, echo, remoteNode, data):
+        await self.service.event.handle_pong_cas(echo, remoteNode, data)
+
+    async def _handle_watch(self, echo, remoteNode, data):
+        await self.service.event.handle_watch(echo, remoteNode, data)
+
+    async def _handle_pong_watch(self, echo, remoteNode, data):
+        await self.service.event.handle_pong_watch(echo, remoteNode, data)
+
+    async def _handle_notify(self, echo, remoteNode, data):
+        await self.service.event.handle_notify(echo, remoteNode, data)
 
     async def _handle_reduce(self, echo, remoteNode, data):
         pass
@@ -166,8 +264,23 @@ class TCPProtocol(object):
     async def _handle_pong_reduce(self, echo, remoteNode, data):
         pass
 
+    async def _do_busy(self, writer, echo):
+        await self._do_send(
+            writer,
+            self.service.rpc.pack_busy(
+                self.service.node,
+                self.service.server.remote,
+                echo
+            )
+        )
+
+    async def _handle_busy(self, echo, remoteNode, data):
+        await self.service.event.handle_busy(echo, remoteNode, data)
+
     async def handle(self, reader):
-        command, echo, remoteNode, data = await self.service.rpc.read_command(reader)
+        await self.dispatch(*await self.service.rpc.read_command(reader))
+
+    async def dispatch(self, command, echo, remoteNode, data):
         _data = (echo, remoteNode, data)
         if command is const.kad.command.PING:
             await self._handle_ping(*_data)
@@ -189,6 +302,18 @@ class TCPProtocol(object):
             await self._handle_reduce(*_data)
         elif command is const.kad.command.PONG_REDUCE:
             await self._handle_pong_reduce(*_data)
+        elif command is const.kad.command.BUSY:
+            await self._handle_busy(*_data)
+        elif command is const.kad.command.CAS:
+            await self._handle_cas(*_data)
+        elif command is const.kad.command.PONG_CAS:
+            await self._handle_pong_cas(*_data)
+        elif command is const.kad.command.WATCH:
+            await self._handle_watch(*_data)
+        elif command is const.kad.command.PONG_WATCH:
+            await self._handle_pong_watch(*_data)
+        elif command is const.kad.command.NOTIFY:
+            await self._handle_notify(*_data)
         else:
             # TODO: Handle Unknown Command
             pass
@@ -4,13 +4,15 @@ import socket
 
 from .. import const
 
+from ..Codec import CodecError
 from ..Remote import Remote
-from ..Node import Node
+from ..Contact import Contact, ContactTable
 
 class TCPRPC(object):
     def __init__(self, service, loop):
         self.service = service
         self.loop = loop
+        self.contacts = ContactTable()
 
     def pack_ping(self, local, remote, echo):
         """Pack Ping Message
@@ -27,7 +29,8 @@ class TCPRPC(object):
             struct.pack('B', const.kad.command.PING),
             echo,
             local.id,
-            self.pack_remote(remote)
+            self.pack_remote(remote),
+            struct.pack('B', const.kad.codec.CAPABILITIES)
         ])
 
     def pack_pong(self, local, remote, echo):
@@ -45,15 +48,37 @@ class TCPRPC(object):
             struct.pack('B', const.kad.command.PONG),
             echo,
             local.id,
+            self.pack_remote(remote),
+            struct.pack('B', const.kad.codec.CAPABILITIES)
+        ])
+
+    def pack_busy(self, local, remote, echo):
+        """Pack Busy Message
+
+        Args:
+            local: Self Node
+            remote: Self Address
+            echo: Recieved Echo Message of the Request Refused
+
+        Returns:
+            Packed Data to Send
+        """
+        return b"".join([
+            struct.pack('B', const.kad.command.BUSY),
+            echo,
+            local.id,
             self.pack_remote(remote)
         ])
 
     async def read_ping(self, reader):
-        return None
+        # Codecs the peer reads
+        return struct.unpack('B', await reader.readexactly(1))[0]
     async def read_pong(self, reader):
+        return struct.unpack('B', await reader.readexactly(1))[0]
+    async def read_busy(self, reader):
         return None
 
-    def pack_store(self, local, remote, echo, key, value):
+    def pack_store(self, local, remote, echo, key, value, codec = const.kad.codec.RAW):
         """Pack FindNode Message
 
         Args:
@@ -61,6 +86,7 @@ class TCPRPC(object):
             remote: Self Address
             echo: Random Echo Message
             key, value: (key, value) to save
+            codec: Codec value is encoded with
 
         Returns:
             Packed Data to Send
@@ -71,7 +97,7 @@ class TCPRPC(object):
             local.id,
             self.pack_remote(remote),
             key,
-            struct.pack('>L', len(value)),
+            struct.pack('>BL', codec, len(value)),
             value
         ])
 
@@ -97,9 +123,11 @@ class TCPRPC(object):
 
     async def read_store(self, reader):
         key = await reader.readexactly(20)
-        len_value = struct.unpack('>L', await reader.readexactly(4))[0]
+        codec, len_value = struct.unpack('>BL', await reader.readexactly(5))
+        if codec not in const.kad.codec.CODECS:
+            raise CodecError("Unknown codec %d" % codec)
         value = await reader.readexactly(len_value)
-        return key, value
+        return key, value, codec
 
     async def read_pong_store(self, reader):
         key = await reader.readexactly(20)
@@ -180,14 +208,16 @@ class TCPRPC(object):
             key
         ])
 
-    def pack_pong_findValue(self, local, remote, echo, key, value):
+    def pack_pong_findValue(self, local, remote, echo, key, value, hot = False, codec = const.kad.codec.RAW):
         """Pack Pong FindValue Message
 
         Args:
             local: Self Node
             remote: Self Address
             echo: Random Echo Message
-            key, value: (key, value) to send
+            key, value: (key, value) to send, value None if not stored
+            hot: Whether key is hot here, sent in the length
+            codec: Codec value is encoded with
 
         Returns:
             Packed Data to Send
@@ -198,8 +228,11 @@ class TCPRPC(object):
             local.id,
             self.pack_remote(self.service.server.remote),
             key,
-            struct.pack('>L', len(value)),
-            value
+            struct.pack('B', codec),
+            struct.pack('>L', const.kad.command.VALUE_MISS if value is None else (
+                len(value) | (const.kad.command.VALUE_HOT if hot else 0)
+            )),
+            value or b""
         ])
 
     async def read_findValue(self, reader):
@@ -208,9 +241,13 @@ class TCPRPC(object):
 
     async def read_pong_findValue(self, reader):
         key = await reader.readexactly(20)
-        len_value = struct.unpack('>L', await reader.readexactly(4))[0]
-        value = await reader.readexactly(len_value)
-        return key, value
+        codec, len_value = struct.unpack('>BL', await reader.readexactly(5))
+        if codec not in const.kad.codec.CODECS:
+            raise CodecError("Unknown codec %d" % codec)
+        if len_value == const.kad.command.VALUE_MISS:
+            return key, None, False, codec
+        value = await reader.readexactly(len_value & ~const.kad.command.VALUE_HOT)
+        return key, value, bool(len_value & const.kad.command.VALUE_HOT), codec
 
     def pack_reduce(self, local, remote, echo, keyStart, keyEnd):
         """Pack FindValue Message
@@ -269,15 +306,204 @@ class TCPRPC(object):
         value = await reader.readexactly(len_value)
         return keyStart, keyEnd, value
 
+    def pack_cas(self, local, remote, echo, key, expected, value):
+        """Pack Compare-And-Set Message
+
+        Args:
+            local: Self Node
+            remote: Self Address
+            echo: Random Echo Message
+            key: Key to set
+            expected: Value key must hold, None if it must not be stored
+            value: Value to set
+
+        Returns:
+            Packed Data to Send
+        """
+        return b"".join([
+            struct.pack('B', const.kad.command.CAS),
+            echo,
+            local.id,
+            self.pack_remote(remote),
+            key,
+            self.pack_value(expected),
+            struct.pack('>L', len(value)),
+            value
+        ])
+
+    def pack_pong_cas(self, local, remote, echo, key, ok, current):
+        """Pack Pong Compare-And-Set Message
+
+        Args:
+            local: Self Node
+            remote: Self Address
+            echo: Recieved Echo Message
+            key: Key
+            ok: Whether value was set
+            current: Value key holds now, None if not stored
+
+        Returns:
+            Packed Data to Send
+        """
+        return b"".join([
+            struct.pack('B', const.kad.command.PONG_CAS),
+            echo,
+            local.id,
+            self.pack_remote(remote),
+            key,
+            struct.pack('B', 1 if ok else 0),
+            self.pack_value(current)
+        ])
+
+    def pack_watch(self, local, remote, echo, key, lease):
+        """Pack Watch Message
+
+        Args:
+            local: Self Node
+            remote: Self Address
+            echo: Random Echo Message
+            key: Key to watch
+            lease: Seconds to watch for, 0 to stop watching
+
+        Returns:
+            Packed Data to Send
+        """
+        return b"".join([
+            struct.pack('B', const.kad.command.WATCH),
+            echo,
+            local.id,
+            self.pack_remote(remote),
+            key,
+            struct.pack('>H', lease)
+        ])
+
+    def pack_pong_watch(self, local, remote, echo, key, lease, value):
+        """Pack Pong Watch Message
+
+        Args:
+            local: Self Node
+            remote: Self Address
+            echo: Recieved Echo Message
+            key: Key watched
+            lease: Seconds granted, 0 if refused
+            value: Value key holds now, None if not stored
+
+        Returns:
+            Packed Data to Send
+        """
+        return b"".join([
+            struct.pack('B', const.kad.command.PONG_WATCH),
+            echo,
+            local.id,
+            self.pack_remote(remote),
+            key,
+            struct.pack('>H', lease),
+            self.pack_value(value)
+        ])
+
+    def pack_notify(self, local, remote, echo, key, value):
+        """Pack Notify Message
+
+        Args:
+            local: Self Node
+            remote: Self Address
+            echo: Random Echo Message
+            key: Key watched
+            value: New value of key
+
+        Returns:
+            Packed Data to Send
+        """
+        return b"".join([
+            struct.pack('B', const.kad.command.NOTIFY),
+            echo,
+            local.id,
+            self.pack_remote(remote),
+            key,
+            self.pack_value(value)
+        ])
+
+    def pack_sync(self, local, remote, echo, nodes):
+        """Pack Sync Message
+
+        Args:
+            local: Self Node
+            remote: Self Address
+            echo: Random Echo Message
+            nodes: Contacts learnt
+
+        Returns:
+            Packed Data to Send
+        """
+        return b"".join([
+            struct.pack('B', const.kad.command.SYNC),
+            echo,
+            local.id,
+            self.pack_remote(remote),
+            struct.pack('>H', len(nodes)),
+            *[
+                self.pack_node(node) for node in nodes
+            ]
+        ])
+
+    def pack_value(self, value):
+        return b"".join([
+            struct.pack('>L', const.kad.command.VALUE_MISS if value is None else len(value)),
+            value or b""
+        ])
+
+    async def read_value(self, reader):
+        len_value = struct.unpack('>L', await reader.readexactly(4))[0]
+        if len_value == const.kad.command.VALUE_MISS:
+            return None
+        return await reader.readexactly(len_value)
+
+    async def read_cas(self, reader):
+        key = await reader.readexactly(20)
+        expected = await self.read_value(reader)
+        value = await self.read_value(reader)
+        return key, expected, value
+
+    async def read_pong_cas(self, reader):
+        key = await reader.readexactly(20)
+        ok = struct.unpack('B', await reader.readexactly(1))[0]
+        current = await self.read_value(reader)
+        return key, bool(ok), current
+
+    async def read_watch(self, reader):
+        key = await reader.readexactly(20)
+        lease = struct.unpack('>H', await reader.readexactly(2))[0]
+        return key, lease
+
+    async def read_pong_watch(self, reader):
+        key = await reader.readexactly(20)
+        lease = struct.unpack('>H', await reader.readexactly(2))[0]
+        value = await self.read_value(reader)
+        return key, lease, value
+
+    async def read_notify(self, reader):
+        key = await reader.readexactly(20)
+        value = await self.read_value(reader)
+        return key, value
+
+    async def read_sync(self, reader):
+        count = struct.unpack('>H', await reader.readexactly(2))[0]
+        nodes = []
+        for i in range(count):
+            nodes.append(await self.read_node(reader))
+        return nodes
+
     def get_command_string(self, id):
         return const.kad.command.COMMANDS[id]
 
     def pack_remote(self, remote):
-        remote_ip = socket.inet_aton(remote.host)
-        return b"".join([
-            struct.pack('>BH', len(remote_ip), remote.port),
-            remote_ip
-        ])
+        if remote.packed is None:
+            remote_ip = socket.inet_aton(remote.host)
+            remote.packed = b"".join([
+                struct.pack('>BH', len(remote_ip), remote.port),
+                remote_ip
+            ])
+        return remote.packed
 
     async def read_remote(self, reader):
         ip_size, port = struct.unpack('>BH', await reader.readexactly(3))
@@ -288,17 +514,26 @@ class TCPRPC(object):
         )
 
     def pack_node(self, node):
+        if isinstance(node, Contact):
+            return node.packed
         return b"".join([
             node.id,
             self.pack_remote(node.remote)
         ])
 
     async def read_node(self, reader):
-        node = Node(
-            await reader.readexactly(20),
-            remote = await self.read_remote(reader)
-        )
-        return node
+        # Id, address size and port, then the address
+        head = await reader.readexactly(23)
+        packed = head + await reader.readexactly(head[20])
+        contact = self.contacts.find(packed)
+        if contact is None:
+            port = struct.unpack_from('>H', head, 21)[0]
+            contact = self.contacts.intern(Contact(
+                head[:20],
+                Remote(host = socket.inet_ntoa(packed[23:]), port = port, packed = packed[20:]),
+                packed
+            ))
+        return contact
 
     async def read_command(self, reader):
         """Read Command
@@ -311,10 +546,7 @@ class TCPRPC(object):
         """
         command = struct.unpack('B', await reader.readexactly(1))[0]
         echo = await reader.readexactly(20)
-        remoteNode = Node(
-            id = await reader.readexactly(20),
-            remote = await self.read_remote(reader)
-        )
+        remoteNode = await self.read_node(reader)
         data = (command, echo, remoteNode)
         if command is const.kad.command.PING:
             return (*data, await self.read_ping(reader))
@@ -336,3 +568,17 @@ class TCPRPC(object):
             return (*data, await self.read_reduce(reader))
         elif command is const.kad.command.PONG_REDUCE:
             return (*data, await self.read_pong_reduce(reader))
+        elif command is const.kad.command.BUSY:
+            return (*data, await self.read_busy(reader))
+        elif command is const.kad.command.CAS:
+            return (*data, await self.read_cas(reader))
+        elif command is const.kad.command.PONG_CAS:
+            return (*data, await self.read_pong_cas(reader))
+        elif command is const.kad.command.WATCH:
+            return (*data, await self.read_watch(reader))
+        elif command is const.kad.command.PONG_WATCH:
+            return (*data, await self.read_pong_watch(reader))
+        elif command is const.kad.command.NOTIFY:
+            return (*data, await self.read_notify(reader))
+        elif command is const.kad.command.SYNC:
+            return (*data, await self.read_sync(reader))
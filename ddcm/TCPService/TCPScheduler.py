@@ -0,0 +1,155 @@
+import asyncio
+
+from collections import OrderedDict, deque
+
+from .. import const
+
+class TCPScheduler(object):
+    """TCPScheduler
+
+    Limits outbound connections, in total and per peer. Waiting sends
+    are served by priority class, then round-robin across peers, so one
+    busy peer cannot hold back the others.
+
+    Vars:
+        inflight:     Number of connections open
+        waiting:      Number of sends waiting for a slot
+        peerInflight: Connections open per peer, (host, port) -> count
+        queues:       Per priority, (host, port) -> deque of waiters
+        waitCount:    Number of sends that had to wait
+        waitTotal:    Total seconds spent waiting
+        waitMax:      Longest wait in seconds
+    """
+    def __init__(
+        self, loop,
+        maxInflight = const.kad.scheduler.MAX_INFLIGHT,
+        maxInflightPerPeer = const.kad.scheduler.MAX_INFLIGHT_PER_PEER
+    ):
+        self.loop = loop
+        self.maxInflight = maxInflight
+        self.maxInflightPerPeer = maxInflightPerPeer
+        self.inflight = 0
+        self.waiting = 0
+        self.peerInflight = {}
+        self.queues = {
+            priority: OrderedDict()
+            for priority in const.kad.scheduler.PRIORITIES
+        }
+        self.waitCount = 0
+        self.waitTotal = 0
+        self.waitMax = 0
+
+    def get_peer(self, remote):
+        return (remote.host, remote.port)
+
+    def is_free(self, peer):
+        return self.inflight < self.maxInflight and \
+            self.peerInflight.get(peer, 0) < self.maxInflightPerPeer
+
+    def take(self, peer):
+        self.inflight += 1
+        self.peerInflight[peer] = self.peerInflight.get(peer, 0) + 1
+
+    async def acquire(self, remote, priority = const.kad.scheduler.PRIORITY_INTERACTIVE):
+        """Acquire
+
+        Wait for a connection slot to remote. Every acquire must be
+        followed by a release.
+        """
+        peer = self.get_peer(remote)
+        if self.is_free(peer) and not self.waiting:
+            self.take(peer)
+            return
+        waiter = asyncio.Future(loop = self.loop)
+        queue = self.queues[priority]
+        if peer not in queue:
+            queue[peer] = deque()
+        queue[peer].append((waiter, self.loop.time()))
+        self.waiting += 1
+        self.dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(remote)
+            else:
+                self.forget(priority, peer, waiter)
+            raise
+
+    def forget(self, priority, peer, waiter):
+        # A cancelled waiter leaves its queue at once, wherever it stands
+        waiters = self.queues[priority].get(peer)
+        if waiters is None:
+            return
+        for entry in waiters:
+            if entry[0] is waiter:
+                waiters.remove(entry)
+                self.waiting -= 1
+                break
+        if not waiters:
+            del self.queues[priority][peer]
+
+    def release(self, remote):
+        peer = self.get_peer(remote)
+        self.inflight -= 1
+        self.peerInflight[peer] -= 1
+        if self.peerInflight[peer] == 0:
+            del self.peerInflight[peer]
+        self.dispatch()
+
+    def dispatch(self):
+        granted = True
+        while granted and self.waiting and self.inflight < self.maxInflight:
+            granted = False
+            for priority in const.kad.scheduler.PRIORITIES:
+                queue = self.queues[priority]
+                for peer in list(queue):
+                    waiters = queue.pop(peer)
+                    while waiters and waiters[0][0].cancelled():
+                        waiters.popleft()
+                        self.waiting -= 1
+                    if waiters and self.is_free(peer):
+                        waiter, queued = waiters.popleft()
+                        self.waiting -= 1
+                        self.take(peer)
+                        self.record_wait(self.loop.time() - queued)
+                        waiter.set_result(None)
+                        granted = True
+                    if waiters:
+                        # Round-robin, the peer goes to the back of the queue
+                        queue[peer] = waiters
+                    if granted:
+                        break
+                if granted:
+                    break
+
+    def record_wait(self, wait):
+        self.waitCount += 1
+        self.waitTotal += wait
+        self.waitMax = max(self.waitMax, wait)
+
+    def depth(self, priority = None):
+        """Depth
+
+        Returns:
+            Number of sends waiting, in one priority class or in all
+        """
+        priorities = const.kad.scheduler.PRIORITIES if priority is None else [priority]
+        return sum(
+            len(waiters)
+            for priority in priorities
+            for waiters in self.queues[priority].values()
+        )
+
+    def stats(self):
+        return {
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "depth": {
+                priority: self.depth(priority)
+                for priority in const.kad.scheduler.PRIORITIES
+            },
+            "wait_count": self.waitCount,
+            "wait_total": self.waitTotal,
+            "wait_max": self.waitMax
+        }
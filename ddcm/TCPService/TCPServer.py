@@ -5,6 +5,35 @@ from .. import utils
 from .. import const
 
 from ..Remote import Remote
+from .TCPAdmission import TCPAdmission
+
+class MeteredReader(object):
+    """MeteredReader
+
+    Counts bytes read through a StreamReader, and keeps them if asked
+    to, so a message can be passed on as it came.
+    """
+    def __init__(self, reader, record = False):
+        self.reader = reader
+        self.count = 0
+        self.chunks = [] if record else None
+
+    async def readexactly(self, n):
+        data = await self.reader.readexactly(n)
+        self.count += n
+        if self.chunks is not None:
+            self.chunks.append(data)
+        return data
+
+    async def read(self, n = -1):
+        data = await self.reader.read(n)
+        self.count += len(data)
+        if self.chunks is not None:
+            self.chunks.append(data)
+        return data
+
+    def getvalue(self):
+        return b"".join(self.chunks)
 
 class TCPServer(object):
     """TCP Server
@@ -40,18 +69,78 @@ class TCPServer(object):
             host = host,
             port = port
         )
+        self.admission = TCPAdmission(loop, service.queue)
+
+        metrics = self.service.metrics
+        self.messagesReceived = metrics.by_command(
+            metrics.counter,
+            "ddcm_messages_received_total", "Messages received by command"
+        )
+        self.handleDuration = metrics.by_command(
+            metrics.histogram,
+            "ddcm_handle_duration_seconds", "Seconds to read and handle a message by command"
+        )
+        self.bytesReceived = metrics.counter(
+            "ddcm_bytes_received_total", "Bytes of messages received"
+        )
 
     async def handle(self, reader, writer):
-        remote = Remote()
-        remote.host, remote.port = writer.get_extra_info("peername")
-        data = await self.service.protocol.handle(reader)
-        writer.close()
+        try:
+            await self.handle_message(reader, writer.get_extra_info("peername")[0])
+        finally:
+            writer.close()
+
+    async def handle_forwarded(self, reader, writer):
+        try:
+            await self.handle_message(reader, writer.get_extra_info("peername")[0], forwarded = True)
+        finally:
+            writer.close()
+
+    async def handle_message(self, reader, host, forwarded = False):
+        """Handle Message
+
+        Read one message and dispatch it, whether it came over TCP or UDP.
+        When the node runs in shards, a message for another worker is
+        passed on to it, see Shard.
+
+        Args:
+            reader:    Reader of the message
+            host:      Host the message came from
+            forwarded: The message was passed on by another worker, and
+                       was admitted there
+        """
+        if not self.admission.enter():
+            return
+        start = self.loop.time()
+        shard = self.service.service.shard
+        reader = MeteredReader(reader, record = shard is not None and not forwarded)
+        try:
+            command, echo, remoteNode, data = await self.service.rpc.read_command(reader)
+            self.messagesReceived[command].inc()
+            target = shard.target(command, echo, data) if reader.chunks is not None else None
+            if command is const.kad.command.SYNC:
+                # Only workers of this node send it, to their own ports
+                if forwarded and shard is not None:
+                    shard.synced(data)
+            elif not forwarded and not self.admission.admit(command, host, remoteNode.id):
+                self.service.handler.reply(
+                    self.service.call.busy(remoteNode.remote, echo),
+                    self.loop
+                )
+            elif target is not None and target != shard.index:
+                shard.forward(target, reader.getvalue())
+            else:
+                await self.service.protocol.dispatch(command, echo, remoteNode, data)
+            self.handleDuration[command].observe(self.loop.time() - start)
+        finally:
+            self.bytesReceived.inc(reader.count)
+            self.admission.leave()
 
     async def start_server(self):
-        self.server = await asyncio.start_server(
+        self.server = await self.service.transport.start_server(
             self.handle,
             self.host, self.port,
-            loop = self.loop
+            reuse_port = self.service.service.shard is not None
         )
         return self.server
 
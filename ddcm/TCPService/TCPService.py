@@ -9,6 +9,9 @@ from .TCPProtocol import TCPProtocol
 from .TCPRPC import TCPRPC
 from .TCPCall import TCPCall
 from .TCPEvent import TCPEvent
+from .TCPScheduler import TCPScheduler
+from .UDPServer import UDPServer
+from ..Transport import TCPTransport
 
 class TCPService(object):
     """TCPService
@@ -21,14 +24,20 @@ class TCPService(object):
         node:      Present Node on TCP
         rpc:       Kademlia Message Compress Module for TCP
         call:      Remote Call Service on TCP Protocol
+        scheduler: Limits and orders outbound connections
+        transport: Carries messages to peers, TCP sockets by default
+        udp:       Carries small messages as datagrams
 
     """
-    def __init__(self, config, service, loop):
+    def __init__(self, config, service, loop, transport = None):
         self.loop = loop
         self.service = service
         self.config = config
         self.logger = self.service.logger
         self.__logger__ = self.logger.get_logger("TCPService")
+        self.queue = self.service.queue
+        self.metrics = self.service.metrics
+        self.transport = transport or TCPTransport(self.loop)
 
         self.server = TCPServer(
             service = self,
@@ -36,6 +45,12 @@ class TCPService(object):
             host = self.config["server"]["host"],
             port = self.config["server"]["port"]
         )
+        self.udp = UDPServer(
+            service = self,
+            loop = self.loop,
+            host = self.config["server"]["host"],
+            port = self.config["server"]["port"]
+        )
         self.rpc = TCPRPC(
             service = self,
             loop = self.loop
@@ -44,6 +59,7 @@ class TCPService(object):
             service = self,
             loop = self.loop
         )
+        self.scheduler = TCPScheduler(self.loop)
         self.call = TCPCall(
             service = self,
             loop = self.loop
@@ -59,17 +75,29 @@ class TCPService(object):
             service = self,
             loop = self.loop
         )
-        self.queue = self.service.queue
         self.storage = self.service.storage
         self.route = Route(self, loop, config["kbucket"]["ksize"], self.node)
         self.handler = self.service.handler
 
 
+    def local(self, key):
+        """Local
+
+        Returns:
+            Node speaking for key, the node or its virtual node closest
+            to key
+        """
+        virtual = self.service.virtual
+        return self.node if virtual is None else virtual.closest(key)
+
     async def start(self):
         await self.server.start_server()
+        if self.config["server"].get("udp", True):
+            await self.udp.start_server()
         self.__logger__.info("DDCM TCP Service has been started.")
         self.__logger__.info("DDCM TCP Service is listening on " + self.config["server"]["host"] + ":" + str(self.config["server"]["port"]))
 
     async def stop(self):
+        await self.udp.stop_server()
         await self.server.stop_server()
         self.__logger__.info("DDCM TCP Service has been stopped.")
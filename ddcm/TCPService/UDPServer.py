@@ -0,0 +1,145 @@
+import asyncio
+
+from collections import OrderedDict
+
+from .. import const
+
+class UDPServer(object):
+    """UDP Server
+
+    Carries small messages as single datagrams, on the same port number
+    as the TCP server. A message is one TCPRPC frame either way.
+
+    A call is sent again with the same echo until its pong arrives. Its
+    last attempt goes over TCP, and a peer which never answered over UDP
+    is then only reached over TCP, until a datagram comes from it.
+
+    The source of a datagram may be forged, so it is not trusted: replies
+    only go in datagrams to peers which answered a datagram call of ours,
+    others are answered over TCP.
+
+    Vars:
+        peers:    (host, port) -> True if the peer answered a datagram
+                  call, False if it only answered over TCP. The last
+                  UDP_MAX_PEERS learnt
+        endpoint: Datagram endpoint, None if not started or unsupported
+    """
+    def __init__(self, loop, service, host, port):
+        self.loop = loop
+        self.service = service
+        self.host, self.port = host, port
+        self.endpoint = None
+        self.peers = OrderedDict()
+
+        metrics = self.service.metrics
+        self.datagramsSent = metrics.counter(
+            "ddcm_datagrams_sent_total", "Datagrams sent, including retransmits"
+        )
+        self.datagramsReceived = metrics.counter(
+            "ddcm_datagrams_received_total", "Datagrams received"
+        )
+        self.retransmits = metrics.counter(
+            "ddcm_datagram_retransmits_total", "Calls sent again for a lost datagram"
+        )
+        self.fallbacks = metrics.counter(
+            "ddcm_datagram_fallbacks_total", "Calls sent over TCP after no pong over UDP"
+        )
+
+    def can_send(self, remote, frame, reply = False):
+        """Can Send
+
+        Args:
+            remote: Remote Destination
+            frame:  Packed message
+            reply:  Whether the message answers a call. Replies only go
+                    to peers known to listen on UDP
+        Returns:
+            Whether frame should be sent as a datagram
+        """
+        if self.endpoint is None or len(frame) > const.kad.datagram.UDP_MTU:
+            return False
+        if not frame[0] in const.kad.command.DATAGRAMS:
+            return False
+        known = self.peers.get((remote.host, remote.port))
+        return known is True if reply else known is not False
+
+    def learn(self, remote, udp):
+        address = (remote.host, remote.port)
+        self.peers[address] = udp
+        self.peers.move_to_end(address)
+        while len(self.peers) > const.kad.datagram.UDP_MAX_PEERS:
+            self.peers.popitem(last = False)
+
+    def sendto(self, remote, frame):
+        self.datagramsSent.inc()
+        self.endpoint.sendto(frame, (remote.host, remote.port))
+
+    def call(self, remote, frame, future, timeout, fallback):
+        """Call
+
+        Send a call as a datagram, and again every timeout / UDP_ATTEMPTS
+        seconds until future is done. The last attempt runs fallback.
+
+        Args:
+            remote:   Remote Destination
+            frame:    Packed call
+            future:   Future of the pong
+            timeout:  Seconds the call waits for its pong
+            fallback: Function returning a coroutine sending frame over TCP
+        Returns:
+            List of the times of the attempts so far
+        """
+        interval = timeout / const.kad.datagram.UDP_ATTEMPTS
+        sends = []
+        def fallback_done(task):
+            # A peer refusing TCP as well fails the call at once
+            if not task.cancelled() and task.exception() is not None and not future.done():
+                future.set_exception(task.exception())
+        def answered(future):
+            # Answered before the fallback, so our datagram reached it
+            if not future.cancelled() and future.exception() is None \
+                and len(sends) < const.kad.datagram.UDP_ATTEMPTS:
+                self.learn(remote, True)
+        def attempt(count):
+            if future.done() or self.endpoint is None:
+                return
+            sends.append(self.loop.time())
+            if count == const.kad.datagram.UDP_ATTEMPTS - 1:
+                self.fallbacks.inc()
+                self.learn(remote, False)
+                self.service.handler.reply(fallback(), self.loop).add_done_callback(fallback_done)
+                return
+            if count > 0:
+                self.retransmits.inc()
+            self.sendto(remote, frame)
+            handle = self.loop.call_later(interval, attempt, count + 1)
+            future.add_done_callback(lambda future: handle.cancel())
+        future.add_done_callback(answered)
+        attempt(0)
+        return sends
+
+    def handle(self, data, address):
+        self.datagramsReceived.inc()
+        # Try it over UDP again, it only gets datagrams once it answers
+        if self.peers.get(address[:2]) is False:
+            del self.peers[address[:2]]
+        reader = asyncio.StreamReader(loop = self.loop)
+        reader.feed_data(data)
+        reader.feed_eof()
+        self.service.handler.reply(
+            self.service.server.handle_message(reader, address[0]),
+            self.loop
+        )
+
+    async def start_server(self):
+        self.endpoint = await self.service.transport.start_datagram(
+            self.handle,
+            self.host, self.port,
+            reuse_port = self.service.service.shard is not None
+        )
+        return self.endpoint
+
+    async def stop_server(self):
+        if self.endpoint is not None:
+            self.endpoint.close()
+            self.endpoint = None
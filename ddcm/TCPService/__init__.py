@@ -1 +1,4 @@
 from .TCPService import TCPService
+from .TCPScheduler import TCPScheduler
+from .UDPServer import UDPServer
+from .TCPAdmission import TCPAdmission, TokenBucket
@@ -0,0 +1,85 @@
+import math
+
+class TimerWheel(object):
+    """TimerWheel
+
+    A hashed timer wheel. Each timer is put into one of `slots` buckets
+    by its deadline, and a single loop callback advances the wheel every
+    `tick` seconds while any timer is pending. Adding and cancelling a
+    timer are O(1), and a tick only visits the buckets it passes.
+    """
+    def __init__(self, loop, tick, slots):
+        """TimerWheel
+
+        Args:
+            loop:  Asyncio Loop Object
+            tick:  Resolution of the wheel in seconds
+            slots: Number of buckets in the wheel
+        """
+        self.loop = loop
+        self.tick = tick
+        self.wheel = [{} for i in range(slots)]
+        self.timers = {}
+        self.origin = None
+        self.current = 0
+        self.handle = None
+
+    def now_tick(self):
+        return int((self.loop.time() - self.origin) / self.tick)
+
+    def add(self, key, timeout, callback):
+        """Add
+
+        Args:
+            key:      Hashable timer key, unique among pending timers
+            timeout:  Seconds until callback is called
+            callback: Function called with key on expiry
+        """
+        if self.origin is None:
+            self.origin = self.loop.time()
+        self.cancel(key)
+        expire = max(
+            int(math.ceil((self.loop.time() + timeout - self.origin) / self.tick)),
+            self.current + 1
+        )
+        slot = expire % len(self.wheel)
+        self.wheel[slot][key] = (expire, callback)
+        self.timers[key] = slot
+        if self.handle is None:
+            self.handle = self.loop.call_later(self.tick, self.__tick__)
+
+    def cancel(self, key):
+        slot = self.timers.pop(key, None)
+        if slot is None:
+            return False
+        del self.wheel[slot][key]
+        return True
+
+    def __tick__(self):
+        self.handle = None
+        target = self.now_tick()
+        expired = []
+        # Every bucket is visited at most once, even after a long stall
+        end = min(target, self.current + len(self.wheel))
+        for tick in range(self.current + 1, end + 1):
+            bucket = self.wheel[tick % len(self.wheel)]
+            if not bucket:
+                continue
+            for key, (expire, callback) in list(bucket.items()):
+                if expire <= target:
+                    del bucket[key]
+                    del self.timers[key]
+                    expired.append((key, callback))
+        self.current = max(self.current, target)
+        if self.timers:
+            self.handle = self.loop.call_later(self.tick, self.__tick__)
+        for key, callback in expired:
+            callback(key)
+
+    def stop(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def __len__(self):
+        return len(self.timers)
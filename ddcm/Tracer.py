@@ -0,0 +1,118 @@
+import json
+import random
+
+from collections import deque
+
+from . import utils
+from . import const
+
+class Trace(object):
+    """Trace
+
+    Timeline of one lookup. Times are seconds since the lookup started.
+
+    Vars:
+        id:     Trace id, 16 hex digits
+        kind:   "find_node", "find_value" or "store"
+        key:    Key or node id looked up
+        hops:   Rounds of calls the lookup took
+        rpcs:   One dict per call sent, with the peer, its log distance
+                to the key, send and reply times, time the pong spent
+                in the event queue, and ids of the contacts returned
+        result: Outcome of the lookup
+    """
+    def __init__(self, tracer, kind, key):
+        self.tracer = tracer
+        self.id = "%016x" % random.getrandbits(64)
+        self.kind = kind
+        self.key = key
+        self.target = int.from_bytes(key, byteorder="big")
+        self.start = tracer.loop.time()
+        self.end = None
+        self.hops = 0
+        self.rpcs = []
+        self.result = None
+
+    def now(self):
+        return self.tracer.loop.time() - self.start
+
+    def send(self, node):
+        rpc = {
+            "peer": node.get_hash_string(),
+            "host": node.remote.host,
+            "port": node.remote.port,
+            "distance": node.distance(self.target).bit_length(),
+            "sent": self.now(),
+            "replied": None,
+            "queue_wait": None,
+            "contacts": None,
+            "hedged": False,
+            "error": None
+        }
+        self.rpcs.append(rpc)
+        return rpc
+
+    def reply(self, rpc, event):
+        rpc["replied"] = self.now()
+        rpc["queue_wait"] = event.get("wait")
+        if event["type"] is const.kad.event.HANDLE_PONG_FIND_NODE:
+            rpc["contacts"] = [node.get_hash_string() for node in event["data"]["data"][2]]
+
+    def fail(self, rpc, error):
+        rpc["replied"] = self.now()
+        rpc["error"] = type(error).__name__
+
+    def finish(self, result):
+        self.end = self.now()
+        self.result = result
+        self.tracer.traces.append(self)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": utils.get_hash_string(self.key),
+            "duration": self.end,
+            "hops": self.hops,
+            "result": self.result,
+            "rpcs": self.rpcs
+        }
+
+class Tracer(object):
+    """Tracer
+
+    Samples lookups and keeps their traces in a ring buffer.
+
+    Vars:
+        sampleRate: Fraction of lookups traced, 0 disables tracing
+        traces:     Ring buffer of finished traces
+    """
+    def __init__(
+        self, loop,
+        sampleRate = const.kad.trace.TRACE_SAMPLE_RATE,
+        size = const.kad.trace.TRACE_BUFFER_SIZE
+    ):
+        self.loop = loop
+        self.sampleRate = sampleRate
+        self.traces = deque(maxlen = size)
+
+    def start(self, kind, key):
+        """Start
+
+        Returns:
+            A Trace, or None if this lookup is not sampled
+        """
+        if self.sampleRate <= 0 or random.random() >= self.sampleRate:
+            return None
+        return Trace(self, kind, key)
+
+    def dump(self, count = None):
+        """Dump
+
+        Returns:
+            The latest count traces, oldest first, as JSON
+        """
+        traces = list(self.traces)
+        if count is not None:
+            traces = traces[-count:]
+        return json.dumps([trace.to_dict() for trace in traces], indent = 2)
@@ -0,0 +1,85 @@
+import asyncio
+
+from . import const
+
+class Transport(object):
+    """Transport
+
+    Opens connections to peers and accepts connections from them. A
+    connection carries one encoded TCPRPC message.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+
+    async def connect(self, remote):
+        """Connect
+
+        Args:
+            remote: Remote Destination
+        Returns:
+            (reader, writer) of the connection
+        """
+        raise NotImplementedError()
+
+    async def start_server(self, handle, host, port, reuse_port = False):
+        """Start Server
+
+        Args:
+            handle:     Coroutine function(reader, writer) of each connection
+            host:       Host to listen on
+            port:       Port to listen on
+            reuse_port: Share the port with other processes listening on it
+        Returns:
+            Server object with close() and wait_closed()
+        """
+        raise NotImplementedError()
+
+    async def start_datagram(self, handle, host, port, reuse_port = False):
+        """Start Datagram
+
+        Args:
+            handle:     Function(data, address) of each datagram received
+            host:       Host to listen on
+            port:       Port to listen on
+            reuse_port: Share the port with other processes listening on it
+        Returns:
+            Endpoint with sendto(data, address) and close(), or None if
+            the transport has no datagrams
+        """
+        return None
+
+class DatagramHandler(asyncio.DatagramProtocol):
+    def __init__(self, handle):
+        self.handle = handle
+
+    def datagram_received(self, data, address):
+        self.handle(data, address)
+
+    def error_received(self, exc):
+        # ICMP errors of a lost peer, its calls time out
+        pass
+
+class TCPTransport(Transport):
+    """TCPTransport
+
+    Transport over real TCP sockets, and UDP for datagrams.
+    """
+    async def connect(self, remote):
+        return await asyncio.open_connection(remote.host, remote.port, loop = self.loop)
+
+    async def start_server(self, handle, host, port, reuse_port = False):
+        return await asyncio.start_server(
+            handle,
+            host, port,
+            loop = self.loop,
+            backlog = const.kad.server.TCP_BACKLOG,
+            reuse_port = reuse_port
+        )
+
+    async def start_datagram(self, handle, host, port, reuse_port = False):
+        endpoint, protocol = await self.loop.create_datagram_endpoint(
+            lambda: DatagramHandler(handle),
+            local_addr = (host, port),
+            reuse_port = reuse_port
+        )
+        return endpoint
@@ -0,0 +1,103 @@
+import hashlib
+import struct
+
+from .Node import Node
+from .Route import Route
+
+class VirtualNodes(object):
+    """VirtualNodes
+
+    More points on the ring for one node, weighting it by its capacity.
+    Virtual nodes have ids of their own, and share the address, the
+    server, the storage, the scheduler and the event handler of the
+    node. Each has a Route of its own, filled by the same contacts, as
+    a Route only keeps many contacts near its own id.
+
+    Messages do not say which id they are for. A request for a key or
+    an id is answered by the point closest to it, and requests of ours
+    go out as that point, so peers learn each point from the keys it
+    holds and from the lookups of its id when the node joins. A PING is
+    answered once, by the node.
+
+    Vars:
+        nodes:  The node, then its virtual nodes
+        routes: Route of each virtual node, by id
+        ids:    Ids of all points
+    """
+    def __init__(self, loop, service, ids):
+        """VirtualNodes
+
+        Args:
+            loop:    Asyncio Loop Object
+            service: Kademlia Service
+            ids:     Ids of the virtual nodes
+        """
+        self.loop = loop
+        self.service = service
+        node = service.tcpService.node
+        self.nodes = [node] + [Node(id, remote = node.remote) for id in ids]
+        self.ids = set(node.id for node in self.nodes)
+        self.routes = {}
+        for virtual in self.nodes[1:]:
+            route = Route(service, loop, service.route.ksize, virtual.hash)
+            # Latency is of the peer, whichever point measured it
+            route.latency = service.route.latency
+            self.routes[virtual.id] = route
+        sharing = [service.route] + list(self.routes.values())
+        for route in sharing:
+            route.sharing = sharing
+
+    @staticmethod
+    def make_ids(id, count):
+        """Make Ids
+
+        Returns:
+            Ids of count - 1 virtual nodes of node id, the same on
+            every start
+        """
+        return [hashlib.sha1(id + struct.pack(">H", index)).digest() for index in range(1, count)]
+
+    def closest(self, key):
+        keyHash = int.from_bytes(key, byteorder = "big")
+        return min(self.nodes, key = lambda node: node.distance(keyHash))
+
+    def route(self, key):
+        return self.routes.get(self.closest(key).id, self.service.route)
+
+    def is_local(self, node):
+        return node.id in self.ids
+
+    def addNode(self, node):
+        if self.is_local(node):
+            return
+        self.service.route.addNode(node)
+        for route in self.routes.values():
+            route.addNode(node)
+
+    def getNodes(self):
+        nodes = {}
+        for route in [self.service.route] + list(self.routes.values()):
+            for node in route.getNodes():
+                nodes[node.id] = node
+        return list(nodes.values())
+
+    def findNeighbors(self, node, kSize = None, exclude = []):
+        """Find Neighbors
+
+        Returns:
+            [(distance, node)] closest to node known to the node and to
+            the point closest to node, ranked as Route ranks them
+        """
+        primary = self.service.route
+        route = self.route(node.id)
+        if route is primary:
+            return primary.findNeighbors(node, kSize = kSize, exclude = exclude)
+        kSize = kSize or primary.ksize
+        found = {}
+        for table in (primary, route):
+            for distance, neighbor in table.findNeighbors(node, kSize = kSize, exclude = exclude):
+                found[neighbor.id] = neighbor
+        return primary.rank(found.values(), node.hash, kSize)
+
+    def __len__(self):
+        return len(self.nodes)
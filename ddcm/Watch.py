@@ -0,0 +1,331 @@
+import asyncio
+
+from . import const
+
+from .Node import Node
+from .Handler import BusyError
+
+class Watch(object):
+    """Watch
+
+    Values of one key, as an async iterator: the value it holds when
+    watched, if found, then each new value stored to it. Every replica
+    pushes the same store, so a value equal to the last one is skipped.
+    A reader falling WATCH_QUEUE_MAXSIZE values behind loses the oldest.
+    """
+    def __init__(self, manager, key):
+        self.manager = manager
+        self.key = key
+        self.value = None
+        self.closed = False
+        self.queue = asyncio.Queue(const.kad.watch.WATCH_QUEUE_MAXSIZE, loop = manager.loop)
+
+    def put(self, value):
+        if self.closed or value is None or value == self.value:
+            return
+        self.value = value
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(value)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.queue.full():
+            self.queue.get_nowait()
+        # Wakes a reader waiting for the next value
+        self.queue.put_nowait(None)
+        self.manager.unwatch(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        value = await self.queue.get()
+        if value is None:
+            raise StopAsyncIteration
+        return value
+
+class WatchManager(object):
+    """Watch Manager
+
+    Both ends of WATCH. A watcher takes a lease on a key from the
+    WATCH_REPLICAS closest nodes it knows, and renews it when half of
+    it is left, on the nodes closest by then. A new contact closer to a
+    watched key than a node holding its lease moves the lease at once,
+    and a lease on a node which went away is taken elsewhere at the
+    next renewal. The pong of a WATCH carries the value the key holds,
+    so a push lost in a datagram is made up for by the renewal.
+
+    A node holding leases pushes each value stored to the key, by STORE
+    or CAS, to every watcher whose lease has not run out. A watcher
+    which cannot be reached loses its lease.
+
+    Vars:
+        leases:     Leases held for watchers, key -> {node id: (remote, expiry,
+                    echo of its WATCH)}
+        watches:    Local watches, key -> set of Watch
+        subscribed: Leases taken for local watches, key -> {node id: (node, expiry)}
+        renewing:   key -> Task taking its leases
+    """
+    def __init__(self, loop, service):
+        self.loop = loop
+        self.service = service
+        self.leases = {}
+        self.granted = 0
+        self.watches = {}
+        self.subscribed = {}
+        self.renewing = {}
+        self.worker = None
+        self.__tasks__ = set()
+
+        metrics = self.service.metrics
+        self.pushed = metrics.counter(
+            "ddcm_watch_notifications_sent_total", "Values pushed to watchers"
+        )
+        self.received = metrics.counter(
+            "ddcm_watch_notifications_received_total", "Values pushed to us for watched keys"
+        )
+        self.refused = metrics.counter(
+            "ddcm_watch_refused_total", "Watches refused past WATCH_MAX_LEASES"
+        )
+        self.resubscribed = metrics.counter(
+            "ddcm_watch_resubscriptions_total", "Leases taken again, on renewal or on churn"
+        )
+        metrics.gauge(
+            "ddcm_watch_leases", "Leases held for watchers",
+            func = lambda: self.granted
+        )
+        metrics.gauge(
+            "ddcm_watch_keys", "Keys watched here",
+            func = lambda: len(self.watches)
+        )
+
+    def spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine, loop = self.loop)
+        self.__tasks__.add(task)
+        task.add_done_callback(self.__tasks__.discard)
+        return task
+
+    def grant(self, key, node, lease, echo = None):
+        """Grant
+
+        Args:
+            key:   Key to watch
+            node:  Watcher
+            lease: Seconds asked for, 0 to stop watching
+            echo:  Echo of the WATCH, NOTIFY carries it back so a
+                   watcher in shards knows which worker watches
+        Returns:
+            Seconds granted, 0 if refused or stopped
+        """
+        leases = self.leases.get(key, {})
+        if lease == 0:
+            if leases.pop(node.id, None) is not None:
+                self.granted -= 1
+            if not leases:
+                self.leases.pop(key, None)
+            return 0
+        if node.id not in leases:
+            if self.granted >= const.kad.watch.WATCH_MAX_LEASES:
+                self.refused.inc()
+                return 0
+            self.granted += 1
+        lease = min(lease, const.kad.watch.WATCH_MAX_LEASE)
+        leases[node.id] = (node.remote, self.loop.time() + lease, echo)
+        self.leases[key] = leases
+        return lease
+
+    def changed(self, key, value):
+        """Changed
+
+        key was stored here. Push value to local watches, and to every
+        watcher holding a lease on key.
+        """
+        self.deliver(key, value)
+        leases = self.leases.get(key)
+        if not leases:
+            return
+        now = self.loop.time()
+        for nodeId, (remote, expire, echo) in list(leases.items()):
+            if expire <= now:
+                del leases[nodeId]
+                self.granted -= 1
+            elif nodeId != self.service.tcpService.node.id:
+                self.spawn(self.push(key, nodeId, remote, value, echo))
+        if not leases:
+            del self.leases[key]
+
+    async def push(self, key, nodeId, remote, value, echo = None):
+        try:
+            await self.service.tcpService.call.notify(remote, key, value, echo)
+            self.pushed.inc()
+        except OSError:
+            # The watcher went away, it takes the lease again if it comes back
+            self.grant(key, Node(nodeId), 0)
+
+    def watched(self, key):
+        return key in self.leases or key in self.watches
+
+    def deliver(self, key, value):
+        for watch in list(self.watches.get(key, ())):
+            watch.put(value)
+
+    def notified(self, key, value):
+        """Notified
+
+        A node pushed value of key to us.
+        """
+        if key in self.watches:
+            self.received.inc()
+            self.deliver(key, value)
+
+    def watch(self, key):
+        """Watch
+
+        Returns:
+            Watch of key, close it when done
+        """
+        watch = Watch(self, key)
+        watches = self.watches.setdefault(key, set())
+        if watches:
+            # Already subscribed, the new watch starts at the last value
+            watch.put(next(iter(watches)).value)
+        watches.add(watch)
+        if key not in self.subscribed:
+            self.subscribed[key] = {}
+            self.resubscribe(key, const.kad.scheduler.PRIORITY_INTERACTIVE)
+        return watch
+
+    def unwatch(self, watch):
+        watches = self.watches.get(watch.key)
+        if watches is None:
+            return
+        watches.discard(watch)
+        if watches:
+            return
+        del self.watches[watch.key]
+        subscribed = self.subscribed.pop(watch.key, {})
+        for node, expire in subscribed.values():
+            self.spawn(self.cancel(watch.key, node))
+
+    async def call(self, key, node, lease, priority = const.kad.scheduler.PRIORITY_INTERACTIVE):
+        """Call
+
+        Returns:
+            Future of the WATCH pong
+        """
+        return await self.service.tcpService.call.watch(
+            node.remote, key, lease,
+            timeout = self.service.route.getLatency(node).timeout(),
+            priority = priority
+        )
+
+    async def cancel(self, key, node):
+        try:
+            await (await self.call(
+                key, node, 0, priority = const.kad.scheduler.PRIORITY_MAINTENANCE
+            ))
+        except (OSError, asyncio.TimeoutError, BusyError):
+            # The lease runs out on its own
+            pass
+
+    async def subscribe(self, key, priority = const.kad.scheduler.PRIORITY_INTERACTIVE):
+        """Subscribe
+
+        Take leases on key from the WATCH_REPLICAS closest nodes we
+        know, failing over to the next closest. Leases left on nodes no
+        longer among them run out on their own.
+        """
+        service = self.service
+        if await service.storage.exist(key):
+            self.deliver(key, await service.storage.get(key))
+        nodes = [node for distance, node in service.neighbors(Node(key))]
+        replies, called = await service.__query__(
+            nodes,
+            lambda node: self.call(key, node, const.kad.watch.WATCH_LEASE, priority),
+            const.kad.watch.WATCH_REPLICAS
+        )
+        if key not in self.watches:
+            # Closed while subscribing
+            for node, event in replies:
+                self.spawn(self.cancel(key, node))
+            return
+        now = self.loop.time()
+        subscribed = {}
+        for node, event in replies:
+            _key, lease, value = event["data"]["data"]
+            if lease:
+                subscribed[node.id] = (node, now + lease)
+            if value is not None:
+                self.deliver(key, value)
+        self.subscribed[key] = subscribed
+        self.resubscribed.inc()
+
+    def resubscribe(self, key, priority = const.kad.scheduler.PRIORITY_MAINTENANCE):
+        task = self.renewing.get(key)
+        if task is not None and not task.done():
+            return
+        self.renewing[key] = task = self.spawn(self.subscribe(key, priority))
+        task.add_done_callback(lambda task: self.renewing.pop(key, None))
+
+    def is_closer(self, key, node):
+        """Is Closer
+
+        Returns:
+            Whether node should hold a lease on key in place of one
+            which does
+        """
+        subscribed = self.subscribed.get(key, {})
+        if node.id in subscribed:
+            return False
+        if len(subscribed) < const.kad.watch.WATCH_REPLICAS:
+            return True
+        keyHash = int.from_bytes(key, byteorder = "big")
+        return node.distance(keyHash) < max(
+            held.distance(keyHash) for held, expire in subscribed.values()
+        )
+
+    def on_new_node(self, node):
+        if node.id == self.service.tcpService.node.id:
+            return
+        for key in list(self.watches):
+            if self.is_closer(key, node):
+                self.resubscribe(key)
+
+    def renew(self):
+        now = self.loop.time()
+        for key in list(self.watches):
+            subscribed = self.subscribed.get(key, {})
+            # Fewer leases than nodes to hold them, one of them went away
+            known = len(self.service.neighbors(
+                Node(key), kSize = const.kad.watch.WATCH_REPLICAS
+            ))
+            if len(subscribed) < known or any(
+                expire - now < const.kad.watch.WATCH_LEASE / 2
+                for node, expire in subscribed.values()
+            ):
+                self.resubscribe(key)
+        for key in list(self.leases):
+            leases = self.leases[key]
+            for nodeId in [nodeId for nodeId, (remote, expire, echo) in leases.items() if expire <= now]:
+                del leases[nodeId]
+                self.granted -= 1
+            if not leases:
+                del self.leases[key]
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(const.kad.watch.WATCH_RENEW_INTERVAL, loop = self.loop)
+            self.renew()
+
+    def start(self):
+        self.worker = asyncio.ensure_future(self.run(), loop = self.loop)
+
+    def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+        for task in self.__tasks__:
+            task.cancel()
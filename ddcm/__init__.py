@@ -1,6 +1,33 @@
 from .Service import Service
 from .Node import Node
+from .Contact import Contact, ContactTable
 from .Route import Route
 from .Remote import Remote
 from .KBucket import KBucket
 from .Logger import Logger
+from .Storage import Storage
+from .ContactArray import ContactArray
+from .Cache import Cache
+from .Codec import Codec, CodecError
+from .Handler import Handler, BusyError
+from .TimerWheel import TimerWheel
+from .Latency import Latency
+from .RouteSnapshot import RouteSnapshot
+from .Rebalancer import Rebalancer
+from .HotKeys import HotKeys, CountMinSketch
+from .Commit import Commit, CommitFormatError
+from .CommitPipeline import CommitPipeline, CommitConflictError
+from .CommitHistory import CommitHistory, HistoryIterator
+from .Watch import WatchManager, Watch
+from .Shard import Shard
+from .VirtualNodes import VirtualNodes
+from .Metrics import Metrics, MetricsServer
+from .Tracer import Tracer, Trace
+from .DaemonServer import DaemonServer
+from .DaemonClient import DaemonClient, DaemonStream, DaemonError
+from .Transport import Transport, TCPTransport
+from .MemoryTransport import MemoryNetwork, MemoryTransport
+from .Cluster import Cluster
+from .ShardGroup import ShardGroup
+from .Benchmark import Benchmark
+from .Simulator import Simulator, VirtualLoop
@@ -3,3 +3,22 @@ from . import server
 from . import service
 from . import event
 from . import query
+from . import cache
+from . import scheduler
+from . import admission
+from . import metrics
+from . import trace
+from . import cluster
+from . import transport
+from . import simulator
+from . import datagram
+from . import daemon
+from . import snapshot
+from . import rebalance
+from . import hotkey
+from . import commit
+from . import watch
+from . import codec
+from . import storage
+from . import shard
+from . import rank
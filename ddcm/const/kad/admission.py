@@ -0,0 +1,8 @@
+PEER_RATE = 50
+PEER_BURST = 100
+ADDRESS_RATE = 200
+ADDRESS_BURST = 400
+MAX_BUCKETS = 4096
+
+MAX_INBOUND = 256
+QUEUE_SHED_THRESHOLD = 96
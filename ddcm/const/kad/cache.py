@@ -0,0 +1,3 @@
+CACHE_MAXSIZE = 1024
+CACHE_TTL = 10
+CACHE_NEGATIVE_TTL = 2
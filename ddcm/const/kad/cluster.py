@@ -0,0 +1,3 @@
+CLUSTER_HOST = "127.0.0.1"
+CLUSTER_BASE_PORT = 10000
+CLUSTER_BOOTSTRAP_CONCURRENCY = 32
@@ -0,0 +1,27 @@
+# Codecs of a value on the wire and in storage
+RAW = 0
+ZLIB = 1
+LZMA = 2
+
+CODECS = {
+    0: "raw",
+    1: "zlib",
+    2: "lzma"
+}
+# Codecs this node reads, a bit per codec, sent in PING and PONG
+CAPABILITIES = (1 << ZLIB) | (1 << LZMA)
+# Values below this many bytes are sent raw, from it zlib, and from
+# COMPRESS_LZMA_SIZE on lzma
+COMPRESS_MIN_SIZE = 512
+COMPRESS_LZMA_SIZE = 1024 * 1024
+# Values from this many bytes on are compressed in a worker thread
+COMPRESS_EXECUTOR_SIZE = 64 * 1024
+COMPRESS_WORKERS = 2
+# A value is kept raw unless compressed below this ratio of its size
+COMPRESS_MAX_RATIO = 0.9
+ZLIB_LEVEL = 6
+LZMA_PRESET = 2
+# Most bytes a value from a peer may decompress to
+DECOMPRESS_MAX_SIZE = 64 * 1024 * 1024
+# Most peers whose capabilities are kept
+CODEC_MAX_PEERS = 4096
@@ -10,6 +10,23 @@ PONG_FIND_NODE = 7
 PONG_FIND_VALUE = 8
 PONG_REDUCE = 9
 
+BUSY = 10
+
+CAS = 11
+PONG_CAS = 12
+
+WATCH = 13
+PONG_WATCH = 14
+NOTIFY = 15
+
+# Contacts sent between the workers of a node, see Shard
+SYNC = 16
+
+# Value length of a PONG_FIND_VALUE for a key not stored
+VALUE_MISS = 0xffffffff
+# Bit of a PONG_FIND_VALUE value length set when the key is hot
+VALUE_HOT = 0x80000000
+
 COMMANDS = {
     0: "PING",
     1: "STORE",
@@ -20,5 +37,29 @@ COMMANDS = {
     6: "PONG_STORE",
     7: "PONG_FIND_NODE",
     8: "PONG_FIND_VALUE",
-    9: "PONG_REDUCE"
+    9: "PONG_REDUCE",
+    10: "BUSY",
+    11: "CAS",
+    12: "PONG_CAS",
+    13: "WATCH",
+    14: "PONG_WATCH",
+    15: "NOTIFY",
+    16: "SYNC"
 }
+
+REQUESTS = [PING, STORE, FIND_NODE, FIND_VALUE, REDUCE, CAS, WATCH]
+
+# Small enough to go in one datagram, and safe to receive twice
+DATAGRAMS = [
+    PING, PONG, FIND_NODE, PONG_FIND_NODE, FIND_VALUE, PONG_FIND_VALUE, BUSY,
+    CAS, PONG_CAS, WATCH, PONG_WATCH, NOTIFY
+]
+
+# Requests for a key, handled by the worker of its shard
+KEYED = [STORE, FIND_VALUE, CAS, WATCH]
+
+# Messages answering a call of ours, handled by the worker which made it
+ANSWERS = [
+    PONG, PONG_STORE, PONG_FIND_NODE, PONG_FIND_VALUE, PONG_REDUCE, BUSY,
+    PONG_CAS, PONG_WATCH, NOTIFY
+]
@@ -0,0 +1,31 @@
+# Key of the latest commit id
+HEAD = b"\x00" * 20
+# Seconds commits wait to be batched, and most commits in a batch
+COMMIT_WINDOW = 0.005
+COMMIT_MAX_BATCH = 256
+# Head updates retried after losing a compare-and-set, and most seconds
+# to back off before each
+COMMIT_CAS_RETRIES = 16
+COMMIT_BACKOFF = 0.005
+# Ancestor ids a commit lists in lstcommit, parent first
+COMMIT_ANCESTORS = 16
+# Commits fetched at once when walking history
+HISTORY_BATCH = 16
+# Most commits in the local index
+HISTORY_INDEX_MAXSIZE = 65536
+# Binary commit: magic (2s), version (B), flags (B), time (Q), author (20s),
+# parent count (B), then parents, then entry count (L) and entries
+COMMIT_MAGIC = b"DC"
+COMMIT_VERSION = 1
+COMMIT_HEADER = ">2sBBQ20sB"
+COMMIT_HEADER_SIZE = 33
+COMMIT_COUNT = ">L"
+COMMIT_COUNT_SIZE = 4
+# Entry: encoding (B), length (L), then its bytes
+COMMIT_ENTRY = ">BL"
+COMMIT_ENTRY_SIZE = 5
+# Flags
+COMMIT_FLAG_BATCH = 0x01
+# Entry encodings
+ENCODING_RAW = 0
+ENCODING_JSON = 1
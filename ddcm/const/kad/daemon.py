@@ -0,0 +1,40 @@
+# Request: op (B), request id (L), payload length (L), payload
+# Response: status (B), request id (L), payload length (L), payload
+HEADER = ">BLL"
+HEADER_SIZE = 9
+
+STORE = 0
+FIND_VALUE = 1
+FIND_NODE = 2
+COMMIT = 3
+SUBMIT = 4
+LATEST_COMMIT = 5
+HISTORY = 6
+WATCH = 7
+
+OPS = {
+    0: "STORE",
+    1: "FIND_VALUE",
+    2: "FIND_NODE",
+    3: "COMMIT",
+    4: "SUBMIT",
+    5: "LATEST_COMMIT",
+    6: "HISTORY",
+    7: "WATCH"
+}
+# Streams which only end with the connection
+SUBSCRIPTIONS = [WATCH]
+
+OK = 0
+NOT_FOUND = 1
+ERROR = 2
+# A streamed response is items, then END
+ITEM = 3
+END = 4
+
+DAEMON_DEFAULT_PATH = "/tmp/ddcm.sock"
+# Requests of one connection handled at once, further requests wait
+DAEMON_MAX_PIPELINE = 128
+# Subscriptions of one connection, they do not count against the pipeline
+DAEMON_MAX_SUBSCRIPTIONS = 1024
+DAEMON_MAX_PAYLOAD = 64 * 1024 * 1024
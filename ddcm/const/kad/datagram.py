@@ -0,0 +1,6 @@
+# Largest datagram sent, larger messages go over TCP
+UDP_MTU = 1200
+# Datagrams sent for a call before falling back to TCP
+UDP_ATTEMPTS = 3
+# Peers whose UDP support is remembered, the least recently learnt are forgotten
+UDP_MAX_PEERS = 4096
@@ -28,21 +28,42 @@ HANDLE_PONG_REDUCE = 19
 SERVICE_SHUTDOWN = 21
 SERVICE_START = 22
 
+SEND_BUSY = 23
+HANDLE_BUSY = 24
+
+SEND_CAS = 25
+SEND_PONG_CAS = 26
+HANDLE_CAS = 27
+HANDLE_PONG_CAS = 28
+
+SEND_WATCH = 29
+SEND_PONG_WATCH = 30
+HANDLE_WATCH = 31
+HANDLE_PONG_WATCH = 32
+SEND_NOTIFY = 33
+HANDLE_NOTIFY = 34
+
 rpc_events_handle = [
     HANDLE_PING, HANDLE_STORE, HANDLE_FIND_NODE,
     HANDLE_FIND_VALUE, HANDLE_REDUCE, HANDLE_PONG_PING,
     HANDLE_PONG_FIND_NODE, HANDLE_PONG_FIND_VALUE,
-    HANDLE_PONG_REDUCE, HANDLE_PONG_STORE
+    HANDLE_PONG_REDUCE, HANDLE_PONG_STORE, HANDLE_BUSY,
+    HANDLE_CAS, HANDLE_PONG_CAS, HANDLE_WATCH, HANDLE_PONG_WATCH,
+    HANDLE_NOTIFY
 ]
 rpc_events_send = [
     SEND_PING, SEND_FIND_NODE, SEND_FIND_VALUE, SEND_STORE,
     SEND_REDUCE, SEND_PONG_PING, SEND_PONG_STORE,
-    SEND_PONG_FIND_NODE, SEND_PONG_FIND_VALUE, SEND_PONG_REDUCE
+    SEND_PONG_FIND_NODE, SEND_PONG_FIND_VALUE, SEND_PONG_REDUCE,
+    SEND_BUSY, SEND_CAS, SEND_PONG_CAS, SEND_WATCH, SEND_PONG_WATCH,
+    SEND_NOTIFY
 ]
 rpc_events_do = [
-    SEND_PING, SEND_FIND_NODE, SEND_FIND_VALUE, SEND_STORE, SEND_REDUCE
+    SEND_PING, SEND_FIND_NODE, SEND_FIND_VALUE, SEND_STORE, SEND_REDUCE,
+    SEND_CAS, SEND_WATCH
 ]
 rpc_events_done = [
     HANDLE_PONG_PING, HANDLE_PONG_STORE, HANDLE_PONG_FIND_NODE,
-    HANDLE_PONG_FIND_VALUE, HANDLE_PONG_REDUCE
+    HANDLE_PONG_FIND_VALUE, HANDLE_PONG_REDUCE, HANDLE_PONG_CAS,
+    HANDLE_PONG_WATCH
 ]
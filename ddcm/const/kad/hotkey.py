@@ -0,0 +1,14 @@
+# Count-min sketch counters per row, and rows
+SKETCH_WIDTH = 1024
+SKETCH_DEPTH = 4
+# Reads in a decay interval which make a key hot, and below which it cools
+HOT_THRESHOLD = 64
+HOT_COOL_THRESHOLD = 16
+# Seconds between halvings of the sketch
+HOT_DECAY_INTERVAL = 10
+# Most keys hot at once
+HOT_MAX_KEYS = 64
+# Replicas of a hot key, in multiples of ksize
+HOT_REPLICATION = 2
+# Seconds a hot value stays cached, and a remote hot mark lasts
+HOT_CACHE_TTL = 60
@@ -1 +1,13 @@
 FIND_NODE_TIMEOUT = 10
+RPC_TIMEOUT = 5
+
+TIMER_TICK = 0.1
+TIMER_SLOTS = 512
+
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+RTT_INITIAL = 1
+RTT_MIN_TIMEOUT = 0.5
+
+HEDGE_DEFAULT_DELAY = 0.5
+HEDGE_MIN_DELAY = 0.05
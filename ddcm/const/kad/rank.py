@@ -0,0 +1,2 @@
+# Distances computed at once by ContactArray, targets times contacts
+RANK_BATCH_CELLS = 2 ** 18
@@ -0,0 +1,7 @@
+# Keys handed off per second, and in a burst
+REBALANCE_RATE = 50
+REBALANCE_BURST = 100
+# Keys handed off at once
+REBALANCE_BATCH = 16
+# Keys ranked between yields to the loop
+REBALANCE_RANK_CHUNK = 256
@@ -0,0 +1,12 @@
+MAX_INFLIGHT = 64
+MAX_INFLIGHT_PER_PEER = 4
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REPLY = 1
+PRIORITY_MAINTENANCE = 2
+
+PRIORITIES = [
+    PRIORITY_INTERACTIVE,
+    PRIORITY_REPLY,
+    PRIORITY_MAINTENANCE
+]
@@ -1,6 +1,9 @@
 TCP_DEFAULT_HOST = "0.0.0.0"
 TCP_DEFAULT_PORT = 8567
+TCP_BACKLOG = 1024
 UDP_DEFAULT_HOST = "0.0.0.0"
 UDP_DEFAULT_PORT = 8568
 DAEMON_DEFAULT_HOST = "127.0.0.1"
 DAEMON_DEFAULT_PORT = 8569
+METRICS_DEFAULT_HOST = "127.0.0.1"
+METRICS_DEFAULT_PORT = 8570
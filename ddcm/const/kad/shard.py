@@ -0,0 +1,7 @@
+# Host the workers of a node listen on for each other
+SHARD_HOST = "127.0.0.1"
+# The echo says which worker made a call, in its first byte
+SHARD_MAX_COUNT = 256
+# Seconds between contacts sent to the other workers
+SHARD_SYNC_INTERVAL = 0.05
+SHARD_SYNC_MAX_NODES = 256
@@ -0,0 +1,3 @@
+SIMULATOR_LATENCY = 0.05
+SIMULATOR_CONCURRENCY = 16
+SIMULATOR_CHURN_INTERVAL = 60
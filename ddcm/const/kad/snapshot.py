@@ -0,0 +1,8 @@
+SNAPSHOT_MAGIC = b"DDCMRT"
+SNAPSHOT_VERSION = 1
+# Seconds between snapshots of the routing table
+SNAPSHOT_INTERVAL = 60
+# Contacts last seen longer ago than this are not restored
+SNAPSHOT_MAX_AGE = 24 * 3600
+# Restored contacts pinged at once
+REVALIDATE_CONCURRENCY = 4
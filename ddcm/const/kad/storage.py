@@ -0,0 +1,5 @@
+# Bytes, or number, of unreferenced values kept before stores start
+# freeing them, and values freed per store past that, see Storage.collect
+STORAGE_GC_BYTES = 4 * 1024 * 1024
+STORAGE_GC_VALUES = 65536
+STORAGE_GC_STEP = 16
@@ -0,0 +1,2 @@
+TRACE_SAMPLE_RATE = 0
+TRACE_BUFFER_SIZE = 256
@@ -0,0 +1,4 @@
+MEMORY_LATENCY = 0
+MEMORY_JITTER = 0
+MEMORY_LOSS = 0
+MEMORY_BANDWIDTH = None
@@ -0,0 +1,11 @@
+# Seconds a watch lease is asked for, and the longest one granted
+WATCH_LEASE = 60
+WATCH_MAX_LEASE = 600
+# Nodes a key is watched on, of the k closest
+WATCH_REPLICAS = 3
+# Most leases a node holds for watchers, further watches are refused
+WATCH_MAX_LEASES = 4096
+# Seconds between checks of leases to renew or expire
+WATCH_RENEW_INTERVAL = 5
+# Values a watch keeps for a slow reader, older ones are dropped
+WATCH_QUEUE_MAXSIZE = 64
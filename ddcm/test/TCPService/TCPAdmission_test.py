@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from .. import const
+from .. import utils
+
+class TCPAdmissionTest(unittest.TestCase):
+    def test_token_bucket(self):
+        bucket = ddcm.TCPService.TokenBucket(10, 2, 0)
+        self.assertTrue(bucket.consume(0))
+        self.assertTrue(bucket.consume(0))
+        self.assertFalse(bucket.consume(0))
+        self.assertFalse(bucket.consume(0.05))
+        self.assertTrue(bucket.consume(0.1))
+        self.assertFalse(bucket.consume(0.1))
+
+    def test_admit(self):
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue(loop = loop)
+        admission = ddcm.TCPService.TCPAdmission(loop, queue)
+        nodeId = ddcm.utils.get_random_node_id()
+        admitted = [
+            admission.admit(ddcm.const.kad.command.PING, "127.0.0.1", nodeId)
+            for i in range(ddcm.const.kad.admission.PEER_BURST + 1)
+        ]
+        self.assertEqual(admitted.count(True), ddcm.const.kad.admission.PEER_BURST)
+        self.assertEqual(admission.limited, 1)
+        self.assertTrue(admission.admit(ddcm.const.kad.command.PONG, "127.0.0.1", nodeId))
+
+        for i in range(ddcm.const.kad.admission.QUEUE_SHED_THRESHOLD):
+            queue.put_nowait(None)
+        self.assertFalse(admission.admit(
+            ddcm.const.kad.command.FIND_NODE, "127.0.0.2", ddcm.utils.get_random_node_id()
+        ))
+        self.assertEqual(admission.shed, 1)
+
+    @utils.NetworkTestCase
+    async def test_busy(self, loop, config, service):
+        admission = service.tcpService.server.admission
+        admission.admit = lambda command, host, nodeId: command not in ddcm.const.kad.command.REQUESTS
+        future = await service.tcpService.call.ping(ddcm.Remote(
+            host = "127.0.0.1",
+            port = config["server"]["port"]
+        ))
+        with self.assertRaises(ddcm.BusyError):
+            await asyncio.wait_for(future, const.test.PING_TIMEOUT, loop = loop)
@@ -99,11 +99,12 @@ class TCPRPCTest(unittest.TestCase):
                 tcpService.server.remote,
                 echo,
                 key,
-                value
+                value,
+                ddcm.const.kad.codec.ZLIB
             )
         )
 
-        _command, _echo, _remoteNode, (_key, _value) = loop.run_until_complete(
+        _command, _echo, _remoteNode, (_key, _value, _codec) = loop.run_until_complete(
             asyncio.ensure_future(
                 tcpService.rpc.read_command(reader)
             )
@@ -113,6 +114,25 @@ class TCPRPCTest(unittest.TestCase):
         self.assertEqual(_echo, echo)
         self.assertEqual(_key, key)
         self.assertEqual(_value, value)
+        self.assertEqual(_codec, ddcm.const.kad.codec.ZLIB)
+
+    @TestCase
+    def test_unknown_codec(self, loop, reader, wsock, tcpService, echo):
+        key, value = self.get_key_pair()
+
+        wsock.send(
+            tcpService.rpc.pack_store(
+                tcpService.node,
+                tcpService.server.remote,
+                echo,
+                key,
+                value,
+                255
+            )
+        )
+
+        with self.assertRaises(ddcm.CodecError):
+            loop.run_until_complete(tcpService.rpc.read_command(reader))
 
     @TestCase
     def test_pack_pong_store(self, loop, reader, wsock, tcpService, echo):
@@ -198,6 +218,54 @@ class TCPRPCTest(unittest.TestCase):
             self.assertEqual(_remoteNodes[i].remote.host, remoteNodes[i].remote.host)
             self.assertEqual(_remoteNodes[i].remote.port, remoteNodes[i].remote.port)
 
+    @TestCase
+    def test_intern_contacts(self, loop, reader, wsock, tcpService, echo):
+        remoteNodes = [
+            ddcm.Node(
+                id = ddcm.utils.get_random_node_id(),
+                remote = ddcm.Remote(host = "59.48.23.233", port = 1000 + i)
+            ) for i in range(3)
+        ]
+        def read(remoteNodes):
+            wsock.send(tcpService.rpc.pack_pong_findNode(
+                tcpService.node, tcpService.server.remote, echo, remoteNodes[0].id, remoteNodes
+            ))
+            return loop.run_until_complete(tcpService.rpc.read_command(reader))[3][2]
+
+        first, second = read(remoteNodes), read(remoteNodes)
+        for i in range(len(remoteNodes)):
+            # One object for a contact, sent on as it was read
+            self.assertIs(first[i], second[i])
+            self.assertEqual(first[i].packed, tcpService.rpc.pack_node(remoteNodes[i]))
+            self.assertEqual(tcpService.rpc.pack_node(first[i]), first[i].packed)
+
+        # A peer at a new address is a new contact
+        remoteNodes[0] = ddcm.Node(remoteNodes[0].id, remote = ddcm.Remote(host = "59.48.23.234", port = 1000))
+        moved = read(remoteNodes)
+        self.assertIsNot(moved[0], first[0])
+        self.assertEqual(moved[0].remote.host, "59.48.23.234")
+        self.assertIs(tcpService.rpc.contacts.contacts[moved[0].id], moved[0])
+        self.assertIs(moved[1], first[1])
+
+        # Dropped once nothing holds it
+        contactId = moved[2].id
+        del first, second, moved
+        self.assertNotIn(contactId, tcpService.rpc.contacts.contacts)
+
+        # Another service reads its own contacts
+        other = type(tcpService.rpc)(tcpService, loop)
+        wsock.send(tcpService.rpc.pack_pong_findNode(
+            tcpService.node, tcpService.server.remote, echo, remoteNodes[1].id, remoteNodes
+        ))
+        mine = loop.run_until_complete(tcpService.rpc.read_command(reader))[3][2]
+        wsock.send(tcpService.rpc.pack_pong_findNode(
+            tcpService.node, tcpService.server.remote, echo, remoteNodes[1].id, remoteNodes
+        ))
+        theirs = loop.run_until_complete(other.read_command(reader))[3][2]
+        for i in range(len(remoteNodes)):
+            self.assertIsNot(mine[i], theirs[i])
+            self.assertIsNot(mine[i].remote, theirs[i].remote)
+
     @TestCase
     def test_pack_findValue(self, loop, reader, wsock, tcpService, echo):
         key, value = self.get_key_pair()
@@ -235,7 +303,7 @@ class TCPRPCTest(unittest.TestCase):
             )
         )
 
-        _command, _echo, _remoteNode, (_key, _value) = loop.run_until_complete(
+        _command, _echo, _remoteNode, (_key, _value, _hot, _codec) = loop.run_until_complete(
             asyncio.ensure_future(
                 tcpService.rpc.read_command(reader)
             )
@@ -245,6 +313,62 @@ class TCPRPCTest(unittest.TestCase):
         self.assertEqual(_echo, echo)
         self.assertEqual(_key, key)
         self.assertEqual(_value, value)
+        self.assertFalse(_hot)
+        self.assertEqual(_codec, ddcm.const.kad.codec.RAW)
+
+    @TestCase
+    def test_pack_cas(self, loop, reader, wsock, tcpService, echo):
+        key, value = self.get_key_pair()
+
+        wsock.send(
+            tcpService.rpc.pack_cas(
+                tcpService.node,
+                tcpService.server.remote,
+                echo,
+                key,
+                None,
+                value
+            )
+        )
+
+        _command, _echo, _remoteNode, (_key, _expected, _value) = loop.run_until_complete(
+            asyncio.ensure_future(
+                tcpService.rpc.read_command(reader)
+            )
+        )
+
+        self.assertEqual(_command, ddcm.const.kad.command.CAS)
+        self.assertEqual(_echo, echo)
+        self.assertEqual(_key, key)
+        self.assertIsNone(_expected)
+        self.assertEqual(_value, value)
+
+    @TestCase
+    def test_pack_pong_cas(self, loop, reader, wsock, tcpService, echo):
+        key, value = self.get_key_pair()
+
+        wsock.send(
+            tcpService.rpc.pack_pong_cas(
+                tcpService.node,
+                tcpService.server.remote,
+                echo,
+                key,
+                False,
+                value
+            )
+        )
+
+        _command, _echo, _remoteNode, (_key, _ok, _current) = loop.run_until_complete(
+            asyncio.ensure_future(
+                tcpService.rpc.read_command(reader)
+            )
+        )
+
+        self.assertEqual(_command, ddcm.const.kad.command.PONG_CAS)
+        self.assertEqual(_echo, echo)
+        self.assertEqual(_key, key)
+        self.assertFalse(_ok)
+        self.assertEqual(_current, value)
 
     @TestCase
     def test_pack_reduce(self, loop, reader, wsock, tcpService, echo):
@@ -297,3 +421,55 @@ class TCPRPCTest(unittest.TestCase):
         self.assertEqual(_keyS, keyS)
         self.assertEqual(_keyE, keyE)
         self.assertEqual(_value, value)
+
+    @TestCase
+    def test_pack_pong_watch(self, loop, reader, wsock, tcpService, echo):
+        key, value = self.get_key_pair()
+
+        wsock.send(
+            tcpService.rpc.pack_pong_watch(
+                tcpService.node,
+                tcpService.server.remote,
+                echo,
+                key,
+                60,
+                value
+            )
+        )
+
+        _command, _echo, _remoteNode, (_key, _lease, _value) = loop.run_until_complete(
+            asyncio.ensure_future(
+                tcpService.rpc.read_command(reader)
+            )
+        )
+
+        self.assertEqual(_command, ddcm.const.kad.command.PONG_WATCH)
+        self.assertEqual(_echo, echo)
+        self.assertEqual(_key, key)
+        self.assertEqual(_lease, 60)
+        self.assertEqual(_value, value)
+
+    @TestCase
+    def test_pack_notify(self, loop, reader, wsock, tcpService, echo):
+        key, value = self.get_key_pair()
+
+        wsock.send(
+            tcpService.rpc.pack_notify(
+                tcpService.node,
+                tcpService.server.remote,
+                echo,
+                key,
+                value
+            )
+        )
+
+        _command, _echo, _remoteNode, (_key, _value) = loop.run_until_complete(
+            asyncio.ensure_future(
+                tcpService.rpc.read_command(reader)
+            )
+        )
+
+        self.assertEqual(_command, ddcm.const.kad.command.NOTIFY)
+        self.assertEqual(_echo, echo)
+        self.assertEqual(_key, key)
+        self.assertEqual(_value, value)
@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from .. import const
+
+class TCPSchedulerTest(unittest.TestCase):
+    def TestCase(maxInflight, maxInflightPerPeer):
+        def __deco(func):
+            def _deco(self, *args, **kwargs):
+                loop = asyncio.get_event_loop()
+                kwargs['loop'] = loop
+                kwargs['scheduler'] = ddcm.TCPService.TCPScheduler(
+                    loop, maxInflight, maxInflightPerPeer
+                )
+                return loop.run_until_complete(func(self, *args, **kwargs))
+            return _deco
+        return __deco
+
+    def get_remote(self, port):
+        return ddcm.Remote(host = "127.0.0.1", port = port)
+
+    async def acquire(self, scheduler, order, name, remote, priority):
+        await scheduler.acquire(remote, priority)
+        order.append(name)
+
+    @TestCase(1, 1)
+    async def test_priority(self, loop, scheduler):
+        remote = self.get_remote(1)
+        order = []
+        await scheduler.acquire(remote)
+        tasks = [
+            asyncio.ensure_future(self.acquire(
+                scheduler, order, name, remote, priority
+            ), loop = loop)
+            for name, priority in [
+                ("maintenance", ddcm.const.kad.scheduler.PRIORITY_MAINTENANCE),
+                ("reply", ddcm.const.kad.scheduler.PRIORITY_REPLY),
+                ("interactive", ddcm.const.kad.scheduler.PRIORITY_INTERACTIVE)
+            ]
+        ]
+        await asyncio.sleep(0, loop = loop)
+        self.assertEqual(scheduler.depth(), 3)
+        for i in range(3):
+            scheduler.release(remote)
+            await asyncio.sleep(0, loop = loop)
+        self.assertEqual(order, ["interactive", "reply", "maintenance"])
+        self.assertTrue(all(task.done() for task in tasks))
+        self.assertEqual(scheduler.waitCount, 3)
+        scheduler.release(remote)
+        self.assertEqual(scheduler.inflight, 0)
+
+    @TestCase(1, 1)
+    async def test_fair(self, loop, scheduler):
+        remoteA, remoteB = self.get_remote(1), self.get_remote(2)
+        priority = ddcm.const.kad.scheduler.PRIORITY_INTERACTIVE
+        order = []
+        await scheduler.acquire(remoteA)
+        for name, remote in [("A1", remoteA), ("A2", remoteA), ("B1", remoteB), ("B2", remoteB)]:
+            asyncio.ensure_future(self.acquire(
+                scheduler, order, name, remote, priority
+            ), loop = loop)
+        await asyncio.sleep(0, loop = loop)
+        scheduler.release(remoteA)
+        for i in range(4):
+            await asyncio.sleep(0, loop = loop)
+            scheduler.release(remoteA if order[-1].startswith("A") else remoteB)
+        self.assertEqual(order, ["A1", "B1", "A2", "B2"])
+
+    @TestCase(2, 1)
+    async def test_per_peer(self, loop, scheduler):
+        remoteA, remoteB = self.get_remote(1), self.get_remote(2)
+        await scheduler.acquire(remoteA)
+        waiter = asyncio.ensure_future(scheduler.acquire(remoteA), loop = loop)
+        await asyncio.sleep(0, loop = loop)
+        self.assertFalse(waiter.done())
+        await scheduler.acquire(remoteB)
+        self.assertEqual(scheduler.inflight, 2)
+        waiter.cancel()
+        await asyncio.sleep(0, loop = loop)
+        scheduler.release(remoteA)
+        scheduler.release(remoteB)
+        self.assertEqual(scheduler.inflight, 0)
+        self.assertEqual(scheduler.waiting, 0)
+
+    @TestCase(1, 1)
+    async def test_cancel_queued(self, loop, scheduler):
+        remote = self.get_remote(1)
+        await scheduler.acquire(remote)
+        waiters = [asyncio.ensure_future(scheduler.acquire(remote), loop = loop) for i in range(3)]
+        await asyncio.sleep(0, loop = loop)
+        self.assertEqual(scheduler.waiting, 3)
+        # Cancelled behind the head, it stops counting at once
+        waiters[1].cancel()
+        await asyncio.sleep(0, loop = loop)
+        self.assertEqual(scheduler.waiting, 2)
+        self.assertEqual(scheduler.depth(), 2)
+        for waiter in [waiters[0], waiters[2]]:
+            waiter.cancel()
+        await asyncio.sleep(0, loop = loop)
+        self.assertEqual(scheduler.stats()["waiting"], 0)
+        self.assertEqual(scheduler.depth(), 0)
+        # The fast path is open again
+        scheduler.release(remote)
+        await asyncio.wait_for(scheduler.acquire(remote), 1, loop = loop)
+        scheduler.release(remote)
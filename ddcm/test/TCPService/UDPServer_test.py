@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from .. import const
+from .. import utils
+
+class UDPServerTest(unittest.TestCase):
+    @utils.MultiNetworkTestCase(["A", "B"])
+    async def test_ping(self, loop, configs, services):
+        udpA, udpB = services["A"].tcpService.udp, services["B"].tcpService.udp
+        remoteA, remoteB = services["A"].tcpService.node.remote, services["B"].tcpService.node.remote
+        result = await asyncio.wait_for(
+            await services["A"].tcpService.call.ping(remoteB),
+            timeout = const.test.PING_TIMEOUT,
+            loop = loop
+        )
+        self.assertEqual(result["data"]["remoteNode"].id, services["B"].tcpService.node.id)
+        # A is not known to B, which answers over TCP
+        self.assertEqual(udpA.datagramsSent.value, 1)
+        self.assertEqual(udpB.datagramsSent.value, 0)
+        self.assertTrue(udpA.peers[(remoteB.host, remoteB.port)])
+        self.assertNotIn((remoteA.host, remoteA.port), udpB.peers)
+
+        # Once A answered a datagram of B, both ways go in datagrams
+        await asyncio.wait_for(
+            await services["B"].tcpService.call.ping(remoteA),
+            timeout = const.test.PING_TIMEOUT,
+            loop = loop
+        )
+        self.assertEqual(udpA.datagramsSent.value, 2)
+        self.assertTrue(udpB.peers[(remoteA.host, remoteA.port)])
+        await asyncio.wait_for(
+            await services["A"].tcpService.call.ping(remoteB),
+            timeout = const.test.PING_TIMEOUT,
+            loop = loop
+        )
+        self.assertEqual(udpB.datagramsSent.value, 2)
+        self.assertEqual(udpA.datagramsReceived.value, 2)
+
+        frame = b"".join([bytes([ddcm.const.kad.command.PONG_FIND_VALUE]), b"\x00" * ddcm.const.kad.datagram.UDP_MTU])
+        self.assertFalse(udpA.can_send(remoteB, frame, reply = True))
+        self.assertFalse(udpA.can_send(remoteB, bytes([ddcm.const.kad.command.STORE])))
+        self.assertTrue(udpA.can_send(remoteB, bytes([ddcm.const.kad.command.PING])))
+
+    @utils.MultiNetworkTestCase(["A", "B"])
+    async def test_fallback(self, loop, configs, services):
+        udpA = services["A"].tcpService.udp
+        remoteB = services["B"].tcpService.node.remote
+        # B no longer listens on UDP, the call falls back to TCP
+        await services["B"].tcpService.udp.stop_server()
+        result = await asyncio.wait_for(
+            await services["A"].tcpService.call.ping(remoteB, timeout = 0.6),
+            timeout = const.test.PING_TIMEOUT,
+            loop = loop
+        )
+        self.assertEqual(result["data"]["remoteNode"].id, services["B"].tcpService.node.id)
+        self.assertEqual(udpA.datagramsSent.value, 2)
+        self.assertEqual(udpA.retransmits.value, 1)
+        self.assertEqual(udpA.fallbacks.value, 1)
+        self.assertIs(udpA.peers[(remoteB.host, remoteB.port)], False)
+        await asyncio.wait_for(
+            await services["A"].tcpService.call.ping(remoteB),
+            timeout = const.test.PING_TIMEOUT,
+            loop = loop
+        )
+        self.assertEqual(udpA.datagramsSent.value, 2)
+
+    @utils.MultiNetworkTestCase(["A"])
+    async def test_unverified_source(self, loop, configs, services):
+        udpA = services["A"].tcpService.udp
+        udpA.handle(b"\xff" * 32, ("127.0.0.2", 5000))
+        await asyncio.sleep(0.1, loop = loop)
+        # A forged source is neither remembered nor answered in a datagram
+        self.assertEqual(len(udpA.peers), 0)
+        self.assertEqual(udpA.datagramsSent.value, 0)
+        for port in range(ddcm.const.kad.datagram.UDP_MAX_PEERS + 1):
+            udpA.learn(ddcm.Remote(host = "127.0.0.2", port = port), False)
+        self.assertEqual(len(udpA.peers), ddcm.const.kad.datagram.UDP_MAX_PEERS)
+        self.assertNotIn(("127.0.0.2", 0), udpA.peers)
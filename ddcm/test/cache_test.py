@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class CacheTest(unittest.TestCase):
+    def TestCase(maxsize):
+        def __deco(func):
+            def _deco(self, *args, **kwargs):
+                self.now = 0
+                kwargs['cache'] = ddcm.Cache(maxsize, 10, 2, clock = lambda: self.now)
+                return func(self, *args, **kwargs)
+            return _deco
+        return __deco
+
+    @TestCase(4)
+    def test_get(self, cache):
+        self.assertEqual(cache.get(b"a"), (False, None))
+        cache.put(b"a", b"1")
+        self.assertEqual(cache.get(b"a"), (True, b"1"))
+
+    @TestCase(4)
+    def test_ttl(self, cache):
+        cache.put(b"a", b"1")
+        cache.put(b"b", None)
+        self.now = 5
+        self.assertEqual(cache.get(b"a"), (True, b"1"))
+        self.assertEqual(cache.get(b"b"), (False, None))
+        self.now = 10
+        self.assertEqual(cache.get(b"a"), (False, None))
+        self.assertEqual(len(cache), 0)
+
+    @TestCase(2)
+    def test_lru(self, cache):
+        cache.put(b"a", b"1")
+        cache.put(b"b", b"2")
+        cache.get(b"a")
+        cache.put(b"c", b"3")
+        self.assertEqual(cache.get(b"b"), (False, None))
+        self.assertEqual(cache.get(b"a"), (True, b"1"))
+        self.assertEqual(cache.get(b"c"), (True, b"3"))
+
+    @utils.NetworkTestCase
+    async def test_singleflight(self, loop, config, service):
+        calls = []
+        async def find_value(key):
+            calls.append(key)
+            await asyncio.sleep(0.01, loop = loop)
+            return b"value"
+        service.__find_value__ = find_value
+        key = ddcm.utils.get_random_node_id()
+        results = await asyncio.gather(
+            *[service.find_value(key) for i in range(10)],
+            loop = loop
+        )
+        self.assertEqual(results, [b"value"] * 10)
+        self.assertEqual(await service.find_value(key), b"value")
+        self.assertEqual(len(calls), 1)
+
+        service.invalidate(key, b"new")
+        self.assertEqual(await service.find_value(key), b"new")
+        service.invalidate(key)
+        self.assertEqual(await service.find_value(key), b"value")
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,35 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class ClusterTest(unittest.TestCase):
+    def test_percentile(self):
+        benchmark = ddcm.Benchmark(ddcm.Cluster(None, 0))
+        latencies = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(latencies, 50), 50)
+        self.assertEqual(benchmark.percentile(latencies, 99), 99)
+        self.assertEqual(benchmark.percentile(latencies, 99.9), 100)
+        self.assertEqual(benchmark.percentile([3], 50), 3)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+    def test_benchmark(self):
+        loop = asyncio.get_event_loop()
+        cluster = ddcm.Cluster(loop, 8, basePort = 10100)
+        loop.run_until_complete(cluster.start())
+        try:
+            self.assertEqual(len(cluster), 8)
+            for service in cluster.services[1:]:
+                self.assertGreater(len(service.route.findNeighbors(service.tcpService.node)), 0)
+            benchmark = ddcm.Benchmark(cluster, 1)
+            results = loop.run_until_complete(benchmark.run_all(20, 4))
+        finally:
+            loop.run_until_complete(cluster.stop())
+        self.assertEqual([result["workload"] for result in results], ddcm.Benchmark.WORKLOADS)
+        for result in results:
+            self.assertEqual(result["operations"], 20)
+            self.assertEqual(result["errors"], 0)
+            self.assertLessEqual(result["latency"]["p50"], result["latency"]["p99"])
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class CodecTest(unittest.TestCase):
+    @utils.NetworkTestCase
+    async def test_encode(self, loop, config, service):
+        codec = service.codec
+        text = b"map reduce word count " * 200
+        self.assertEqual(await codec.encode(b"short"), (ddcm.const.kad.codec.RAW, b"short"))
+        # Does not pay, kept raw
+        noise = os.urandom(4096)
+        self.assertEqual(await codec.encode(noise), (ddcm.const.kad.codec.RAW, noise))
+
+        kind, data = await codec.encode(text)
+        self.assertEqual(kind, ddcm.const.kad.codec.ZLIB)
+        self.assertLess(len(data), len(text) / 5)
+        self.assertEqual(await codec.decode(kind, data), text)
+
+        # Compressed in the thread pool
+        large = text * ((ddcm.const.kad.codec.COMPRESS_LZMA_SIZE // len(text)) + 1)
+        kind, data = await codec.encode(large)
+        self.assertEqual(kind, ddcm.const.kad.codec.LZMA)
+        self.assertIsNotNone(codec.executor)
+        self.assertEqual(await codec.decode(kind, data), large)
+        self.assertEqual(codec.raw[ddcm.const.kad.codec.LZMA].value, len(large))
+
+        with self.assertRaises(ValueError):
+            ddcm.Codec.decompress(255, data)
+        # Values from peers are bounded, and must be whole
+        with self.assertRaises(ddcm.CodecError):
+            ddcm.Codec.decompress(kind, data, limit = len(large) - 1)
+        with self.assertRaises(ddcm.CodecError):
+            ddcm.Codec.decompress(kind, data[:-10])
+        kind, data = await codec.encode(text)
+        with self.assertRaises(ddcm.CodecError):
+            ddcm.Codec.decompress(kind, data, limit = len(text) // 2)
+        with self.assertRaises(ddcm.CodecError):
+            ddcm.Codec.decompress(kind, b"not zlib")
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_corrupt(self, loop, configs, services):
+        A, B, C = services["A"], services["B"], services["C"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        key = ddcm.utils.get_random_node_id()
+        await B.storage.store(key, b"first")
+        watch = A.watch(key)
+        self.assertEqual(await asyncio.wait_for(watch.__anext__(), 1, loop = loop), b"first")
+
+        # A value which does not decompress is not pushed, B goes on
+        await (await C.tcpService.call.store(
+            B.tcpService.node.remote, key, b"not zlib", codec = ddcm.const.kad.codec.ZLIB
+        ))
+        event = await (await C.tcpService.call.cas(B.tcpService.node.remote, key, None, b"fixed"))
+        self.assertEqual(event["data"]["data"], (key, True, b"fixed"))
+        self.assertEqual(await asyncio.wait_for(watch.__anext__(), 1, loop = loop), b"fixed")
+        watch.close()
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_negotiate(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        self.assertEqual(A.codec.peers[B.tcpService.node.id], ddcm.const.kad.codec.CAPABILITIES)
+        self.assertEqual(B.codec.peers[A.tcpService.node.id], ddcm.const.kad.codec.CAPABILITIES)
+
+        key, value = ddcm.utils.get_random_node_id(), b"map reduce word count " * 200
+        await A.store(key, value)
+        # Compressed once, stored and sent as it is
+        kind, data = await A.storage.get_encoded(key)
+        self.assertEqual(kind, ddcm.const.kad.codec.ZLIB)
+        self.assertEqual(await B.storage.get_encoded(key), (kind, data))
+        self.assertEqual(await B.storage.get(key), value)
+        self.assertEqual(B.storage.size, len(data))
+
+        # A peer which did not say it reads zlib gets values raw
+        B.codec.peers[A.tcpService.node.id] = 0
+        event = await (await A.tcpService.call.findValue(B.tcpService.node.remote, key))
+        self.assertEqual(event["data"]["data"], (key, value, False))
+        A.codec.peers[B.tcpService.node.id] = 0
+        other = ddcm.utils.get_random_node_id()
+        await A.store(other, value)
+        self.assertEqual(await B.storage.get_encoded(other), (ddcm.const.kad.codec.RAW, value))
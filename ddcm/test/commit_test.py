@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import json
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class CommitTest(unittest.TestCase):
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_cas(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        remote = B.tcpService.node.remote
+        key = ddcm.utils.get_random_node_id()
+        first, second = ddcm.utils.get_random_node_id(), ddcm.utils.get_random_node_id()
+
+        event = await (await A.tcpService.call.cas(remote, key, None, first))
+        self.assertEqual(event["data"]["data"], (key, True, first))
+        # Sent twice, it is still set
+        event = await (await A.tcpService.call.cas(remote, key, None, first))
+        self.assertEqual(event["data"]["data"], (key, True, first))
+        event = await (await A.tcpService.call.cas(remote, key, None, second))
+        self.assertEqual(event["data"]["data"], (key, False, first))
+        self.assertEqual(await B.storage.get(key), first)
+        event = await (await A.tcpService.call.cas(remote, key, first, second))
+        self.assertEqual(event["data"]["data"], (key, True, second))
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_batch(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        first = await A.commit("first")
+        ids = await asyncio.gather(*[A.commit({"count": i}) for i in range(10)], loop = loop)
+        self.assertEqual(len(set(ids)), 1)
+
+        commit_id, commit = await B.get_latest_commit()
+        self.assertEqual(commit_id, ids[0])
+        self.assertCountEqual(commit["data"], [{"count": i} for i in range(10)])
+        self.assertEqual(commit["batch"], 10)
+        self.assertEqual(commit["lstcommit"], [ddcm.utils.get_hash_string(first)])
+        # Each commit is hashed on its own
+        self.assertEqual(hashlib.sha1(await B.find_value(commit_id)).digest(), commit_id)
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_rebase(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        # A keeps the head too, and is the replica B writes to
+        first = await A.commit("first", cached = True)
+        # B has not seen the head move, its head is stale
+        B.commits.head, B.commits.known = None, True
+        second = await B.commit("second")
+        self.assertEqual(B.commits.conflicts.value, 1)
+        self.assertEqual(await A.storage.get(ddcm.const.kad.commit.HEAD), second)
+        commit_id, commit = await A.get_latest_commit()
+        self.assertEqual(commit_id, second)
+        self.assertEqual(commit["lstcommit"], [ddcm.utils.get_hash_string(first)])
+
+    def test_format(self):
+        author, parents = ddcm.utils.get_random_node_id(), [ddcm.utils.get_random_node_id() for i in range(3)]
+        commit = ddcm.Commit.create([{"count": 1}, b"\x00\xff"], parents, 1500000000, author)
+        data = commit.encode()
+        self.assertEqual(len(data), 33 + 20 * 3 + 4 + 5 + len(b'{"count": 1}') + 5 + 2)
+
+        # The header is read without the data
+        decoded = ddcm.Commit.decode(data)
+        self.assertEqual((decoded.time, decoded.author, decoded.parents, decoded.batch), (1500000000, author, parents, 2))
+        self.assertIsNone(decoded.__data__)
+        self.assertEqual(decoded["data"], [{"count": 1}, b"\x00\xff"])
+        self.assertEqual(decoded["lstcommit"], [ddcm.utils.get_hash_string(parent) for parent in parents])
+        self.assertEqual(decoded.get("batch"), 2)
+        self.assertIsNone(ddcm.Commit.decode(ddcm.Commit.create(["one"], [], 0, author).encode()).get("batch"))
+
+        with self.assertRaises(ddcm.CommitFormatError):
+            ddcm.Commit.decode(data[:40])
+        with self.assertRaises(ddcm.CommitFormatError):
+            ddcm.Commit.decode(b"\xff" + data[1:])
+
+    def test_json(self):
+        author, parent = ddcm.utils.get_random_node_id(), ddcm.utils.get_random_node_id()
+        legacy = {
+            "data": {"task": "word count"},
+            "lstcommit": [ddcm.utils.get_hash_string(parent)],
+            "time": 1500000000,
+            "author": ddcm.utils.get_hash_string(author)
+        }
+        commit = ddcm.Commit.decode(json.dumps(legacy).encode("utf-8"))
+        self.assertEqual(commit.parents, [parent])
+        self.assertEqual(commit.author, author)
+        self.assertEqual(commit.to_dict(), legacy)
+        with self.assertRaises(ddcm.CommitFormatError):
+            ddcm.Commit.decode(b"{not json")
@@ -0,0 +1,38 @@
+import os
+import unittest
+
+import ddcm
+
+from . import const
+
+from ddcm.ContactArray import numpy
+
+class ContactArrayTest(unittest.TestCase):
+    def get_nodes(self, count, prefix = b""):
+        return [ddcm.Node(prefix + os.urandom(20 - len(prefix))) for i in range(count)]
+
+    def get_nearest(self, nodes, target, k):
+        targetHash = int.from_bytes(target, byteorder = "big")
+        return sorted(((node.distance(targetHash), node) for node in nodes), key = lambda pair: pair[0])[:k]
+
+    def check(self, vectorized):
+        nodes = self.get_nodes(2000)
+        contacts = ddcm.ContactArray(nodes, vectorized = vectorized)
+        targets = [os.urandom(20) for i in range(50)]
+        for target, nearest in zip(targets, contacts.nearest_many(targets, 20)):
+            self.assertEqual(nearest, self.get_nearest(nodes, target, 20))
+
+        # Equal high lanes, ranked on the others
+        tied = self.get_nodes(100, prefix = b"\x01" * 8)
+        contacts.extend(tied)
+        target = b"\x01" * 8 + os.urandom(12)
+        self.assertEqual(contacts.nearest(target, 30), self.get_nearest(nodes + tied, target, 30))
+        self.assertEqual(len(contacts.nearest(target, 5000)), 2100)
+        self.assertEqual(ddcm.ContactArray(vectorized = vectorized).nearest(target, 3), [])
+
+    def test_python(self):
+        self.check(False)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        self.check(True)
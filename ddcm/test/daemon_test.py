@@ -0,0 +1,99 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class DaemonTest(unittest.TestCase):
+    def DaemonTestCase(func):
+        async def _deco(*args, **kwargs):
+            loop, service = kwargs['loop'], kwargs['service']
+            path = os.path.join(tempfile.mkdtemp(), "ddcm.sock")
+            daemon = ddcm.DaemonServer(loop, service, path = path)
+            await daemon.start_server()
+            client = ddcm.DaemonClient(loop)
+            await client.connect(path)
+            try:
+                return await func(*args, client = client, daemon = daemon, **kwargs)
+            finally:
+                await client.close()
+                await daemon.stop_server()
+                kwargs['self'].assertFalse(os.path.exists(path))
+        return _deco
+
+    @utils.NetworkTestCase
+    @DaemonTestCase
+    async def test_pipeline(self, loop, config, service, client, daemon):
+        keys = [ddcm.utils.get_random_node_id() for i in range(50)]
+        await asyncio.gather(
+            *[client.store(key, key * 2) for key in keys],
+            loop = loop
+        )
+        values = await asyncio.gather(
+            *[client.find_value(key) for key in keys],
+            loop = loop
+        )
+        self.assertEqual(values, [key * 2 for key in keys])
+        self.assertIsNone(await client.find_value(ddcm.utils.get_random_node_id()))
+        self.assertEqual(daemon.requests[ddcm.const.kad.daemon.STORE].value, 50)
+        with self.assertRaises(ddcm.DaemonError):
+            await client.request(255)
+
+    @utils.NetworkTestCase
+    @DaemonTestCase
+    async def test_commit(self, loop, config, service, client, daemon):
+        commit_id = await client.commit({"count": 1})
+        latest_id, commit = await client.get_latest_commit()
+        self.assertEqual(latest_id, commit_id)
+        self.assertEqual(commit["data"], {"count": 1})
+
+        task_id = await client.submit("word count")
+        history = []
+        async for commit_id, commit in client.history(10):
+            history.append((commit_id, commit))
+        self.assertEqual(history[0][0], task_id)
+        self.assertEqual(history[0][1]["data"], {"task": "word count"})
+        with self.assertRaises(ddcm.DaemonError):
+            await client.request(ddcm.const.kad.daemon.COMMIT, b"not json")
+
+    @utils.NetworkTestCase
+    @DaemonTestCase
+    async def test_watch(self, loop, config, service, client, daemon):
+        key = ddcm.utils.get_random_node_id()
+        await client.store(key, b"first")
+        stream = client.watch(key)
+        self.assertEqual(await asyncio.wait_for(stream.__anext__(), 1, loop = loop), b"first")
+        await client.store(key, b"second")
+        self.assertEqual(await asyncio.wait_for(stream.__anext__(), 1, loop = loop), b"second")
+
+    @utils.NetworkTestCase
+    @DaemonTestCase
+    async def test_watch_close(self, loop, config, service, client, daemon):
+        key = ddcm.utils.get_random_node_id()
+        await client.store(key, b"first")
+        stream = client.watch(key)
+        self.assertEqual(await asyncio.wait_for(stream.__anext__(), 1, loop = loop), b"first")
+        self.assertEqual(daemon.connections, 1)
+        # Closing the client ends its watch with the connection
+        await client.close()
+        for i in range(50):
+            if daemon.connections == 0:
+                break
+            await asyncio.sleep(0.02, loop = loop)
+        self.assertEqual(daemon.connections, 0)
+        self.assertNotIn(key, service.watches.watches)
+        self.assertNotIn(key, service.watches.subscribed)
+
+    @utils.NetworkTestCase
+    @DaemonTestCase
+    async def test_watch_many(self, loop, config, service, client, daemon):
+        keys = [ddcm.utils.get_random_node_id() for i in range(ddcm.const.kad.daemon.DAEMON_MAX_PIPELINE + 1)]
+        streams = [client.watch(key) for key in keys]
+        # Watches hold no pipeline slot, a request still goes through
+        key = ddcm.utils.get_random_node_id()
+        await asyncio.wait_for(client.store(key, b"value"), 5, loop = loop)
+        self.assertEqual(await asyncio.wait_for(client.find_value(key), 5, loop = loop), b"value")
@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class HistoryTest(unittest.TestCase):
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_sync(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        ids = [await A.commit({"count": i}) for i in range(40)]
+
+        head, commit = await A.get_latest_commit()
+        self.assertEqual(len(commit["lstcommit"]), ddcm.const.kad.commit.COMMIT_ANCESTORS)
+        self.assertEqual(
+            commit["lstcommit"],
+            [ddcm.utils.get_hash_string(commit_id) for commit_id in ids[-2:-18:-1]]
+        )
+
+        commits = await B.history.sync()
+        self.assertEqual([commit_id for commit_id, commit in commits], ids[::-1])
+        self.assertEqual([commit["data"] for commit_id, commit in commits][-1], {"count": 0})
+        # One batch per COMMIT_ANCESTORS - 1 commits, and one for the head
+        self.assertLessEqual(B.history.batches.value, 40 // (ddcm.const.kad.commit.COMMIT_ANCESTORS - 1) + 2)
+
+        # Only new commits are fetched again
+        more = [await A.commit({"count": i}) for i in range(40, 45)]
+        fetched = B.history.fetched.value
+        commits = await B.history.sync()
+        self.assertEqual([commit_id for commit_id, commit in commits], more[::-1])
+        self.assertEqual(B.history.fetched.value, fetched + 5)
+        self.assertEqual(await B.history.sync(), [])
+
+    @utils.NetworkTestCase
+    async def test_walk(self, loop, config, service):
+        ids = [await service.commit({"count": i}) for i in range(5)]
+        history = []
+        async for commit_id, commit in service.history.walk(ids[-1], 3):
+            history.append(commit_id)
+        self.assertEqual(history, ids[:1:-1])
+        # An unknown commit ends the history
+        history = []
+        async for commit_id, commit in service.history.walk(ddcm.utils.get_random_node_id()):
+            history.append(commit_id)
+        self.assertEqual(history, [])
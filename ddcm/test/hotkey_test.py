@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class HotKeyTest(unittest.TestCase):
+    def test_sketch(self):
+        sketch = ddcm.CountMinSketch(64, 4)
+        keys = [ddcm.utils.get_random_node_id() for i in range(200)]
+        for count, key in enumerate(keys):
+            sketch.add(key, count % 7)
+        for count, key in enumerate(keys):
+            self.assertGreaterEqual(sketch.estimate(key), count % 7)
+        hot = b"\x00" * 20
+        for i in range(1000):
+            sketch.add(hot)
+        self.assertGreaterEqual(sketch.estimate(hot), 1000)
+        self.assertLess(sketch.estimate(hot), 1000 + 7 * 200)
+        sketch.decay()
+        self.assertLess(sketch.estimate(hot), 1000)
+
+    @utils.NetworkTestCase
+    async def test_promote_cool(self, loop, config, service):
+        hotKeys = service.hotKeys
+        key, cold = b"\x00" * 20, ddcm.utils.get_random_node_id()
+        for i in range(ddcm.const.kad.hotkey.HOT_THRESHOLD - 1):
+            self.assertFalse(hotKeys.record(key))
+        self.assertTrue(hotKeys.record(key))
+        self.assertFalse(hotKeys.record(cold))
+        self.assertTrue(hotKeys.is_hot(key))
+        self.assertEqual(hotKeys.replicas(key), service.route.ksize * ddcm.const.kad.hotkey.HOT_REPLICATION)
+        self.assertEqual(hotKeys.replicas(cold), service.route.ksize)
+        self.assertEqual(hotKeys.promoted.value, 1)
+
+        # Halved once it is still above the cool threshold, twice it is not
+        hotKeys.cool()
+        self.assertTrue(hotKeys.is_hot(key))
+        hotKeys.cool()
+        hotKeys.cool()
+        self.assertFalse(hotKeys.is_hot(key))
+        self.assertEqual(hotKeys.demoted.value, 1)
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_hot_pong(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        key = ddcm.utils.get_random_node_id()
+        await B.storage.store(key, b"value")
+        event = await (await A.tcpService.call.findValue(B.tcpService.node.remote, key))
+        self.assertEqual(event["data"]["data"], (key, b"value", False))
+        for i in range(ddcm.const.kad.hotkey.HOT_THRESHOLD - 2):
+            B.hotKeys.record(key)
+        event = await (await A.tcpService.call.findValue(B.tcpService.node.remote, key))
+        self.assertEqual(event["data"]["data"], (key, b"value", True))
+        self.assertIn(key, B.hotKeys.hot)
+
+        # A learns the key is hot, and caches it for longer
+        self.assertEqual(await A.find_value(key), b"value")
+        self.assertTrue(A.hotKeys.is_hot(key))
+        expire, value = A.cache.data[key]
+        self.assertGreater(expire, loop.time() + ddcm.const.kad.cache.CACHE_TTL)
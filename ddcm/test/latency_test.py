@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class LatencyTest(unittest.TestCase):
+    def get_id_node(self, id):
+        return ddcm.Node(
+            id.to_bytes(20, byteorder='big')
+        )
+
+    def test_update(self):
+        latency = ddcm.Latency()
+        self.assertEqual(latency.timeout(), ddcm.const.kad.query.RPC_TIMEOUT)
+        latency.update(0.2)
+        self.assertAlmostEqual(latency.srtt, 0.2)
+        self.assertAlmostEqual(latency.rttvar, 0.1)
+        latency.update(0.4)
+        self.assertAlmostEqual(latency.rttvar, 0.75 * 0.1 + 0.25 * 0.2)
+        self.assertAlmostEqual(latency.srtt, 0.875 * 0.2 + 0.125 * 0.4)
+        self.assertAlmostEqual(latency.timeout(), latency.srtt + 4 * latency.rttvar)
+        self.assertAlmostEqual(latency.p95(), latency.srtt + 2 * latency.rttvar)
+
+    def test_timeout_bounds(self):
+        latency = ddcm.Latency()
+        latency.update(0.001)
+        self.assertEqual(latency.timeout(), ddcm.const.kad.query.RTT_MIN_TIMEOUT)
+        latency.update(100)
+        self.assertEqual(latency.timeout(), ddcm.const.kad.query.RPC_TIMEOUT)
+
+    def test_findNeighbors_latency(self):
+        route = ddcm.Route(None, None, 20, 0)
+        fast, slow = self.get_id_node(2 ** 80 + 1), self.get_id_node(2 ** 80 + 2)
+        far = self.get_id_node(2 ** 100)
+        for node in [slow, fast, far]:
+            route.addNode(node)
+        route.updateLatency(slow, 0.5)
+        route.updateLatency(fast, 0.01)
+        route.updateLatency(far, 0.001)
+        neighbors = [node for distance, node in route.findNeighbors(self.get_id_node(2 ** 80))]
+        self.assertEqual(neighbors, [fast, slow, far])
+        route.removeNode(fast)
+        self.assertNotIn(fast.id, route.latency)
+
+    def test_rank_by_distance(self):
+        route = ddcm.Route(None, None, 20, 0)
+        nodes = [self.get_id_node(2 ** 80 + i) for i in range(1, 4)]
+        route.updateLatency(nodes[0], 0.5)
+        route.updateLatency(nodes[1], 0.1)
+        route.updateLatency(nodes[2], 0.001)
+        # The closest are kept whatever their latency, then the faster first
+        ranked = [node for distance, node in route.rank(nodes, 2 ** 80 + 8, 2)]
+        self.assertEqual(ranked, [nodes[1], nodes[0]])
+
+    @utils.NetworkTestCase
+    async def test_hedge(self, loop, config, service):
+        slow, fast = self.get_id_node(1), self.get_id_node(2)
+        service.route.updateLatency(slow, 0.01)
+        futures = {slow.id: asyncio.Future(loop = loop), fast.id: asyncio.Future(loop = loop)}
+        async def call(node):
+            if node is fast:
+                futures[fast.id].set_result("pong")
+            return futures[node.id]
+        replies, called = await service.__query__([slow, fast], call, 1)
+        self.assertEqual(replies, [(fast, "pong")])
+        self.assertEqual(called, [slow, fast])
+        self.assertTrue(futures[slow.id].cancelled())
@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class MemoryTransportTest(unittest.TestCase):
+    def test_delay(self):
+        loop = asyncio.get_event_loop()
+        network = ddcm.MemoryNetwork(loop, latency = 0.1, bandwidth = 1000)
+        now = loop.time()
+        source, destination = ("127.0.0.1", 1), ("127.0.0.2", 1)
+        self.assertAlmostEqual(network.delay(source, destination, 100), 0.2, places = 2)
+        # The second message waits for the first on the sender's link
+        self.assertAlmostEqual(network.delay(source, destination, 100), 0.3, places = 2)
+        self.assertAlmostEqual(network.delay(destination, source, 100), 0.2, places = 2)
+
+    def test_cluster(self):
+        loop = asyncio.get_event_loop()
+        network = ddcm.MemoryNetwork(loop, latency = 0.001, seed = 1)
+        cluster = ddcm.Cluster(loop, 16, network = network)
+        loop.run_until_complete(cluster.start())
+        try:
+            self.assertEqual(network.stats()["servers"], 16)
+            source, target = cluster.services[3], cluster.services[11]
+            pong = loop.run_until_complete(
+                loop.run_until_complete(
+                    source.tcpService.call.ping(target.tcpService.node.remote)
+                )
+            )
+            self.assertEqual(pong["data"]["remoteNode"].id, target.tcpService.node.id)
+            node = loop.run_until_complete(source.find_node(target.tcpService.node.id))
+            self.assertEqual(node.id, target.tcpService.node.id)
+        finally:
+            loop.run_until_complete(cluster.stop())
+        self.assertEqual(network.stats()["servers"], 0)
+        self.assertGreater(network.delivered, 0)
+        self.assertEqual(network.dropped, 0)
+
+    def test_loss(self):
+        loop = asyncio.get_event_loop()
+        network = ddcm.MemoryNetwork(loop, loss = 1)
+        cluster = ddcm.Cluster(loop, 2, network = network)
+        loop.run_until_complete(cluster.start(bootstrap = False))
+        try:
+            future = loop.run_until_complete(
+                cluster.services[0].tcpService.call.ping(
+                    cluster.services[1].tcpService.node.remote,
+                    timeout = 0.2
+                )
+            )
+            with self.assertRaises(asyncio.TimeoutError):
+                loop.run_until_complete(future)
+            with self.assertRaises(ConnectionRefusedError):
+                loop.run_until_complete(
+                    cluster.services[0].tcpService.call.ping(ddcm.Remote("127.0.0.9", 1))
+                )
+        finally:
+            loop.run_until_complete(cluster.stop())
+        self.assertEqual(network.sent, network.dropped)
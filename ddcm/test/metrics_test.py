@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class MetricsTest(unittest.TestCase):
+    def test_render(self):
+        metrics = ddcm.Metrics()
+        counter = metrics.counter("test_total", "A counter", {"command": "PING"})
+        counter.inc()
+        counter.inc(2)
+        metrics.gauge("test_gauge", "A gauge", func = lambda: [({"bucket": 0}, 5)])
+        histogram = metrics.histogram("test_seconds", "A histogram", buckets = (0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        lines = metrics.render().splitlines()
+        self.assertIn("# TYPE test_total counter", lines)
+        self.assertIn('test_total{command="PING"} 3', lines)
+        self.assertIn('test_gauge{bucket="0"} 5', lines)
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{le="1"} 2', lines)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn("test_seconds_count 3", lines)
+
+    @utils.NetworkTestCase
+    async def test_rpc_metrics(self, loop, config, service):
+        await asyncio.wait_for(
+            await service.tcpService.call.ping(ddcm.Remote(
+                host = "127.0.0.1",
+                port = config["server"]["port"]
+            )),
+            timeout = const.test.PING_TIMEOUT,
+            loop = loop
+        )
+        lines = service.metrics.render().splitlines()
+        self.assertIn('ddcm_messages_sent_total{command="PING"} 1', lines)
+        self.assertIn('ddcm_messages_received_total{command="PING"} 1', lines)
+        self.assertIn('ddcm_rpc_duration_seconds_count{command="PING"} 1', lines)
+        self.assertIn("ddcm_pending_calls 0", lines)
+
+    @utils.NetworkTestCase
+    async def test_server(self, loop, config, service):
+        server = ddcm.MetricsServer(loop, service.metrics, "127.0.0.1", 8571)
+        await server.start_server()
+        reader, writer = await asyncio.open_connection("127.0.0.1", 8571, loop = loop)
+        writer.write(b"GET /metrics HTTP/1.0\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        await server.stop_server()
+        self.assertTrue(response.startswith(b"HTTP/1.0 200 OK"))
+        self.assertIn(b"ddcm_event_queue_depth", response)
@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class RebalanceTest(unittest.TestCase):
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_hand_off(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        keys = [ddcm.utils.get_random_node_id() for i in range(20)]
+        for key in keys:
+            await A.storage.store(key, key[::-1])
+
+        # B joins, and A hands it every key it is now closer to
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        self.assertFalse(A.route.isNewNode(B.tcpService.node))
+        await A.rebalancer.worker
+        for key in keys:
+            self.assertTrue(await B.storage.exist(key))
+            self.assertEqual(await B.storage.get(key), key[::-1])
+        self.assertEqual(A.rebalancer.handedOff.value, len(keys))
+
+        # A known contact does not draw the keys again
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        self.assertTrue(A.rebalancer.worker.done())
+        self.assertEqual(A.rebalancer.handedOff.value, len(keys))
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_closest_holder_only(self, loop, configs, services):
+        A, B, C = services["A"], services["B"], services["C"]
+        await (await A.tcpService.call.ping(C.tcpService.node.remote))
+        await A.rebalancer.worker
+        node = B.tcpService.node
+        key = ddcm.utils.get_random_node_id()
+        selfDistance = int.from_bytes(key, byteorder = "big") ^ A.route.selfNode
+        closer = C.tcpService.node.distance(int.from_bytes(key, byteorder = "big")) < selfDistance
+        A.route.addNode(node)
+        self.assertEqual(A.rebalancer.belongs(key, node), not closer)
+
+    @utils.MultiNetworkTestCase(["A"])
+    async def test_candidates(self, loop, configs, services):
+        A = services["A"]
+        selfHash = A.route.selfNode
+        def near(distance):
+            return (selfHash ^ distance).to_bytes(20, byteorder = "big")
+        # k contacts nearer to A than far, which then gets no near keys
+        for i in range(A.route.ksize):
+            A.route.addNode(ddcm.Node(near(2 ** 100 + i), remote = ddcm.Remote("127.0.0.1", 9000)), notify = False)
+        far = ddcm.Node(near(2 ** 150), remote = ddcm.Remote("127.0.0.1", 9001))
+        A.route.addNode(far, notify = False)
+        nearKey, farKey = near(5), near(2 ** 150 + 5)
+        for key in [nearKey, farKey]:
+            await A.storage.store(key, key)
+        self.assertEqual(A.rebalancer.candidates(far), [farKey])
+        self.assertEqual(await A.rebalancer.keys_for(far), [farKey])
+        # A hot key is kept on more nodes, far is among them
+        A.hotKeys.hot.add(nearKey)
+        self.assertEqual(await A.rebalancer.keys_for(far), [nearKey, farKey])
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_find_value_miss(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        key = ddcm.utils.get_random_node_id()
+        event = await (await A.tcpService.call.findValue(B.tcpService.node.remote, key))
+        self.assertEqual(event["data"]["data"], (key, None, False))
+        self.assertIsNone(await A.find_value(key))
@@ -54,6 +54,20 @@ class RouteTest(unittest.TestCase):
         route.removeNode(node)
         self.assertTrue(bucket.isNewNode(node))
 
+    @TestCase(20, None)
+    def test_removeNode_promote(self, route, selfNode):
+        node, replacement = self.get_random_node(), self.get_random_node()
+        route.addNode(node)
+        joined = []
+        route.newNodeCallbacks.append(joined.append)
+        bucket = route.buckets[route.getBucket(node.hash)]
+        bucket.replaceNodes[replacement.id] = replacement
+        # The replacement taking the place of node joins the table
+        route.removeNode(node)
+        self.assertFalse(route.isNewNode(replacement))
+        self.assertEqual(joined, [replacement])
+        self.assertIn(replacement.id, route.lastSeen)
+
     @TestCase(
         2,
         0
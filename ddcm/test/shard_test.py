@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class ShardTest(unittest.TestCase):
+    @utils.MultiNetworkTestCase(["B"])
+    async def test_shards(self, loop, configs, services):
+        B = services["B"]
+        config = ddcm.utils.load_config("ddcm/test/config/configA.json")
+        config["shard"] = {"port": 8980}
+        # Both workers in this process, as two processes would run them
+        workers = [ddcm.Service(config, loop) for config in ddcm.ShardGroup(config, 2).configs]
+        for worker in workers:
+            await worker.start()
+        try:
+            remote = workers[0].tcpService.node.remote
+            self.assertEqual(workers[1].shard.target(
+                ddcm.const.kad.command.PONG, workers[1].shard.echo(ddcm.utils.get_echo_bytes()), None
+            ), 1)
+
+            keys = [ddcm.utils.get_random_node_id() for i in range(16)]
+            for key in keys:
+                await (await B.tcpService.call.store(remote, key, key))
+            # Each key is kept by the worker of its shard only
+            for key in keys:
+                owner = workers[0].shard.owner(key)
+                self.assertTrue(await workers[owner].storage.exist(key))
+                self.assertFalse(await workers[1 - owner].storage.exist(key))
+                event = await (await B.tcpService.call.findValue(remote, key))
+                self.assertEqual(event["data"]["data"], (key, key, False))
+
+            # A write on a worker is kept by the worker of its key
+            keys = [ddcm.utils.get_random_node_id() for i in range(8)]
+            for key in keys:
+                await workers[0].store(key, key)
+                owner = workers[0].shard.owner(key)
+                self.assertTrue(await workers[owner].storage.exist(key))
+                self.assertFalse(await workers[1 - owner].storage.exist(key))
+            self.assertFalse(workers[1].route.isNewNode(B.tcpService.node))
+            self.assertTrue(workers[1].route.isNewNode(workers[0].tcpService.node))
+            self.assertGreater(sum(worker.shard.forwarded.value for worker in workers), 0)
+
+            # Pongs reach the worker which called, whichever socket gets them
+            for worker in workers:
+                for i in range(4):
+                    await (await worker.tcpService.call.ping(B.tcpService.node.remote))
+
+            # A contact learnt by one worker is sent to the other
+            node = ddcm.Node(ddcm.utils.get_random_node_id(), B.tcpService.node.remote)
+            workers[0].route.addNode(node)
+            await asyncio.sleep(0.2, loop = loop)
+            self.assertFalse(workers[1].route.isNewNode(node))
+            self.assertGreater(workers[1].shard.synced_nodes.value, 0)
+        finally:
+            for worker in workers:
+                await worker.stop()
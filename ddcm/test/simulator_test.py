@@ -0,0 +1,44 @@
+import asyncio
+import random
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class SimulatorTest(unittest.TestCase):
+    def test_virtual_loop(self):
+        loop = ddcm.VirtualLoop()
+        try:
+            loop.run_until_complete(asyncio.sleep(3600, loop = loop))
+            self.assertEqual(loop.time(), 3600)
+        finally:
+            loop.close()
+
+    def simulate(self, seed):
+        config = ddcm.Cluster.default_config()
+        config["kbucket"]["ksize"] = 8
+        simulator = ddcm.Simulator(32, seed = seed, config = config, jitter = 0.02)
+        simulator.start()
+        try:
+            report = simulator.run(32, churn = 0.1, churnInterval = 1)
+        finally:
+            simulator.stop()
+        del report["wall_time"]
+        return report
+
+    def test_simulate(self):
+        report = self.simulate(1)
+        self.assertEqual(report["lookups"], 32)
+        self.assertEqual(report["ksize"], 8)
+        self.assertGreater(report["success_rate"], 0)
+        self.assertGreater(report["messages"], 0)
+        self.assertGreaterEqual(report["hops"]["max"], report["hops"]["p50"])
+        self.assertEqual(report, self.simulate(1))
+
+    def test_global_random(self):
+        state = random.getstate()
+        simulator = ddcm.Simulator(4, seed = 1)
+        self.assertEqual(random.getstate(), state)
+        simulator.loop.close()
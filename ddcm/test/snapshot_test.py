@@ -0,0 +1,63 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class SnapshotTest(unittest.TestCase):
+    def get_path(self):
+        return os.path.join(tempfile.mkdtemp(), "route.snapshot")
+
+    @utils.NetworkTestCase
+    async def test_dump_load(self, loop, config, service):
+        nodes = [
+            ddcm.Node(ddcm.utils.get_random_node_id(), remote = ddcm.Remote("127.0.0.%d" % i, 9000 + i))
+            for i in range(1, 30)
+        ]
+        for node in nodes:
+            service.route.addNode(node)
+        service.route.updateLatency(nodes[0], 0.25)
+        snapshot = ddcm.RouteSnapshot(loop, service, self.get_path())
+        contacts = {node.id: (node, lastSeen, latency) for node, lastSeen, latency in snapshot.load(snapshot.dump())}
+        self.assertEqual(len(contacts), len(list(service.route.getNodes())))
+        node, lastSeen, latency = contacts[nodes[0].id]
+        self.assertEqual((node.remote.host, node.remote.port), ("127.0.0.1", 9001))
+        self.assertAlmostEqual(latency.srtt, 0.25)
+        self.assertEqual(latency.samples, 1)
+        self.assertAlmostEqual(lastSeen, time.time(), delta = 60)
+        self.assertIsNone(contacts[nodes[1].id][2])
+        with self.assertRaises(ValueError):
+            snapshot.load(b"not a snapshot")
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_restore(self, loop, configs, services):
+        service = services["A"]
+        for name in ["B", "C"]:
+            await (await service.tcpService.call.ping(services[name].tcpService.node.remote))
+        dead = ddcm.Node(ddcm.utils.get_random_node_id(), remote = ddcm.Remote("127.0.0.1", 8999))
+        service.route.addNode(dead)
+
+        path = self.get_path()
+        snapshot = ddcm.RouteSnapshot(loop, service, path)
+        snapshot.save()
+        known = set(node.id for node in service.route.getNodes())
+
+        # Restart with an empty routing table
+        service.route = ddcm.Route(service, loop, service.route.ksize, service.route.selfNode)
+        joined = []
+        service.route.newNodeCallbacks.append(joined.append)
+        snapshot = ddcm.RouteSnapshot(loop, service, path)
+        self.assertEqual(snapshot.restore(), len(known))
+        self.assertEqual(joined, [])
+        self.assertEqual(set(node.id for node in service.route.getNodes()), known)
+
+        await snapshot.revalidate()
+        self.assertEqual(snapshot.dropped, 1)
+        self.assertTrue(service.route.isNewNode(dead))
+        for name in ["B", "C"]:
+            self.assertFalse(service.route.isNewNode(services[name].tcpService.node))
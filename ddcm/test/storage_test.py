@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class StorageTest(unittest.TestCase):
+    def StorageTestCase(func):
+        def _deco(self, *args, **kwargs):
+            loop = asyncio.get_event_loop()
+            return loop.run_until_complete(func(self, *args, storage = ddcm.Storage(), **kwargs))
+        return _deco
+
+    @StorageTestCase
+    async def test_dedup(self, storage):
+        value = b"replicated" * 100
+        for i in range(10):
+            await storage.store(bytes([i]) * 20, value)
+        self.assertEqual(len(storage.blobs), 1)
+        self.assertEqual(storage.size, len(value))
+        self.assertEqual(storage.logical, len(value) * 10)
+        self.assertEqual(await storage.get(b"\x05" * 20), value)
+        # Encoded alike, kept apart
+        await storage.store_encoded(b"\x0a" * 20, ddcm.const.kad.codec.ZLIB, value)
+        self.assertEqual(len(storage.blobs), 2)
+
+    @StorageTestCase
+    async def test_collect(self, storage):
+        keys = [bytes([i]) * 20 for i in range(40)]
+        for key in keys:
+            await storage.store(key, key * 2)
+        for key in keys:
+            await storage.store(key, b"same")
+        self.assertEqual(storage.logical, 4 * 40)
+        # Garbage is kept until there is enough of it
+        self.assertEqual(len(storage.garbage), 40)
+        self.assertEqual(storage.garbageSize, 40 * 40)
+        self.assertEqual(storage.collect(), ddcm.const.kad.storage.STORAGE_GC_STEP)
+        storage.collect(len(keys))
+        self.assertEqual((storage.size, storage.garbageSize), (4, 0))
+
+        # A value stored again before it is freed is kept
+        await storage.store(keys[0], b"again")
+        await storage.store(keys[0], b"same")
+        await storage.store(keys[1], b"again")
+        self.assertEqual(storage.garbageSize, 0)
+        storage.collect(len(keys))
+        self.assertEqual(await storage.get(keys[1]), b"again")
+        await storage.delete(keys[1])
+        self.assertFalse(await storage.exist(keys[1]))
+        self.assertEqual(storage.collect(), 1)
+        self.assertEqual(storage.size, 4)
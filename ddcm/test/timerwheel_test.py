@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class TimerWheelTest(unittest.TestCase):
+    def test_expire(self):
+        loop = asyncio.get_event_loop()
+        wheel = ddcm.TimerWheel(loop, 0.01, 8)
+        expired = []
+        wheel.add("a", 0.05, expired.append)
+        wheel.add("b", 0.02, expired.append)
+        wheel.add("c", 0.2, expired.append)
+        wheel.add("d", 0.03, expired.append)
+        self.assertTrue(wheel.cancel("d"))
+        self.assertFalse(wheel.cancel("d"))
+        self.assertEqual(len(wheel), 3)
+        loop.run_until_complete(asyncio.sleep(0.1, loop = loop))
+        self.assertEqual(expired, ["b", "a"])
+        loop.run_until_complete(asyncio.sleep(0.15, loop = loop))
+        self.assertEqual(expired, ["b", "a", "c"])
+        self.assertEqual(len(wheel), 0)
+        self.assertIsNone(wheel.handle)
+
+    def test_call_timeout(self):
+        loop = asyncio.get_event_loop()
+        handler = ddcm.Handler(loop)
+        echo = ddcm.utils.get_echo_bytes()
+        future = handler.get_call_future(echo, timeout = 0.05)
+        self.assertIn(echo, handler.event_future)
+        with self.assertRaises(asyncio.TimeoutError):
+            loop.run_until_complete(future)
+        loop.run_until_complete(asyncio.sleep(0, loop = loop))
+        self.assertNotIn(echo, handler.event_future)
+
+    def test_call_cancel(self):
+        loop = asyncio.get_event_loop()
+        handler = ddcm.Handler(loop)
+        echo = ddcm.utils.get_echo_bytes()
+        future = handler.get_call_future(echo, timeout = 0.05)
+        future.cancel()
+        loop.run_until_complete(asyncio.sleep(0, loop = loop))
+        self.assertNotIn(echo, handler.event_future)
+        self.assertEqual(len(handler.timers), 0)
@@ -0,0 +1,46 @@
+import asyncio
+import json
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class TracerTest(unittest.TestCase):
+    def test_sample(self):
+        loop = asyncio.get_event_loop()
+        tracer = ddcm.Tracer(loop, 0, 2)
+        self.assertIsNone(tracer.start("find_node", b"\x00" * 20))
+        tracer.sampleRate = 1
+        for i in range(3):
+            tracer.start("find_node", bytes([i]) * 20).finish(None)
+        self.assertEqual(len(tracer.traces), 2)
+        self.assertEqual([trace["key"] for trace in json.loads(tracer.dump())], ["01" * 20, "02" * 20])
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_find_node_trace(self, loop, configs, services):
+        futures = []
+        sA, sB, sC = services["A"], services["B"], services["C"]
+        futures.append(
+            await sB.tcpService.call.ping(sA.tcpService.node.remote)
+        )
+        futures.append(
+            await sC.tcpService.call.ping(sA.tcpService.node.remote)
+        )
+        for f in asyncio.as_completed(futures):
+            await f
+
+        sB.tracer.sampleRate = 1
+        result = await sB.find_node(sC.tcpService.node.id)
+        self.assertEqual(result.id, sC.tcpService.node.id)
+
+        trace = json.loads(sB.tracer.dump(1))[0]
+        self.assertEqual(trace["kind"], "find_node")
+        self.assertEqual(trace["result"], {"found": True})
+        rpc = trace["rpcs"][0]
+        self.assertEqual(rpc["peer"], sA.tcpService.node.get_hash_string())
+        self.assertIsNotNone(rpc["replied"])
+        self.assertGreaterEqual(rpc["replied"], rpc["sent"])
+        self.assertIsNotNone(rpc["queue_wait"])
+        self.assertIn(sC.tcpService.node.get_hash_string(), rpc["contacts"])
@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class VirtualNodesTest(unittest.TestCase):
+    @utils.MultiNetworkTestCase(["B", "C"])
+    async def test_virtual(self, loop, configs, services):
+        B, C = services["B"], services["C"]
+        config = ddcm.utils.load_config("ddcm/test/config/configA.json")
+        config["virtual"] = {"count": 4}
+        V = ddcm.Service(config, loop)
+        await V.start()
+        try:
+            remote = V.tcpService.node.remote
+            self.assertEqual(len(V.virtual), 4)
+            # One PING, one PONG
+            await (await B.tcpService.call.ping(remote))
+            await asyncio.sleep(0.1, loop = loop)
+            self.assertEqual(B.tcpService.server.messagesReceived[ddcm.const.kad.command.PONG].value, 1)
+            self.assertFalse(B.route.isNewNode(V.tcpService.node))
+
+            # A request is answered by the point closest to its key
+            key = ddcm.utils.get_random_node_id()
+            event = await (await B.tcpService.call.store(remote, key, b"value"))
+            self.assertEqual(event["data"]["remoteNode"].id, V.virtual.closest(key).id)
+            self.assertEqual(await V.storage.get(key), b"value")
+            target = ddcm.utils.get_random_node_id()
+            event = await (await B.tcpService.call.findNode(remote, target))
+            self.assertEqual(event["data"]["remoteNode"].id, V.virtual.closest(target).id)
+
+            # Every point keeps its contacts, none keeps another point
+            V.virtual.addNode(C.tcpService.node)
+            V.virtual.addNode(V.virtual.nodes[1])
+            for route in [V.route] + list(V.virtual.routes.values()):
+                self.assertFalse(route.isNewNode(C.tcpService.node))
+                self.assertTrue(route.isNewNode(V.virtual.nodes[1]))
+
+            # Latency of a peer stays while a point still keeps it
+            V.route.updateLatency(C.tcpService.node, 0.01)
+            V.route.removeNode(C.tcpService.node)
+            self.assertIn(C.tcpService.node.id, V.route.latency)
+            for route in V.virtual.routes.values():
+                route.removeNode(C.tcpService.node)
+            self.assertNotIn(C.tcpService.node.id, V.route.latency)
+            V.virtual.addNode(C.tcpService.node)
+
+            # Looking each id up makes it known near it
+            await V.join()
+            for node in V.virtual.nodes:
+                self.assertFalse(C.route.isNewNode(node))
+        finally:
+            await V.stop()
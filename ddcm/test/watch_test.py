@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+
+import ddcm
+
+from . import const
+from . import utils
+
+class WatchTest(unittest.TestCase):
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_notify(self, loop, configs, services):
+        A, B, C = services["A"], services["B"], services["C"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        key = ddcm.utils.get_random_node_id()
+        await B.storage.store(key, b"first")
+
+        watch = A.watch(key)
+        self.assertEqual(await asyncio.wait_for(watch.__anext__(), 1, loop = loop), b"first")
+        self.assertIn(B.tcpService.node.id, A.watches.subscribed[key])
+        self.assertIn(A.tcpService.node.id, B.watches.leases[key])
+
+        # A store from anyone is pushed, a store of the same value is not
+        await (await C.tcpService.call.store(B.tcpService.node.remote, key, b"second"))
+        await (await C.tcpService.call.store(B.tcpService.node.remote, key, b"second"))
+        self.assertEqual(await asyncio.wait_for(watch.__anext__(), 1, loop = loop), b"second")
+        self.assertEqual(B.watches.pushed.value, 1)
+
+        # The last watch closed gives the lease back
+        watch.close()
+        with self.assertRaises(StopAsyncIteration):
+            await watch.__anext__()
+        await asyncio.sleep(0.1, loop = loop)
+        self.assertNotIn(key, B.watches.leases)
+        self.assertEqual(B.watches.granted, 0)
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_commits(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        watch = B.watch_commits()
+        await asyncio.sleep(0.1, loop = loop)
+        commit_id = await A.commit({"count": 1})
+        self.assertEqual(await asyncio.wait_for(watch.__anext__(), 1, loop = loop), commit_id)
+        watch.close()
+
+    @utils.NetworkTestCase
+    async def test_lease(self, loop, config, service):
+        watches = service.watches
+        key = ddcm.utils.get_random_node_id()
+        node = ddcm.Node(ddcm.utils.get_random_node_id(), service.tcpService.node.remote)
+        self.assertEqual(watches.grant(key, node, 10 ** 4), ddcm.const.kad.watch.WATCH_MAX_LEASE)
+        # Renewed, not granted twice
+        self.assertEqual(watches.grant(key, node, 1), 1)
+        self.assertEqual(watches.granted, 1)
+        watches.leases[key][node.id] = (node.remote, loop.time(), None)
+        watches.renew()
+        self.assertNotIn(key, watches.leases)
+        self.assertEqual(watches.granted, 0)
+
+        watches.granted = ddcm.const.kad.watch.WATCH_MAX_LEASES
+        self.assertEqual(watches.grant(key, node, 10), 0)
+        self.assertEqual(watches.refused.value, 1)
+
+    @utils.MultiNetworkTestCase(["A", "B", "C"])
+    async def test_resubscribe(self, loop, configs, services):
+        A, B = services["A"], services["B"]
+        key = ddcm.utils.get_random_node_id()
+        watch = A.watch(key)
+        await asyncio.sleep(0.1, loop = loop)
+        self.assertEqual(A.watches.subscribed[key], {})
+
+        # A node joins, and takes a lease at once
+        await (await A.tcpService.call.ping(B.tcpService.node.remote))
+        await asyncio.sleep(0.1, loop = loop)
+        self.assertIn(B.tcpService.node.id, A.watches.subscribed[key])
+
+        # B lost its leases, A takes it again before it would run out
+        B.watches.leases, B.watches.granted = {}, 0
+        node, expire = A.watches.subscribed[key][B.tcpService.node.id]
+        A.watches.subscribed[key][B.tcpService.node.id] = (node, loop.time())
+        A.watches.renew()
+        await asyncio.sleep(0.1, loop = loop)
+        self.assertIn(A.tcpService.node.id, B.watches.leases[key])
+        await B.store(key, b"value")
+        self.assertEqual(await asyncio.wait_for(watch.__anext__(), 1, loop = loop), b"value")
+        watch.close()
@@ -15,8 +15,15 @@ def commonPrefix(data):
 def get_echo_bytes():
     return bytes(random.getrandbits(8) for i in range(20))
 
-def get_random_node_id():
-    return bytes(random.getrandbits(8) for i in range(20))
+def get_random_node_id(source = random):
+    return bytes(source.getrandbits(8) for i in range(20))
+
+def percentile(data, q):
+    """Nearest-rank percentile q (0 < q <= 100) of sorted data, None if empty"""
+    if not data:
+        return None
+    rank = max(int(-(-q * len(data) // 100)), 1)
+    return data[rank - 1]
 
 def load_config(path):
     fd = open(path)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import json
+import argparse
+
+import ddcm
+
+parser = argparse.ArgumentParser(description='DDCM Discrete-Event Simulator')
+
+parser.add_argument('--nodes', type=int, default=1000, help='number of nodes')
+parser.add_argument('--ksize', type=int, nargs='+', default=[20], help='k-bucket sizes to simulate')
+parser.add_argument('--alpha', type=int, nargs='+', default=[3], help='lookup concurrencies to simulate')
+parser.add_argument('--lookups', type=int, default=1000, help='find_node lookups per run')
+parser.add_argument('--concurrency', type=int, default=ddcm.const.kad.simulator.SIMULATOR_CONCURRENCY, help='lookups in flight')
+parser.add_argument('--latency', type=float, default=ddcm.const.kad.simulator.SIMULATOR_LATENCY, help='one-way latency in seconds')
+parser.add_argument('--jitter', type=float, default=ddcm.const.kad.transport.MEMORY_JITTER, help='latency jitter in seconds')
+parser.add_argument('--loss', type=float, default=ddcm.const.kad.transport.MEMORY_LOSS, help='message loss rate')
+parser.add_argument('--churn', type=float, default=0, help='fraction of nodes offline at a time')
+parser.add_argument('--churn-interval', type=float, default=ddcm.const.kad.simulator.SIMULATOR_CHURN_INTERVAL, help='virtual seconds between churn changes')
+parser.add_argument('--seed', type=int, default=0, help='random seed')
+parser.add_argument('--output', default=None, help='JSON result file, default stdout')
+
+args = parser.parse_args()
+
+def simulate(ksize, alpha):
+    config = ddcm.Cluster.default_config()
+    config["kbucket"]["ksize"] = ksize
+    config["query"]["alpha"] = alpha
+    simulator = ddcm.Simulator(
+        args.nodes,
+        seed = args.seed,
+        config = config,
+        latency = args.latency,
+        jitter = args.jitter,
+        loss = args.loss
+    )
+    simulator.start()
+    try:
+        return simulator.run(
+            args.lookups,
+            concurrency = args.concurrency,
+            churn = args.churn,
+            churnInterval = args.churn_interval
+        )
+    finally:
+        simulator.stop()
+
+def main():
+    results = [
+        simulate(ksize, alpha)
+        for ksize in args.ksize
+        for alpha in args.alpha
+    ]
+    output = json.dumps({
+        "nodes": args.nodes,
+        "lookups": args.lookups,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "loss": args.loss,
+        "seed": args.seed,
+        "results": results
+    }, indent = 2)
+    if args.output:
+        with open(args.output, "w") as fd:
+            fd.write(output)
+    else:
+        print(output)
+
+main()